@@ -11,6 +11,15 @@ interface Lead {
   phone: string
   total_spent: number
   order_count: number
+  probability: number
+}
+
+// /predicted-leads trả về 1 trang: { items, total, page, limit } (total = tổng số lead mọi trang)
+interface LeadPage {
+  items: Lead[]
+  total: number
+  page: number
+  limit: number
 }
 
 const LeadPrediction: React.FC = () => {
@@ -26,16 +35,11 @@ const LeadPrediction: React.FC = () => {
     console.log('API URL:', apiUrl) // Debug API URL
 
     axios
-      .get(apiUrl)
+      .get<LeadPage>(apiUrl)
       .then((res) => {
         console.log('API Response:', res.data) // Debug response data
-        if (res.data && res.data.length) {
-          setLeads(res.data)
-          setTotalLeads(res.data.length) // Đếm số lượng khách hàng trong response
-        } else {
-          setLeads([])
-          setTotalLeads(0)
-        }
+        setLeads(res.data?.items ?? [])
+        setTotalLeads(res.data?.total ?? 0) // Tổng số lead do server đếm, không phải số dòng của trang này
         setLoading(false)
       })
       .catch((err) => {
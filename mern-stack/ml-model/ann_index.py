@@ -0,0 +1,250 @@
+# ann_index.py
+"""
+Index ứng viên gần đúng (IVF, NumPy thuần) cho gợi ý trên catalog lớn.
+
+Mô hình gợi ý không phải tích vô hướng user·product (embedding đi qua MLP), nên index được
+xây trên vector "product projection" P = E_product · W1[d_user:] + b1 (phần product của
+lớp Dense đầu, xem recommender_inference.py):
+- Offline: k-means trên P → `nlist` cụm, lưu tâm cụm + danh sách sản phẩm mỗi cụm (dạng CSR).
+- Online: chạy MLP của user trên các TÂM CỤM (nlist vector, rẻ), chọn `nprobe` cụm điểm cao nhất,
+  gom vài trăm sản phẩm ứng viên rồi chấm lại bằng MLP đầy đủ → top-k.
+- Recall@k so với chấm điểm toàn catalog được đo theo từng nprobe (`eval`) và lưu vào ann_meta.json.
+  Server chỉ bật ANN khi có kết quả đo cho index hiện tại và tồn tại nprobe đạt recall >=
+  ANN_MIN_RECALL (mặc định 0.95) → dùng nprobe nhỏ nhất đạt ngưỡng; chưa đo / không đạt → chấm
+  toàn catalog như cũ (ANN tắt mặc định, chất lượng gợi ý không bị giảm âm thầm).
+- Khi phục vụ, /recommend đọc bảng top-N tính sẵn trước (recommendation_store.py); ANN chỉ chạy ở
+  đường chấm trực tiếp (server.score_user_live): bảng top-N chưa dựng hoặc cũ hơn model (train lại
+  mà chưa dựng lại bảng → TopNStore.load trả None), hoặc user nằm ngoài bảng. Lúc đó catalog lớn
+  không phải chấm toàn bộ cho từng request. Ngoài ra index chỉ dùng offline (eval).
+- Ghi mảng ra .tmp rồi os.replace, meta ghi sau cùng; load kiểm tra kích thước mảng khớp meta.
+
+Chạy (trong thư mục ml-model, sau khi train):
+    python ann_index.py build [--nlist 256]
+    python ann_index.py eval  [--k 5] [--users 500] [--min-recall 0.95]
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from recommender_inference import NumpyRecommender, top_k_indices
+
+ANN_CENTROIDS_FILE = "ann_centroids.npy"
+ANN_OFFSETS_FILE = "ann_offsets.npy"
+ANN_ITEMS_FILE = "ann_items.npy"
+ANN_META_FILE = "ann_meta.json"
+MODEL_FILE = "recommendation_model.h5"
+ANN_MIN_RECALL = float(os.getenv("ANN_MIN_RECALL", 0.95))
+EVAL_NPROBES = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+# ---------------------------
+# k-means (Lloyd, chia khối để giới hạn bộ nhớ)
+# ---------------------------
+def _assign(x: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    c_sq = (centroids * centroids).sum(axis=1)
+    labels = np.empty(len(x), dtype=np.int32)
+    for start in range(0, len(x), chunk):
+        block = x[start:start + chunk]
+        # ||x - c||² = ||x||² - 2x·c + ||c||² (bỏ ||x||² vì không đổi theo c)
+        dist = c_sq[None, :] - 2.0 * (block @ centroids.T)
+        labels[start:start + chunk] = dist.argmin(axis=1)
+    return labels
+
+
+def kmeans(x: np.ndarray, nlist: int, n_iter: int = 20, seed: int = 42) -> tuple:
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(x))
+    centroids = x[rng.choice(len(x), size=nlist, replace=False)].copy()
+    labels = np.zeros(len(x), dtype=np.int32)
+    for _ in range(n_iter):
+        new_labels = _assign(x, centroids)
+        counts = np.bincount(new_labels, minlength=nlist)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, new_labels, x)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Cụm rỗng → gieo lại bằng điểm ngẫu nhiên
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    # Gán lại theo tâm cụm cuối cùng (labels trong vòng lặp được tính trước lần cập nhật tâm cuối)
+    centroids = centroids.astype(np.float32)
+    return centroids, _assign(x, centroids)
+
+
+# ---------------------------
+# Index
+# ---------------------------
+class IVFIndex:
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, items: np.ndarray, meta: Optional[dict] = None):
+        self.centroids = centroids   # (nlist, hidden)
+        self.offsets = offsets       # (nlist + 1,) — sản phẩm của cụm c: items[offsets[c]:offsets[c+1]]
+        self.items = items           # (n_products,) chỉ số sản phẩm, gom theo cụm
+        self.meta = meta or {}
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, recommender: NumpyRecommender, nlist: Optional[int] = None, n_iter: int = 20) -> "IVFIndex":
+        vectors = recommender.product_proj
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(len(vectors))))
+        centroids, labels = kmeans(vectors, nlist, n_iter=n_iter)
+        order = np.argsort(labels, kind="stable").astype(np.int32)
+        counts = np.bincount(labels, minlength=len(centroids))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(centroids, offsets, order, {"nlist": int(len(centroids)), "n_products": int(len(vectors))})
+
+    def save(self, out_dir: str = ".", model_path: str = MODEL_FILE) -> None:
+        """Ghi mảng + meta (build mới → meta không còn kết quả eval cũ, ANN tắt cho tới khi đo lại).
+        Mỗi file ghi ra .tmp rồi đổi tên → server load lại giữa chừng không đọc phải file ghi dở."""
+        for name, arr in ((ANN_CENTROIDS_FILE, self.centroids), (ANN_OFFSETS_FILE, self.offsets),
+                          (ANN_ITEMS_FILE, self.items)):
+            path = os.path.join(out_dir, name)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, arr)
+            os.replace(path + ".tmp", path)
+        self.meta.pop("evaluation", None)
+        self.meta.update({
+            "model_mtime": os.path.getmtime(model_path) if os.path.exists(model_path) else None,
+            "built_at": datetime.utcnow().isoformat() + "Z"
+        })
+        self.save_meta(out_dir)
+
+    def save_meta(self, out_dir: str = ".") -> None:
+        path = os.path.join(out_dir, ANN_META_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def save_evaluation(self, report: List[dict], k: int, out_dir: str = ".") -> None:
+        """Lưu recall@k đo được (evaluate_recall) vào meta của index này."""
+        self.meta["evaluation"] = {
+            "k": k,
+            "report": report,
+            "evaluated_at": datetime.utcnow().isoformat() + "Z"
+        }
+        self.save_meta(out_dir)
+
+    def serving_nprobe(self, min_recall: float = ANN_MIN_RECALL) -> Optional[int]:
+        """nprobe nhỏ nhất có recall đã đo >= min_recall; None (chưa đo / không đạt) → không dùng ANN."""
+        evaluation = self.meta.get("evaluation") or {}
+        key = f"recall@{evaluation.get('k')}"
+        for row in sorted(evaluation.get("report", []), key=lambda r: r["nprobe"]):
+            if row.get(key, 0) >= min_recall:
+                return int(row["nprobe"])
+        return None
+
+    @classmethod
+    def load(cls, out_dir: str = ".", model_path: str = MODEL_FILE) -> Optional["IVFIndex"]:
+        """Mở index bằng memory-map; None nếu chưa build hoặc cũ hơn model hiện tại."""
+        meta_path = os.path.join(out_dir, ANN_META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if os.path.exists(model_path) and meta.get("model_mtime") != os.path.getmtime(model_path):
+            print("⚠️ ANN index cũ hơn recommendation_model.h5, bỏ qua (chạy lại ann_index.py build)")
+            return None
+        centroids, offsets, items = (np.load(os.path.join(out_dir, name), mmap_mode="r")
+                                     for name in (ANN_CENTROIDS_FILE, ANN_OFFSETS_FILE, ANN_ITEMS_FILE))
+        if (len(centroids) != meta.get("nlist") or len(items) != meta.get("n_products")
+                or len(offsets) != len(centroids) + 1 or offsets[-1] != len(items)):
+            # Đọc trúng lúc `build` đang thay file (mảng mới + meta cũ) → coi như chưa có index
+            print("⚠️ ANN index không khớp ann_meta.json (đang build lại?), bỏ qua")
+            return None
+        return cls(centroids, offsets, items, meta)
+
+    def candidates(self, recommender: NumpyRecommender, u: np.ndarray, nprobe: int) -> np.ndarray:
+        """Sản phẩm ứng viên của user (u = recommender.user_proj([user]) → (1, hidden))."""
+        centroid_scores = recommender.score_projected(u, np.asarray(self.centroids))[0]
+        probe = top_k_indices(centroid_scores, nprobe)
+        return np.concatenate([self.items[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+
+    def recommend(self, recommender: NumpyRecommender, user_index: int, k: int = 5, nprobe: int = 8) -> List[int]:
+        u = recommender.user_proj([user_index])
+        cand = self.candidates(recommender, u, nprobe)
+        scores = recommender.score_projected(u, recommender.product_proj[cand])[0]
+        return cand[top_k_indices(scores, k)].tolist()
+
+
+# ---------------------------
+# Đánh giá recall@k so với chấm điểm toàn catalog
+# ---------------------------
+def evaluate_recall(recommender: NumpyRecommender, index: IVFIndex, k: int = 5,
+                    nprobes: Sequence[int] = EVAL_NPROBES, n_users: int = 500, seed: int = 0) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    users = rng.choice(recommender.n_users, size=min(n_users, recommender.n_users), replace=False)
+
+    t0 = time.perf_counter()
+    exact = {u: set(recommender.recommend(u, k)) for u in users}
+    exact_ms = (time.perf_counter() - t0) / len(users) * 1000
+
+    report = []
+    for nprobe in nprobes:
+        if nprobe > index.nlist:
+            break
+        hits, n_cand = 0, 0
+        t0 = time.perf_counter()
+        for u in users:
+            hits += len(exact[u].intersection(index.recommend(recommender, u, k, nprobe)))
+        ann_ms = (time.perf_counter() - t0) / len(users) * 1000
+        for u in users[:50]:
+            n_cand += len(index.candidates(recommender, recommender.user_proj([u]), nprobe))
+        report.append({
+            "nprobe": nprobe,
+            f"recall@{k}": round(hits / (k * len(users)), 4),
+            "avg_candidates": int(n_cand / min(50, len(users))),
+            "ann_ms_per_user": round(ann_ms, 3),
+            "exact_ms_per_user": round(exact_ms, 3)
+        })
+    return report
+
+
+def _load_recommender() -> NumpyRecommender:
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.losses import MeanSquaredError
+
+    model = load_model(MODEL_FILE, custom_objects={"mse": MeanSquaredError()})
+    return NumpyRecommender.from_keras(model)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["build", "eval"])
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--min-recall", type=float, default=ANN_MIN_RECALL)
+    args = parser.parse_args()
+
+    recommender = _load_recommender()
+    if args.command == "build":
+        t0 = time.perf_counter()
+        index = IVFIndex.build(recommender, nlist=args.nlist)
+        index.save()
+        print(f"✅ Đã build ANN index {index.nlist} cụm cho {recommender.n_products} sản phẩm "
+              f"trong {time.perf_counter() - t0:.1f}s")
+    else:
+        index = IVFIndex.load()
+        if index is None:
+            raise Exception("❌ Chưa có ANN index, chạy: python ann_index.py build")
+        report = evaluate_recall(recommender, index, k=args.k, n_users=args.users)
+        for row in report:
+            print(row)
+        index.save_evaluation(report, args.k)
+        nprobe = index.serving_nprobe(args.min_recall)
+        if nprobe is None:
+            print(f"⚠️ Không nprobe nào đạt recall@{args.k} >= {args.min_recall}: server giữ chấm toàn catalog")
+        else:
+            print(f"✅ Server dùng ANN với nprobe={nprobe} (recall@{args.k} >= {args.min_recall})")
@@ -0,0 +1,115 @@
+# bench_chat_context.py
+"""
+Benchmark kích thước prompt + độ trễ /chat: cả catalog (cách cũ) so với context BM25 top-k.
+
+Chạy (trong thư mục ml-model):
+    python -m benchmarks.bench_chat_context
+    python -m benchmarks.bench_chat_context --products 100 1000 10000 --budget 1500
+
+- Catalog giả (tên hoa + mô tả ~400 ký tự), câu hỏi mẫu có dấu/không dấu.
+- GenerativeModel giả: độ trễ = cố định + tỉ lệ theo số token prompt (mô phỏng prefill),
+  không gọi mạng → chỉ đo phần phụ thuộc kích thước prompt.
+"""
+
+import argparse
+import random
+import time
+
+from product_retriever import ProductRetriever, estimate_tokens, product_line
+
+FLOWERS = ["hồng", "tulip", "lan hồ điệp", "cúc họa mi", "hướng dương", "baby", "cẩm tú cầu",
+           "mẫu đơn", "ly", "đồng tiền", "cát tường", "sen đá"]
+COLORS = ["đỏ", "trắng", "vàng", "hồng phấn", "tím", "cam", "xanh"]
+KINDS = ["bó hoa", "giỏ hoa", "lẵng hoa", "hộp hoa", "kệ hoa khai trương", "hoa cưới cầm tay"]
+FILLER = ("Hoa được tuyển chọn mỗi sáng tại Đà Lạt, cắm bởi florist nhiều năm kinh nghiệm, "
+          "gói giấy Hàn Quốc, kèm thiệp viết tay miễn phí, giao nhanh nội thành trong 2 giờ. ")
+QUESTIONS = [
+    "Shop có bó hoa hồng đỏ nào giá dưới 500k không?",
+    "hoa huong duong vang tang sinh nhat",
+    "Mình cần kệ hoa khai trương màu cam",
+    "Giỏ hoa lan hồ điệp trắng giá bao nhiêu?",
+    "hoa cuoi cam tay tone trang"
+]
+
+
+class FakeCatalog:
+    def __init__(self, products):
+        self.products = products
+        self.version = 1
+
+    def list_active(self):
+        return self.products
+
+
+class FakeModel:
+    """Giả lập GenerativeModel: độ trễ tăng theo số token prompt."""
+
+    def __init__(self, base_ms: float, per_1k_tokens_ms: float):
+        self.base_ms = base_ms
+        self.per_1k_tokens_ms = per_1k_tokens_ms
+
+    def generate_content(self, prompt: str):
+        time.sleep((self.base_ms + self.per_1k_tokens_ms * estimate_tokens(prompt) / 1000) / 1000)
+        return type("Response", (), {"text": "ok"})()
+
+
+def make_products(n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    products = []
+    for i in range(n):
+        flower, color, kind = rng.choice(FLOWERS), rng.choice(COLORS), rng.choice(KINDS)
+        products.append({
+            "nameProduct": f"{kind.capitalize()} {flower} {color} #{i}",
+            "price": rng.randrange(200, 3000) * 1000,
+            "sale": rng.choice([0, 0, 50000, 100000]),
+            "desc": f"{kind.capitalize()} {flower} màu {color}. " + FILLER * 2
+        })
+    return products
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--base-ms", type=float, default=300)
+    parser.add_argument("--per-1k-tokens-ms", type=float, default=40)
+    args = parser.parse_args()
+
+    model = FakeModel(args.base_ms, args.per_1k_tokens_ms)
+    print(f"{'products':>8} {'mode':>9} {'prompt tokens':>14} {'context ms':>11} {'LLM ms':>8}")
+    for n in args.products:
+        products = make_products(n)
+        retriever = ProductRetriever(FakeCatalog(products), top_k=args.top_k, token_budget=args.budget)
+        t0 = time.perf_counter()
+        retriever.refresh()
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        modes = {
+            "full": lambda q: "\n".join(product_line(p) for p in products),
+            "bm25": retriever.context_for
+        }
+        for mode, build in modes.items():
+            tokens, ctx_ms, llm_ms = 0, 0.0, 0.0
+            for q in QUESTIONS:
+                t0 = time.perf_counter()
+                prompt = f"{build(q)}\n\nCâu hỏi: {q}"
+                t1 = time.perf_counter()
+                model.generate_content(prompt)
+                t2 = time.perf_counter()
+                tokens += estimate_tokens(prompt)
+                ctx_ms += (t1 - t0) * 1000
+                llm_ms += (t2 - t1) * 1000
+            m = len(QUESTIONS)
+            print(f"{n:8d} {mode:>9} {tokens // m:14d} {ctx_ms / m:11.2f} {llm_ms / m:8.0f}")
+        print(f"{'':8} {'':>9} (dựng index BM25: {build_ms:.0f} ms)")
+
+    products = make_products(1000)
+    retriever = ProductRetriever(FakeCatalog(products), top_k=3, token_budget=args.budget)
+    print("\nVí dụ top-3:")
+    for q in QUESTIONS[:3]:
+        print(f"  {q!r} → {[products[i]['nameProduct'] for i in retriever.search(q)]}")
+
+
+if __name__ == "__main__":
+    main()
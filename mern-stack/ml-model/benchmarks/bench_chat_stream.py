@@ -0,0 +1,100 @@
+# bench_chat_stream.py
+"""
+Đo time-to-first-byte (TTFB) của /chat (JSON 1 lần) so với /chat/stream (SSE).
+
+Chạy (trong thư mục ml-model, cần cùng môi trường với server: google-generativeai,
+GEMINI_API_KEY, MONGO_URI — không gọi Gemini/MongoDB thật):
+    python -m benchmarks.bench_chat_stream
+    python -m benchmarks.bench_chat_stream --tokens 60 --token-delay 0.05
+
+- chatbot.model được thay bằng model giả sinh từng token sau --token-delay giây
+  (kèm --first-delay cho token đầu, mô phỏng prefill).
+- Catalog giả (benchmarks.bench_chat_context) thay cho MongoDB.
+- Server Flask chạy thật trên cổng cục bộ; client đọc bằng requests (stream=True).
+- Mỗi lần gọi dùng câu hỏi khác nhau để không trúng cache câu trả lời.
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+import types
+
+import requests
+from flask import Flask
+from werkzeug.serving import make_server
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+import chatbot  # noqa: E402
+from benchmarks.bench_chat_context import FakeCatalog, make_products  # noqa: E402
+from components import components  # noqa: E402
+from product_retriever import ProductRetriever  # noqa: E402
+
+
+class FakeStreamingModel:
+    def __init__(self, n_tokens: int, first_delay: float, token_delay: float):
+        self.n_tokens = n_tokens
+        self.first_delay = first_delay
+        self.token_delay = token_delay
+
+    def _tokens(self):
+        time.sleep(self.first_delay)
+        for i in range(self.n_tokens):
+            if i:
+                time.sleep(self.token_delay)
+            yield types.SimpleNamespace(text=f"từ{i} ")
+
+    def generate_content(self, prompt, stream=False):
+        if stream:
+            return self._tokens()
+        return types.SimpleNamespace(text="".join(chunk.text for chunk in self._tokens()))
+
+
+def measure(url: str, **kwargs) -> tuple:
+    """(giây tới byte nội dung đầu tiên, tổng giây)."""
+    t0 = time.perf_counter()
+    with requests.post(url, stream=True, timeout=60, **kwargs) as resp:
+        resp.raise_for_status()
+        first = None
+        for chunk in resp.iter_content(chunk_size=None):
+            if first is None and chunk:
+                first = time.perf_counter() - t0
+        return first, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--first-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    chatbot.model = FakeStreamingModel(args.tokens, args.first_delay, args.token_delay)
+    components.reload("chat_index", lambda: ProductRetriever(FakeCatalog(make_products(500))))
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    app = Flask(__name__)
+    app.register_blueprint(chatbot.chatbot_api, url_prefix="/")
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"tokens={args.tokens} first_delay={args.first_delay}s token_delay={args.token_delay}s")
+    print(f"{'endpoint':>12} {'TTFB ms':>9} {'total ms':>9}")
+    for path in ["chat", "chat/stream"]:
+        ttfb, total = [], []
+        for run in range(args.runs):
+            first, done = measure(f"{base}/{path}", json={"prompt": f"bó hoa hồng số {path} {run}"})
+            ttfb.append(first)
+            total.append(done)
+        print(f"{'/' + path:>12} {sum(ttfb) / len(ttfb) * 1000:9.0f} {sum(total) / len(total) * 1000:9.0f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_forecast_engine.py
+"""
+Benchmark forecast_engine.batch_linear_forecast so với vòng lặp LinearRegression cũ.
+
+Chạy (trong thư mục ml-model):
+    python -m benchmarks.bench_forecast_engine
+    python -m benchmarks.bench_forecast_engine --skus 1000 10000 100000 --months 24
+
+- Vòng lặp sklearn chỉ chạy với số SKU <= --loop-max (mặc định 2000) vì chi phí O(SKU × dòng).
+- Với các kích thước đó, kiểm tra kết quả 2 cách phải giống hệt nhau.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from forecast_engine import batch_linear_forecast
+
+
+def make_grouped(n_skus: int, n_months: int, seed: int = 42) -> pd.DataFrame:
+    """Bảng (productId, time, quantity) giả: mỗi SKU có 1..n_months tháng có bán."""
+    rng = np.random.default_rng(seed)
+    months_per_sku = rng.integers(1, n_months + 1, size=n_skus)
+    codes = np.repeat(np.arange(n_skus), months_per_sku)
+    # Tháng của mỗi dòng: tháng liên tiếp kết thúc ở tháng hiện tại
+    offset = np.arange(len(codes)) - np.repeat(np.cumsum(months_per_sku) - months_per_sku, months_per_sku)
+    time_idx = 2024 * 12 + 12 - months_per_sku[codes] + offset
+    base = rng.integers(1, 50, size=n_skus)[codes]
+    trend = rng.normal(0, 2, size=n_skus)[codes]
+    quantity = np.maximum(base + trend * offset + rng.integers(-3, 4, size=len(codes)), 0)
+    return pd.DataFrame({
+        "productId": np.char.add("P", codes.astype(str)),
+        "time": time_idx,
+        "quantity": quantity
+    })
+
+
+def sklearn_loop_forecast(grouped: pd.DataFrame) -> list:
+    """Bản sao vòng lặp cũ trong run_forecast() để so sánh."""
+    forecast = []
+    for pid in grouped["productId"].unique():
+        df_pid = grouped[grouped["productId"] == pid]
+        if len(df_pid) < 2:
+            continue
+        X = df_pid[["time"]]
+        y = df_pid["quantity"]
+        model = LinearRegression()
+        model.fit(X, y)
+        next_time = pd.DataFrame({"time": [X["time"].max() + 1]})
+        predicted = model.predict(next_time)[0]
+        forecast.append({"productId": pid, "predicted_quantity": max(int(predicted), 0)})
+    return sorted(forecast, key=lambda x: x["predicted_quantity"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--loop-max", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'SKUs':>8} {'rows':>10} {'engine (s)':>11} {'sklearn (s)':>12} {'speedup':>8} same")
+    for n_skus in args.skus:
+        grouped = make_grouped(n_skus, args.months)
+
+        t0 = time.perf_counter()
+        fast = batch_linear_forecast(grouped)
+        t_fast = time.perf_counter() - t0
+
+        t_loop, same = None, "-"
+        if n_skus <= args.loop_max:
+            t0 = time.perf_counter()
+            slow = sklearn_loop_forecast(grouped)
+            t_loop = time.perf_counter() - t0
+            same = "yes" if slow == fast else "NO"
+
+        loop_txt = f"{t_loop:12.3f}" if t_loop is not None else f"{'skip':>12}"
+        speedup = f"{t_loop / t_fast:7.0f}x" if t_loop is not None else f"{'-':>8}"
+        print(f"{n_skus:8d} {len(grouped):10d} {t_fast:11.3f} {loop_txt} {speedup} {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# bench_llm_gateway.py
+"""
+Load test: /chat bị bão hòa bởi Gemini chậm có làm chậm các endpoint khác không?
+
+Chạy (trong thư mục ml-model, cùng môi trường với server; không gọi Gemini/MongoDB thật):
+    python -m benchmarks.bench_llm_gateway
+    python -m benchmarks.bench_llm_gateway --workers 8 --chat-clients 24 --llm-delay 3 --duration 10
+
+- Server WSGI với số worker thread cố định (--workers), giống gunicorn --threads.
+- /ping đại diện cho /forecast, /recommend (trả dữ liệu có sẵn trong RAM).
+- --chat-clients client gọi /chat liên tục (câu hỏi lặp lại theo --distinct-prompts để có gộp
+  request), model giả ngủ --llm-delay giây; nhận 503 thì chờ theo Retry-After như client thật.
+- 2 chế độ: "no-gateway" (không giới hạn, deadline rất lớn ~ hành vi cũ) và "gateway"
+  (giới hạn đồng thời + giới hạn request chờ + hàng chờ có hạn + deadline);
+  in độ trễ /ping p50/p95/max.
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+import types
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from flask import Flask, jsonify
+from werkzeug.serving import BaseWSGIServer
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+import chatbot  # noqa: E402
+from benchmarks.bench_chat_context import FakeCatalog, make_products  # noqa: E402
+from llm_gateway import LLMGateway  # noqa: E402
+from components import components  # noqa: E402
+from product_retriever import ProductRetriever  # noqa: E402
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Xử lý request trên pool cố định `workers` thread (request thừa phải xếp hàng)."""
+
+    def __init__(self, host: str, port: int, app, workers: int):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wsgi")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class SlowModel:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def generate_content(self, prompt, stream=False):
+        time.sleep(self.delay)
+        return types.SimpleNamespace(text="ok")
+
+
+def run_mode(base: str, args, stop_after: float) -> dict:
+    stop = threading.Event()
+    statuses = Counter()
+    ping_ms = []
+
+    def chat_client(i: int):
+        n = 0
+        while not stop.is_set():
+            prompt = f"câu hỏi {(i + n) % args.distinct_prompts} lần {n // args.distinct_prompts}"
+            try:
+                r = requests.post(f"{base}/chat", json={"prompt": prompt}, timeout=60)
+                statuses[r.status_code] += 1
+                if r.status_code == 503:
+                    time.sleep(float(r.headers.get("Retry-After", 1)))
+            except requests.RequestException:
+                statuses["error"] += 1
+            n += 1
+
+    def ping_client():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            requests.get(f"{base}/ping", timeout=60)
+            ping_ms.append((time.perf_counter() - t0) * 1000)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=chat_client, args=(i,), daemon=True) for i in range(args.chat_clients)]
+    threads.append(threading.Thread(target=ping_client, daemon=True))
+    for t in threads:
+        t.start()
+    time.sleep(stop_after)
+    stop.set()
+    for t in threads:
+        t.join(timeout=args.llm_delay * 3 + 5)
+
+    ping = np.array(ping_ms or [np.nan])
+    return {
+        "ping_p50_ms": round(float(np.percentile(ping, 50)), 1),
+        "ping_p95_ms": round(float(np.percentile(ping, 95)), 1),
+        "ping_max_ms": round(float(ping.max()), 1),
+        "pings": len(ping_ms),
+        "chat_status": dict(statuses),
+        "gateway": chatbot.gateway.stats()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--chat-clients", type=int, default=24)
+    parser.add_argument("--distinct-prompts", type=int, default=8)
+    parser.add_argument("--llm-delay", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=8.0)
+    parser.add_argument("--max-concurrent", type=int, default=3)
+    parser.add_argument("--max-waiting", type=int, default=5)
+    parser.add_argument("--queue-timeout", type=float, default=0.2)
+    parser.add_argument("--call-timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    chatbot.model = SlowModel(args.llm_delay)
+    components.reload("chat_index", lambda: ProductRetriever(FakeCatalog(make_products(200))))
+
+    app = Flask(__name__)
+    app.register_blueprint(chatbot.chatbot_api, url_prefix="/")
+
+    @app.route("/ping")
+    def ping():
+        return jsonify({"products": []})
+
+    server = PooledWSGIServer("127.0.0.1", 0, app, workers=args.workers)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    modes = {
+        "no-gateway": LLMGateway(max_concurrent=10 ** 6, queue_timeout=10 ** 6, call_timeout=10 ** 6,
+                                 max_waiting=10 ** 6),
+        "gateway": LLMGateway(args.max_concurrent, args.queue_timeout, args.call_timeout, args.max_waiting)
+    }
+    print(f"workers={args.workers} chat_clients={args.chat_clients} llm_delay={args.llm_delay}s "
+          f"duration={args.duration}s")
+    for name, gateway in modes.items():
+        chatbot.gateway = gateway
+        chatbot.response_cache.clear()
+        report = run_mode(base, args, args.duration)
+        print(f"\n[{name}]")
+        for k, v in report.items():
+            print(f"  {k}: {v}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
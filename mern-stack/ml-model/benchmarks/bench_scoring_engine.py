@@ -0,0 +1,75 @@
+# bench_scoring_engine.py
+"""
+Benchmark scoring_engine: chấm điểm 1 kịch bản và sweep nhiều bộ trọng số trên N sản phẩm.
+
+Chạy (trong thư mục ml-model):
+    python -m benchmarks.bench_scoring_engine
+    python -m benchmarks.bench_scoring_engine --products 100000 --scenarios 1000 --k 5
+
+- "loop": vòng lặp Python kiểu compute_weighted_scores cũ (list + dict mỗi sản phẩm),
+  chạy lại cho từng kịch bản.
+- "engine": ScoringEngine.sweep_top_k trên toàn bộ kịch bản (trọng số × ngày trong năm).
+- Với các kịch bản loop đã chạy, top-k 2 cách phải trùng nhau.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from scoring_engine import ScoringEngine, seasonality_for_dates
+
+
+def loop_top_k(product_ids, growth, trend, w, season, k):
+    """Bản sao cách tính cũ: min-max bằng list rồi tính điểm từng sản phẩm."""
+    def minmax(values):
+        clean = [v for v in values if v is not None]
+        vmin, vmax = min(clean), max(clean)
+        return [0.0 if v is None else (v - vmin) / (vmax - vmin) for v in values]
+
+    g, t = minmax(growth), minmax(trend)
+    scores = [(pid, w[0] * g[i] + w[1] * t[i] + w[2] * season) for i, pid in enumerate(product_ids)]
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return [pid for pid, _ in scores[:k]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--scenarios", type=int, default=1000)
+    parser.add_argument("--loop-scenarios", type=int, default=3)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    product_ids = [f"P{i}" for i in range(args.products)]
+    growth = rng.normal(0, 30, size=args.products)
+    trend = rng.uniform(0, 100, size=args.products)
+    trend[rng.random(args.products) < 0.2] = np.nan   # sản phẩm không có từ khóa Trends
+
+    weights = rng.dirichlet([1, 1, 1], size=args.scenarios)
+    dates = np.datetime64("2025-01-01") + rng.integers(0, 365, size=args.scenarios)
+
+    t0 = time.perf_counter()
+    engine = ScoringEngine(product_ids, growth, trend)
+    seasons = seasonality_for_dates(dates)
+    top = engine.sweep_top_k(weights, seasons, k=args.k)
+    t_engine = time.perf_counter() - t0
+
+    growth_list = growth.tolist()
+    trend_list = [None if np.isnan(v) else v for v in trend.tolist()]
+    t0 = time.perf_counter()
+    same = True
+    for s in range(args.loop_scenarios):
+        expected = loop_top_k(product_ids, growth_list, trend_list, weights[s], seasons[s], args.k)
+        same &= expected == [product_ids[i] for i in top[s]]
+    t_loop = (time.perf_counter() - t0) / max(args.loop_scenarios, 1)
+
+    print(f"products={args.products} scenarios={args.scenarios} k={args.k}")
+    print(f"  loop   : {t_loop * 1000:9.1f} ms / kịch bản  (ước tính {t_loop * args.scenarios:.1f}s cho tất cả)")
+    print(f"  engine : {t_engine * 1000 / args.scenarios:9.3f} ms / kịch bản  ({t_engine:.2f}s cho tất cả)")
+    print(f"  top-{args.k} trùng nhau ({args.loop_scenarios} kịch bản đầu): {'yes' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench_shopee_fetch.py
+"""
+Benchmark shopee_client.fetch_shopee_data (song song, session dùng chung) so với cách cũ
+(requests.get tuần tự từng từ khóa), trên 1 stub server HTTP cục bộ trả về search_items giả.
+
+Chạy (trong thư mục ml-model):
+    python -m benchmarks.bench_shopee_fetch
+    python -m benchmarks.bench_shopee_fetch --keywords 12 --delay 0.3 --max-per-host 4
+
+- Stub trả lời sau --delay giây, mỗi từ khóa có số item cố định → kiểm tra 2 cách cho
+  kết quả giống hệt nhau.
+- Thời gian song song kỳ vọng ≈ ceil(N / max_per_host) × delay.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from shopee_client import HEADERS, HostLimiter, fetch_shopee_data, make_session, parse_search_items
+
+
+def make_stub_server(delay: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # giữ kết nối (keep-alive) cho session
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            keyword = query.get("keyword", [""])[0]
+            n = 5 + len(keyword) % 7
+            items = [{"item_basic": {
+                "name": f"{keyword} #{i}", "price": (100 + 10 * i) * 100000,
+                "sold": (i * 37) % 100, "shopid": i % 3, "shop_location": "TP. Hồ Chí Minh"
+            }} for i in range(n)]
+            body = json.dumps({"items": items}).encode("utf-8")
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serial_fetch(url: str, keywords: list) -> dict:
+    """Cách cũ: requests.get (kết nối mới) cho từng từ khóa, lần lượt."""
+    out = {}
+    for kw in keywords:
+        params = {"by": "pop", "limit": 50, "order": "desc", "keyword": kw}
+        resp = requests.get(url, params=params, headers=HEADERS, timeout=8)
+        out[kw] = parse_search_items(kw, resp.json())
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keywords", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.3)
+    parser.add_argument("--max-per-host", type=int, default=8)
+    parser.add_argument("--min-interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    server = make_stub_server(args.delay)
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v4/search/search_items"
+    keywords = [f"hoa {i}" for i in range(args.keywords)]
+
+    t0 = time.perf_counter()
+    slow = serial_fetch(url, keywords)
+    t_serial = time.perf_counter() - t0
+
+    limiter = HostLimiter(max_concurrent=args.max_per_host, min_interval=args.min_interval)
+    session = make_session()
+    t0 = time.perf_counter()
+    fast = fetch_shopee_data(keywords, max_workers=args.keywords, session=session, limiter=limiter, url=url)
+    t_concurrent = time.perf_counter() - t0
+
+    server.shutdown()
+    print(f"keywords={args.keywords} delay={args.delay}s max_per_host={args.max_per_host}")
+    print(f"  tuần tự  : {t_serial:.3f}s")
+    print(f"  song song: {t_concurrent:.3f}s ({t_serial / t_concurrent:.1f}x)")
+    print(f"  kết quả giống nhau: {'yes' if slow == fast else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
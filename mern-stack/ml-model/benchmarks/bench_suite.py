@@ -0,0 +1,304 @@
+# bench_suite.py
+"""
+Benchmark (pytest-benchmark) các đường nóng của ml-model trên dữ liệu giả lập (synthetic_data.py),
+so với baseline đã lưu → thay đổi làm chậm forecast / lead / gợi ý / scoring lộ ra ngay khi review.
+
+Chạy (trong thư mục ml-model, cùng môi trường với server; pip install -r requirements.txt):
+    python -m pytest benchmarks/bench_suite.py --benchmark-compare --benchmark-compare-fail=median:30%
+    python -m pytest benchmarks/bench_suite.py --bench-sizes 1000 10000 100000 -k run_forecast
+    python -m pytest benchmarks/bench_suite.py --bench-uri mongodb://localhost:27017 --bench-sizes 100000 1000000
+    python -m pytest benchmarks/bench_suite.py --benchmark-save=mongomock      # lưu baseline mới
+
+Mỗi benchmark là 1 test dùng fixture `benchmark`, tham số hóa theo số dòng (--bench-sizes, mặc định
+1k + 10k; dữ liệu sinh 1 lần cho mỗi kích thước), extra_info["ops"] = số thao tác mỗi lượt:
+- run_forecast[cold]: tổng hợp tháng từ đầu (file aggregate trống) + batch_linear_forecast.
+- run_forecast[warm]: refresh không có đơn mới + dự báo (trường hợp component khởi động lại).
+- get_predicted_leads: GET /predicted-leads qua Flask test client, RandomForest fit trên dữ liệu giả lập
+  theo đúng công thức train_lead_prediction.py (không dùng lead_model.pkl cục bộ).
+- recommend_user[deep]: GET /recommend/<id> cho --bench-requests user, NumpyRecommender trọng số ngẫu nhiên
+  cùng kiến trúc model thật (đo chi phí phục vụ, không cần TensorFlow / model đã train).
+- recommend_user[similar]: user chưa có trong model → index sản phẩm tương tự dựng từ dữ liệu giả lập.
+- compute_weighted_scores: mọi sản phẩm (cần business_strategy → pytrends).
+- train_prophet_per_product: top --prophet-products sản phẩm theo ngày, ProphetEngine tắt cache (mỗi lượt
+  fit nguội toàn bộ; skip nếu chưa cài prophet). Thời gian phụ thuộc hình dạng chuỗi hơn số dòng: chuỗi
+  thưa (ít ngày có bán) hội tụ chậm hơn — extra_info ghi số ngày trung bình mỗi chuỗi.
+
+Baseline: pytest-benchmark lưu ở benchmarks/baselines/<machine id>/NNNN_<tên>.json (conftest.py đặt
+--benchmark-storage mặc định); --benchmark-compare so với lần lưu mới nhất, --benchmark-compare-fail
+→ exit code khác 0 khi chậm hơn ngưỡng. Số đo phụ thuộc máy: đổi máy chạy review thì lưu lại baseline.
+Server được import với cwd là thư mục tạm → file aggregate / cache / snapshot không ghi vào ml-model.
+"""
+
+import importlib.util
+import os
+import shutil
+import tempfile
+from datetime import date
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic_data
+from benchmarks.bench_chat_context import FLOWERS
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMBEDDING_DIM = 50  # như train_recommendation_model.py
+
+
+class BenchSkipped(Exception):
+    pass
+
+
+# ---------------------------
+# Môi trường
+# ---------------------------
+def import_server(uri: str):
+    """Import server.py (component nền khởi động luôn). Với mongomock, client của server / catalog
+    cũng là mongomock để component nền không chờ MongoDB thật."""
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    if uri.startswith("mongomock://"):
+        import mongomock
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+        os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+    else:
+        os.environ["MONGO_URI"] = uri
+    import server
+    return server
+
+
+def point_server_at(server, db) -> None:
+    """Endpoint / run_forecast đọc collection của db giả lập thay vì db "test"."""
+    from components import components
+    from product_catalog import ProductCatalog
+
+    server.orders, server.products, server.users = db["orders"], db["products"], db["users"]
+    components.reload("product_catalog", lambda: ProductCatalog(db["products"]))
+
+
+def snapshot(ctx):
+    """OrdersSnapshot của db giả lập (dựng 1 lần cho mỗi kích thước)."""
+    if ctx.snapshot is None:
+        from orders_snapshot import build_snapshot
+        ctx.snapshot = build_snapshot(ctx.db, os.path.join(ctx.workdir, "orders_snapshot"))
+    return ctx.snapshot
+
+
+# ---------------------------
+# Benchmarks: mỗi hàm chuẩn bị dữ liệu, return (hàm chạy 1 lượt, số thao tác mỗi lượt)
+# ---------------------------
+def bench_forecast_cold(ctx) -> Tuple[Callable, int]:
+    from sales_aggregate import MonthlySalesAggregate
+
+    path = os.path.join(ctx.workdir, "sales_monthly.pkl")
+
+    def run():
+        if os.path.exists(path):
+            os.remove(path)
+        ctx.server.sales_aggregate = MonthlySalesAggregate(ctx.db["orders"], path)
+        return ctx.server.run_forecast()
+    return run, 1
+
+
+def bench_forecast_warm(ctx) -> Tuple[Callable, int]:
+    from sales_aggregate import MonthlySalesAggregate
+
+    path = os.path.join(ctx.workdir, "sales_monthly.pkl")
+    if os.path.exists(path):
+        os.remove(path)
+    ctx.server.sales_aggregate = MonthlySalesAggregate(ctx.db["orders"], path)
+    ctx.server.sales_aggregate.refresh()
+    return ctx.server.run_forecast, 1
+
+
+def fit_lead_model(ctx):
+    """RandomForest như train_lead_prediction.py, fit trên dữ liệu giả lập (tái lập được từ checkout sạch)."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    snap = snapshot(ctx)
+    df = pd.merge(snap.customers(), snap.user_order_stats(), how="left", on="user_id").fillna({
+        "total_spent": 0,
+        "order_count": 0
+    })
+    df["account_age_days"] = (pd.Timestamp.now() - pd.to_datetime(df["created_at"])).dt.days
+    clf = RandomForestClassifier(n_estimators=100, random_state=ctx.args.seed)
+    clf.fit(df[["total_spent", "order_count", "account_age_days"]], (df["order_count"] >= 1).astype(int))
+    return clf
+
+
+def bench_leads(ctx) -> Tuple[Callable, int]:
+    model = fit_lead_model(ctx)
+    ctx.components.reload("lead_model", lambda: model)
+
+    def run():
+        response = ctx.client.get("/predicted-leads?limit=50")
+        assert response.status_code == 200, response.status_code
+    return run, 1
+
+
+def _get_all(ctx, urls: List[str]) -> Callable:
+    def run():
+        for url in urls:
+            response = ctx.client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+    return run
+
+
+def _sample_buyers(ctx) -> List[str]:
+    snap = snapshot(ctx)
+    buyers = snap.user_ids[np.unique(snap.order_user[snap.order_user >= 0])]
+    return ctx.rng.choice(buyers, size=min(ctx.args.requests, len(buyers)), replace=False).tolist()
+
+
+def bench_recommend_deep(ctx) -> Tuple[Callable, int]:
+    from recommender_inference import NumpyRecommender
+
+    snap = snapshot(ctx)
+    user_ids = [str(u) for u in snap.user_ids]
+    product_ids = [str(p) for p in snap.product_ids]
+    rng = np.random.default_rng(ctx.args.seed)
+
+    def weights(*shape):
+        return rng.uniform(-0.05, 0.05, shape).astype(np.float32)
+
+    dense = [(weights(2 * EMBEDDING_DIM, 128), weights(128), "relu"),
+             (weights(128, 64), weights(64), "relu"),
+             (weights(64, 1), weights(1), "linear")]
+    rec = {
+        "model": None,
+        "numpy": NumpyRecommender(weights(len(user_ids), EMBEDDING_DIM),
+                                  weights(len(product_ids), EMBEDDING_DIM), dense),
+        "topn_store": None,
+        "ann_index": None,
+        "all_product_ids": product_ids,
+        "user_index": {uid: i for i, uid in enumerate(user_ids)}
+    }
+    ctx.components.reload("recommender", lambda: rec)
+    sample = _sample_buyers(ctx)
+    return _get_all(ctx, [f"/recommend/{uid}" for uid in sample]), len(sample)
+
+
+def bench_recommend_similar(ctx) -> Tuple[Callable, int]:
+    from item_similarity import ItemSimilarityIndex, build_item_index
+
+    build_item_index(snapshot(ctx), out_dir=ctx.workdir)
+    ctx.components.reload("item_similarity", lambda: ItemSimilarityIndex.load(ctx.workdir))
+    ctx.components.reload("recommender", lambda: None)  # mọi user đều "chưa có trong model"
+    sample = _sample_buyers(ctx)
+    return _get_all(ctx, [f"/recommend/{uid}" for uid in sample]), len(sample)
+
+
+def _business_strategy():
+    try:
+        import business_strategy
+    except ImportError as e:
+        raise BenchSkipped(f"không import được business_strategy ({e.name} chưa cài)")
+    return business_strategy
+
+
+def bench_weighted_scores(ctx) -> Tuple[Callable, int]:
+    bs = _business_strategy()
+    docs = list(ctx.db["products"].find({"is_deleted": False}, {"nameProduct": 1}))
+    product_ids = [str(d["_id"]) for d in docs]
+    kw_map = {}
+    for d in docs:
+        kw = next((f for f in FLOWERS if f in d["nameProduct"]), None)
+        if kw:
+            kw_map[str(d["_id"])] = kw
+    growth = ctx.rng.normal(0, 30, size=len(product_ids))
+    forecast_result = [{"productId": pid, "forecast_growth_pct": float(g)} for pid, g in zip(product_ids, growth)]
+    trends = {"avg_interest": {kw: float(v) for kw, v in zip(FLOWERS, ctx.rng.uniform(0, 100, len(FLOWERS)))}}
+    today = date(2025, 2, 10)
+
+    def run():
+        return bs.compute_weighted_scores(product_ids, forecast_result, trends, kw_map, today=today)
+    return run, 1
+
+
+def bench_prophet(ctx) -> Tuple[Callable, int]:
+    bs = _business_strategy()
+    if importlib.util.find_spec("prophet") is None:
+        raise BenchSkipped("prophet chưa cài")
+    snap = snapshot(ctx)
+    df = pd.DataFrame({
+        "date": snap.order_created[snap.line_order].astype("datetime64[D]"),
+        "productId": snap.product_ids[snap.line_product],
+        "qty": np.nan_to_num(snap.line_quantity, nan=1.0)
+    })
+    top = df.groupby("productId")["qty"].sum().nlargest(ctx.args.prophet_products).index
+    sales_df = df[df["productId"].isin(top)].groupby(["date", "productId"], as_index=False)["qty"].sum()
+    ctx.extra_info["days_per_series"] = round(float(sales_df.groupby("productId").size().mean()), 1)
+
+    def run():
+        # = bs.train_prophet_per_product nhưng không đọc / ghi prophet_cache.pkl
+        engine = bs.ProphetEngine(periods=30, freq="D", workers=ctx.args.prophet_workers, cache_path=None)
+        return engine.run(sales_df)
+    return run, len(top)
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "run_forecast[cold]": bench_forecast_cold,
+    "run_forecast[warm]": bench_forecast_warm,
+    "get_predicted_leads": bench_leads,
+    "recommend_user[deep]": bench_recommend_deep,
+    "recommend_user[similar]": bench_recommend_similar,
+    "compute_weighted_scores": bench_weighted_scores,
+    "train_prophet_per_product": bench_prophet
+}
+
+
+# ---------------------------
+# Fixture + test (pytest-benchmark)
+# ---------------------------
+@pytest.fixture(scope="session")
+def bench_env(request):
+    """Server import 1 lần cho cả phiên, cwd = thư mục tạm."""
+    options = request.config.option
+    workdir = tempfile.mkdtemp(prefix="ml_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        server = import_server(options.bench_uri)
+        from components import components
+        yield SimpleNamespace(server=server, components=components, workdir=workdir,
+                              mongo=synthetic_data.connect(options.bench_uri))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def ctx(bench_env, n_lines, request):
+    """Db giả lập n_lines dòng (sinh 1 lần cho mọi benchmark cùng kích thước), server trỏ vào db đó."""
+    options = request.config.option
+    db = bench_env.mongo[options.bench_db]
+    summary = synthetic_data.generate(db, n_lines, seed=options.bench_seed)
+    print(f"\n📦 {n_lines} dòng: {summary['orders']} đơn, {summary['users']} user, "
+          f"{summary['products']} sản phẩm (sinh trong {summary['seconds']}s)")
+    point_server_at(bench_env.server, db)
+    args = SimpleNamespace(seed=options.bench_seed, requests=options.bench_requests,
+                           prophet_products=options.prophet_products, prophet_workers=options.prophet_workers)
+    yield SimpleNamespace(server=bench_env.server, components=bench_env.components,
+                          client=bench_env.server.app.test_client(), db=db, workdir=bench_env.workdir,
+                          args=args, rng=np.random.default_rng(options.bench_seed), snapshot=None,
+                          n_lines=n_lines, extra_info={})
+    db.client.drop_database(options.bench_db)
+
+
+def run_benchmark(benchmark, ctx, bench: Callable) -> None:
+    ctx.extra_info = {}  # thông tin thêm riêng của từng benchmark
+    try:
+        run, ops = bench(ctx)
+    except BenchSkipped as e:
+        pytest.skip(str(e))
+    benchmark.group = f"{ctx.n_lines} dòng"
+    benchmark.extra_info.update({"ops": ops, "lines": ctx.n_lines, **ctx.extra_info})
+    benchmark(run)
+
+
+@pytest.mark.parametrize("name", list(BENCHMARKS))
+def test_bench(benchmark, ctx, name):
+    run_benchmark(benchmark, ctx, BENCHMARKS[name])
@@ -0,0 +1,40 @@
+# conftest.py
+"""
+Tùy chọn dòng lệnh của bench_suite.py (python -m pytest benchmarks/bench_suite.py ...).
+Baseline pytest-benchmark mặc định lưu / so sánh trong benchmarks/baselines thay vì ./.benchmarks.
+"""
+
+import os
+import sys
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+DEFAULT_STORAGE = "file://./.benchmarks"
+
+if ML_DIR not in sys.path:
+    sys.path.insert(0, ML_DIR)
+
+from benchmarks import synthetic_data  # noqa: E402  (cần ML_DIR trong sys.path)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("ml-bench")
+    group.addoption("--bench-sizes", type=int, nargs="+", default=[1000, 10000], help="số dòng sản phẩm trong đơn")
+    group.addoption("--bench-uri", default="mongomock://", help='"mongomock://" hoặc URI mongod cục bộ')
+    group.addoption("--bench-db", default=synthetic_data.DEFAULT_DB)
+    group.addoption("--bench-seed", type=int, default=42)
+    group.addoption("--bench-requests", type=int, default=50, help="số user / lượt cho recommend_user")
+    group.addoption("--prophet-products", type=int, default=10)
+    group.addoption("--prophet-workers", type=int, default=None)
+
+
+def pytest_configure(config):
+    # Chạy trước pytest_configure (trylast) của pytest-benchmark, nơi storage được mở
+    if getattr(config.option, "benchmark_storage", None) == DEFAULT_STORAGE:
+        config.option.benchmark_storage = "file://" + BASELINE_DIR
+
+
+def pytest_generate_tests(metafunc):
+    if "n_lines" in metafunc.fixturenames:
+        sizes = metafunc.config.getoption("bench_sizes")
+        metafunc.parametrize("n_lines", sizes, ids=[str(n) for n in sizes], scope="session")
@@ -0,0 +1,278 @@
+# synthetic_data.py
+"""
+Sinh dữ liệu giả lập users / products / orders theo đúng schema mà ml-model đọc
+(createdAt, products[].productId, products[].quantity, total, role, ...) để đo hiệu năng ở quy mô lớn.
+
+Chạy (trong thư mục ml-model):
+    python -m benchmarks.synthetic_data --lines 1000000
+    python -m benchmarks.synthetic_data --lines 10000000 --uri mongodb://localhost:27017 --db ml_bench
+    python -m benchmarks.synthetic_data --lines 10000 --uri mongomock://      # chỉ đo thời gian sinh
+
+- Cùng --seed → cùng dữ liệu (kể cả ObjectId: 4 byte thời gian tạo + loại + số thứ tự),
+  _id đơn hàng tăng theo createdAt như ObjectId thật (sales_aggregate.py dựa vào điều này).
+- Kích thước tính theo số dòng sản phẩm trong đơn (line item), 1k → 10M:
+  ~N/2.2 đơn, N/6 user, N/40 sản phẩm (20 → 20000).
+- Phân phối: độ phổ biến sản phẩm kiểu Zipf, vài khách mua rất nhiều (lognormal), nhiều khách
+  không có đơn; ngày đặt tăng dần theo thời gian + đỉnh mùa hoa (14/2, 8/3, 20/10, 20/11, Tết);
+  số lượng chủ yếu 1–2; vai trò ~99% customer, còn lại staff/admin.
+- Ghi theo lô `insert_many` (--batch-size đơn) → bộ nhớ không phụ thuộc tổng số đơn.
+- Không ghi vào db "test" / "marathon" (dữ liệu thật của server và script train).
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from bson.objectid import ObjectId
+
+from benchmarks.bench_chat_context import COLORS, FLOWERS, KINDS
+
+PROTECTED_DBS = {"test", "marathon"}
+DEFAULT_DB = "ml_bench"
+
+LINES_PER_ORDER = np.array([1, 2, 3, 4, 5])
+LINES_PER_ORDER_P = np.array([0.35, 0.30, 0.20, 0.10, 0.05])    # trung bình ~2.2 dòng / đơn
+QUANTITY = np.array([1, 2, 3, 4, 5])
+QUANTITY_P = np.array([0.72, 0.18, 0.06, 0.03, 0.01])
+STATUSES = np.array(["completed", "delivery", "confirmed", "pending", "cancelled"])
+STATUSES_P = np.array([0.70, 0.08, 0.07, 0.07, 0.08])
+SIZES = ["S", "M", "L"]
+# (tháng, ngày, hệ số) — ngày cao điểm của shop hoa, ảnh hưởng ±5 ngày trước đó
+PEAKS = [(2, 14, 6.0), (3, 8, 4.0), (10, 20, 4.0), (11, 20, 3.0), (1, 25, 3.0), (12, 24, 2.0)]
+STREETS = ["Lê Lợi", "Nguyễn Huệ", "Trần Hưng Đạo", "Hai Bà Trưng", "Lý Thường Kiệt", "Pasteur"]
+DISTRICTS = ["Quận 1", "Quận 3", "Quận 7", "Bình Thạnh", "Thủ Đức", "Hoàn Kiếm", "Cầu Giấy"]
+
+_KIND_USER, _KIND_PRODUCT, _KIND_ORDER = 1, 2, 3
+EPOCH = datetime(1970, 1, 1)  # createdAt lưu dạng UTC không tz như mongoose
+
+
+# ---------------------------
+# Helpers
+# ---------------------------
+def connect(uri: str):
+    """MongoClient theo URI; "mongomock://" → mongomock trong RAM (chỉ dùng để thử / benchmark)."""
+    if uri.startswith("mongomock://"):
+        import mongomock
+        return mongomock.MongoClient()
+    from pymongo import MongoClient
+    return MongoClient(uri)
+
+
+def epoch_seconds(value: datetime) -> int:
+    return int((value - EPOCH).total_seconds())
+
+
+def from_epoch(seconds) -> datetime:
+    return EPOCH + timedelta(seconds=int(seconds))
+
+
+def object_id(created: datetime, kind: int, seq: int) -> ObjectId:
+    """ObjectId tất định: 4 byte thời gian tạo + 1 byte loại + 7 byte số thứ tự."""
+    return ObjectId(epoch_seconds(created).to_bytes(4, "big") + kind.to_bytes(1, "big")
+                    + int(seq).to_bytes(7, "big"))
+
+
+def sizes_for(n_lines: int) -> dict:
+    return {
+        "users": max(20, n_lines // 6),
+        "products": int(np.clip(n_lines // 40, 20, 20000))
+    }
+
+
+def day_weights(start: datetime, days: int) -> np.ndarray:
+    """Xác suất đặt hàng theo ngày: tăng ~40%/năm + đỉnh ngày lễ (tăng dần tới ngày lễ)."""
+    dates = [start + timedelta(days=d) for d in range(days)]
+    w = 1.0 + 0.4 * np.arange(days) / 365.0
+    for month, day, factor in PEAKS:
+        for i, d in enumerate(dates):
+            try:
+                gap = (d.replace(month=month, day=day) - d).days
+            except ValueError:
+                continue
+            if 0 <= gap <= 5:
+                w[i] += factor * (1 - gap / 6)
+    return w / w.sum()
+
+
+def order_layout(n_lines: int, rng: np.random.Generator) -> np.ndarray:
+    """Số dòng của từng đơn, tổng đúng bằng n_lines."""
+    guess = int(n_lines / (LINES_PER_ORDER * LINES_PER_ORDER_P).sum() * 1.1) + 10
+    per_order = rng.choice(LINES_PER_ORDER, size=guess, p=LINES_PER_ORDER_P)
+    cum = np.cumsum(per_order)
+    n_orders = int(np.searchsorted(cum, n_lines)) + 1
+    per_order = per_order[:n_orders]
+    per_order[-1] -= int(cum[n_orders - 1] - n_lines)
+    return per_order
+
+
+# ---------------------------
+# Generate
+# ---------------------------
+def make_products(n: int, rng: np.random.Generator, start: datetime) -> list:
+    docs = []
+    for i in range(n):
+        flower = FLOWERS[rng.integers(len(FLOWERS))]
+        color = COLORS[rng.integers(len(COLORS))]
+        kind = KINDS[rng.integers(len(KINDS))]
+        created = start + timedelta(days=int(rng.integers(0, 60)))
+        docs.append({
+            "_id": object_id(created, _KIND_PRODUCT, i),
+            "nameProduct": f"{kind.capitalize()} {flower} {color} #{i}",
+            "price": int(rng.integers(200, 3000)) * 1000,
+            "sale": int(rng.choice([0, 0, 0, 50000, 100000])),
+            "desc": f"{kind.capitalize()} {flower} màu {color}, giao nhanh nội thành.",
+            "images": [{"url": f"https://picsum.photos/seed/p{i}/600", "public_id": f"bench/p{i}"}],
+            "colors": [color],
+            "is_deleted": bool(rng.random() < 0.02),
+            "createdAt": created,
+            "updatedAt": created
+        })
+    return docs
+
+
+def make_users(roles: np.ndarray, first_order: np.ndarray, rng: np.random.Generator,
+               start: datetime, end: datetime) -> list:
+    """first_order: giây epoch của đơn đầu tiên mỗi user (-1 nếu không có đơn);
+    tài khoản luôn được tạo trước đơn đầu tiên."""
+    n = len(roles)
+    lead_in = 90 * 86400
+    span = epoch_seconds(end) - epoch_seconds(start) + lead_in
+    created = epoch_seconds(start) - lead_in + rng.integers(0, span, size=n)
+    has_order = first_order >= 0
+    before_first = first_order[has_order] - rng.integers(0, 30 * 86400, size=int(has_order.sum()))
+    created[has_order] = np.minimum(created[has_order], before_first)
+    docs = []
+    for i in range(n):
+        created_at = from_epoch(created[i])
+        docs.append({
+            "_id": object_id(created_at, _KIND_USER, i),
+            "email": f"user{i}@example.com",
+            "password": "$2b$10$bench",
+            "fullname": f"Khách {i}",
+            "phone": f"09{i:08d}"[-10:],
+            "address": f"{rng.integers(1, 300)} {STREETS[i % len(STREETS)]}, {DISTRICTS[i % len(DISTRICTS)]}",
+            "role": str(roles[i]),
+            "status": "active",
+            "createdAt": created_at,
+            "updatedAt": created_at
+        })
+    return docs
+
+
+def generate(db, n_lines: int, seed: int = 42, end: Optional[datetime] = None, months: int = 24,
+             batch_size: int = 10000, drop: bool = True) -> dict:
+    """Ghi users / products / orders giả lập vào `db`. Return: số bản ghi + thời gian."""
+    if db.name in PROTECTED_DBS:
+        raise ValueError(f"❌ Không ghi dữ liệu giả lập vào db '{db.name}'")
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    end = (end or datetime(2025, 6, 30)).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = months * 30
+    start = end - timedelta(days=days)
+    counts = sizes_for(n_lines)
+
+    if drop:
+        for name in ("users", "products", "orders"):
+            db[name].drop()
+
+    # Sản phẩm: độ phổ biến Zipf theo thứ hạng ngẫu nhiên
+    products = make_products(counts["products"], rng, start)
+    popularity = 1.0 / (1 + rng.permutation(len(products))) ** 1.1
+    popularity /= popularity.sum()
+    unit_price = np.array([p["price"] - p["sale"] for p in products])
+    db["products"].insert_many(products)
+
+    # Bố cục đơn (số dòng, ngày đặt tăng dần, người mua) — vài triệu số nguyên, giữ trong RAM được
+    per_order = order_layout(n_lines, rng)
+    n_orders = len(per_order)
+    day = rng.choice(days, size=n_orders, p=day_weights(start, days))
+    order_ts = np.sort(epoch_seconds(start) + day * 86400 + rng.integers(0, 86400, size=n_orders))
+    roles = rng.choice(np.array(["customer", "staff", "admin"]), size=counts["users"], p=[0.988, 0.01, 0.002])
+    roles[0] = "admin"
+    activity = rng.lognormal(0, 1.5, size=counts["users"])
+    activity[roles != "customer"] = 0.0  # chỉ khách hàng đặt đơn
+    buyer = rng.choice(counts["users"], size=n_orders, p=activity / activity.sum())
+
+    first_order = np.full(counts["users"], np.iinfo(np.int64).max)
+    np.minimum.at(first_order, buyer, order_ts)
+    first_order[first_order == np.iinfo(np.int64).max] = -1
+    users = make_users(roles, first_order, rng, start, end)
+    for i in range(0, len(users), batch_size):
+        db["users"].insert_many(users[i:i + batch_size])
+    user_ids = [u["_id"] for u in users]
+    user_info = [(u["fullname"], u["email"], u["phone"], u["address"]) for u in users]
+    del users
+
+    total_lines = 0
+    for lo in range(0, n_orders, batch_size):
+        hi = min(lo + batch_size, n_orders)
+        n_batch_lines = int(per_order[lo:hi].sum())
+        line_product = rng.choice(len(products), size=n_batch_lines, p=popularity)
+        line_qty = rng.choice(QUANTITY, size=n_batch_lines, p=QUANTITY_P)
+        status = rng.choice(STATUSES, size=hi - lo, p=STATUSES_P)
+        cod = rng.random(hi - lo) < 0.6
+        docs, pos = [], 0
+        for j, i in enumerate(range(lo, hi)):
+            created = from_epoch(order_ts[i])
+            lines = []
+            for _ in range(per_order[i]):
+                p = line_product[pos]
+                lines.append({
+                    "productId": products[p]["_id"],
+                    "quantity": int(line_qty[pos]),
+                    "size": SIZES[p % len(SIZES)],
+                    "color": products[p]["colors"][0],
+                    "price": int(unit_price[p])
+                })
+                pos += 1
+            subtotal = sum(line["price"] * line["quantity"] for line in lines)
+            shipping = 0 if subtotal >= 1000000 else 30000
+            name, email, phone, address = user_info[buyer[i]]
+            docs.append({
+                "_id": object_id(created, _KIND_ORDER, i),
+                "userId": user_ids[buyer[i]],
+                "status": str(status[j]),
+                "note": "",
+                "paymentMethod": "cod" if cod[j] else "vnpay",
+                "total": subtotal + shipping,
+                "products": lines,
+                "infoOrderShipping": {"name": name, "email": email, "phone": phone, "address": address},
+                "priceShipping": shipping,
+                "reasonCancel": "Khách đổi ý" if status[j] == "cancelled" else "",
+                "createdAt": created,
+                "updatedAt": created
+            })
+        db["orders"].insert_many(docs, ordered=False)
+        total_lines += n_batch_lines
+
+    return {
+        "lines": total_lines,
+        "orders": int(n_orders),
+        "users": counts["users"],
+        "products": counts["products"],
+        "seed": seed,
+        "seconds": round(time.perf_counter() - t0, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=100000, help="tổng số dòng sản phẩm trong đơn")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help='hoặc "mongomock://"')
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    db = connect(args.uri)[args.db]
+    print(f"⏳ Sinh {args.lines} dòng đơn hàng vào {args.db} ({args.uri})...")
+    summary = generate(db, args.lines, seed=args.seed, months=args.months, batch_size=args.batch_size)
+    print(f"✅ {summary['orders']} đơn / {summary['lines']} dòng, {summary['users']} user, "
+          f"{summary['products']} sản phẩm trong {summary['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,22 +20,22 @@ Ghi chú:
 """
 
 import json
-from datetime import datetime, timedelta, date
-from statistics import mean
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
 from typing import Dict, List, Optional
 
 import numpy as np
 import pandas as pd
-import requests
-
-# Prophet (tên gói mới là 'prophet'; fallback 'fbprophet' cho môi trường cũ)
-try:
-    from prophet import Prophet
-except Exception:
-    from fbprophet import Prophet  # type: ignore
 
 from pytrends.request import TrendReq
 
+# Shopee (best-effort; endpoint không chính thức) — lấy song song, xem shopee_client.py
+from shopee_client import fetch_shopee_data, fetch_shopee_for_keyword  # noqa: F401
+# Prophet chạy song song nhiều process + cache theo sản phẩm, xem prophet_engine.py
+from prophet_engine import ProphetEngine
+# Chấm điểm trên mảng NumPy + lịch mùa vụ tính sẵn, xem scoring_engine.py
+from scoring_engine import ScoringEngine, minmax_scale_array, seasonality_on, to_float_array
+
 
 # ---------------------------
 # Google Trends
@@ -110,133 +110,16 @@ def fetch_google_trends(keywords: List[str], timeframe: str = "today 12-m", geo:
     return result
 
 
-# ---------------------------
-# Shopee (best-effort; endpoint không chính thức)
-# ---------------------------
-def fetch_shopee_for_keyword(keyword: str, limit: int = 50, timeout: int = 8) -> dict:
-    url = "https://shopee.vn/api/v4/search/search_items"
-    params = {"by": "pop", "limit": limit, "order": "desc", "keyword": keyword}
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-        ),
-        "Accept": "application/json, text/plain, */*",
-        # Thay cookie thật từ trình duyệt của bạn nếu bị 403
-        "Cookie": "SPC_ST=FAKE_COOKIE_VALUE"
-    }
-
-    out = {
-        "keyword": keyword,
-        "items_count": 0,
-        "avg_price_vnd": None,
-        "top_products": [],
-        "top_shops": []
-    }
-
-    try:
-        resp = requests.get(url, params=params, headers=headers, timeout=timeout)
-        if resp.status_code == 403:
-            print(f"[fetch_shopee_for_keyword] 403 blocked '{keyword}', trả về rỗng.")
-            return out
-        resp.raise_for_status()
-        data = resp.json()
-        items = data.get("items") or []
-        if not items:
-            return out
-
-        prices = []
-        products = []
-        shop_counts = {}
-        for it in items:
-            basic = it.get("item_basic") or {}
-
-            # Shopee thường scale price * 100000
-            price_raw = basic.get("price") or basic.get("price_min") or basic.get("price_max")
-            price_vnd = price_raw / 100000 if price_raw else None
-
-            sold = basic.get("sold", None)
-            if sold is None:
-                sold = basic.get("historical_sold", 0)
-
-            shopid = basic.get("shopid")
-            products.append({
-                "name": basic.get("name"),
-                "price_vnd": price_vnd,
-                "sold": sold,
-                "shopid": shopid,
-                "shop_location": basic.get("shop_location")
-            })
-            if price_vnd:
-                prices.append(price_vnd)
-            if shopid:
-                shop_counts[shopid] = shop_counts.get(shopid, 0) + 1
-
-        out["items_count"] = len(items)
-        out["avg_price_vnd"] = round(mean(prices), 0) if prices else None
-        out["top_products"] = sorted(products, key=lambda x: (x["sold"] or 0), reverse=True)[:10]
-        out["top_shops"] = [{"shopid": sid, "count": cnt}
-                            for sid, cnt in sorted(shop_counts.items(), key=lambda x: x[1], reverse=True)[:10]]
-    except Exception as e:
-        print(f"[fetch_shopee_for_keyword] Error '{keyword}': {e}")
-
-    return out
-
-
-def fetch_shopee_data(keywords: List[str], per_kw_limit: int = 50) -> dict:
-    return {kw: fetch_shopee_for_keyword(kw, limit=per_kw_limit) for kw in keywords}
-
-
 # ---------------------------
 # Seasonality helpers
 # ---------------------------
-def _second_sunday_of_may(year: int) -> date:
-    d = date(year, 5, 1)
-    # weekday(): Monday=0 ... Sunday=6
-    offset = (6 - d.weekday()) % 7
-    first_sun = d + timedelta(days=offset)
-    return first_sun + timedelta(days=7)
-
-
 def seasonality_score(today: Optional[date] = None) -> float:
-    """Điểm mùa vụ [0,1] cho ngành hoa VN.
+    """Điểm mùa vụ [0,1] cho ngành hoa VN (tra lịch mùa vụ tính sẵn, xem scoring_engine.py).
     Đỉnh: Tết (xấp xỉ), 14/2, 8/3, Mother's Day (CN thứ 2 tháng 5), 20/11, mùa cưới 9–3.
     """
     if today is None:
         today = date.today()
-    yr = today.year
-
-    valentines = date(yr, 2, 14)
-    women_day = date(yr, 3, 8)
-    mothers_day = _second_sunday_of_may(yr)
-    teachers_day = date(yr, 11, 20)
-
-    # Xấp xỉ Tết: 20/1 → 15/2
-    tet_window = (date(yr, 1, 20), date(yr, 2, 15))
-
-    # Mùa cưới: 9→3
-    wedding_months = {9, 10, 11, 12, 1, 2, 3}
-
-    score = 0.0
-
-    def bump(peak_date: date, window_days: int = 7, weight: float = 0.25):
-        nonlocal score
-        if abs((today - peak_date).days) <= window_days:
-            score += weight
-
-    # Tết nặng điểm hơn
-    if tet_window[0] <= today <= tet_window[1]:
-        score += 0.35
-
-    bump(valentines, window_days=5, weight=0.2)
-    bump(women_day, window_days=5, weight=0.2)
-    bump(mothers_day, window_days=5, weight=0.15)
-    bump(teachers_day, window_days=5, weight=0.2)
-
-    if today.month in wedding_months:
-        score += 0.15
-
-    return float(min(1.0, score))
+    return seasonality_on(today)
 
 
 # ---------------------------
@@ -244,8 +127,11 @@ def seasonality_score(today: Optional[date] = None) -> float:
 # ---------------------------
 def fetch_market_data() -> dict:
     keywords = ["hoa tươi", "hoa cưới", "hoa nhập khẩu", "hoa giá rẻ", "shop hoa online"]
-    gt = fetch_google_trends(keywords)
-    shopee_stats = fetch_shopee_data(["hoa", "hoa tươi", "hoa cưới"])
+    # Google Trends và Shopee độc lập nhau → chạy song song
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        gt_future = pool.submit(fetch_google_trends, keywords)
+        shopee_future = pool.submit(fetch_shopee_data, ["hoa", "hoa tươi", "hoa cưới"])
+        gt, shopee_stats = gt_future.result(), shopee_future.result()
 
     hoa_interest = gt["avg_interest"].get("hoa tươi")
     interest_text = f"chỉ số quan tâm ~{hoa_interest}" if hoa_interest else "mức quan tâm online trung bình"
@@ -292,67 +178,14 @@ def fetch_market_data() -> dict:
 # ---------------------------
 # Prophet forecasting
 # ---------------------------
-def train_prophet_per_product(sales_df: pd.DataFrame, periods: int = 30, freq: str = 'D') -> List[dict]:
+def train_prophet_per_product(sales_df: pd.DataFrame, periods: int = 30, freq: str = 'D',
+                              workers: Optional[int] = None) -> List[dict]:
     """Huấn luyện Prophet cho từng product và trả về forecast + tăng trưởng.
     sales_df cột: ['date', 'productId', 'qty']
     Return: list dict: productId, forecast_next_period_sum, last_period_sum, forecast_growth_pct
+    Chạy song song nhiều process + cache theo sản phẩm (xem prophet_engine.py).
     """
-    required = {"date", "productId", "qty"}
-    if not required.issubset(set(sales_df.columns)):
-        raise ValueError("sales_df cần các cột: date, productId, qty")
-
-    df = sales_df.copy()
-    df["date"] = pd.to_datetime(df["date"])
-    df = df.sort_values(["productId", "date"])
-
-    horizon = periods
-    results = []
-
-    for pid, grp in df.groupby("productId"):
-        # Tổng theo ngày
-        daily = grp.groupby("date", as_index=False)["qty"].sum()
-        daily = daily.rename(columns={"date": "ds", "qty": "y"})
-
-        if len(daily) < 10:
-            results.append({
-                "productId": pid,
-                "status": "insufficient_data",
-                "forecast_next_period_sum": None,
-                "last_period_sum": None,
-                "forecast_growth_pct": None
-            })
-            continue
-
-        m = Prophet(growth='linear', yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
-        m.fit(daily)
-
-        future = m.make_future_dataframe(periods=horizon, freq=freq, include_history=True)
-        fcst = m.predict(future)
-
-        history_end = daily["ds"].max()
-        hist_window_start = history_end - pd.Timedelta(days=horizon - 1)
-
-        last_hist = fcst[(fcst["ds"] >= hist_window_start) & (fcst["ds"] <= history_end)]
-        next_window_start = history_end + pd.Timedelta(days=1)
-        next_window_end = history_end + pd.Timedelta(days=horizon)
-        next_fcst = fcst[(fcst["ds"] >= next_window_start) & (fcst["ds"] <= next_window_end)]
-
-        last_sum = float(daily[(daily["ds"] >= hist_window_start) & (daily["ds"] <= history_end)]["y"].sum())
-        next_sum = float(next_fcst["yhat"].sum()) if not next_fcst.empty else None
-
-        growth_pct = None
-        if next_sum is not None and last_sum > 0:
-            growth_pct = (next_sum - last_sum) / last_sum * 100.0
-
-        results.append({
-            "productId": pid,
-            "status": "ok",
-            "forecast_next_period_sum": None if next_sum is None else round(next_sum, 2),
-            "last_period_sum": round(last_sum, 2),
-            "forecast_growth_pct": None if growth_pct is None else round(growth_pct, 2)
-        })
-
-    return results
+    return ProphetEngine(periods=periods, freq=freq, workers=workers).run(sales_df)
 
 
 # ---------------------------
@@ -360,19 +193,7 @@ def train_prophet_per_product(sales_df: pd.DataFrame, periods: int = 30, freq: s
 # ---------------------------
 def minmax_scale(values: List[Optional[float]]) -> List[float]:
     """Scale [0,1], bỏ qua None (None → 0)."""
-    clean = [v for v in values if v is not None]
-    if not clean:
-        return [0.0 for _ in values]
-    vmin, vmax = min(clean), max(clean)
-    if vmin == vmax:
-        return [0.5 if v is not None else 0.0 for v in values]
-
-    def _s(v):
-        if v is None:
-            return 0.0
-        return (v - vmin) / (vmax - vmin)
-
-    return [_s(v) for v in values]
+    return minmax_scale_array(to_float_array(values)).tolist()
 
 
 def compute_weighted_scores(
@@ -383,43 +204,42 @@ def compute_weighted_scores(
     w_forecast: float = 0.5,
     w_trend: float = 0.3,
     w_season: float = 0.2,
-    today: Optional[date] = None
+    today: Optional[date] = None,
+    k: Optional[int] = None
 ) -> List[dict]:
-    """Ghép forecast growth + Trends avg_interest + seasonality thành 1 điểm cho mỗi sản phẩm."""
+    """Ghép forecast growth + Trends avg_interest + seasonality thành 1 điểm cho mỗi sản phẩm.
+    k: chỉ trả về k sản phẩm điểm cao nhất (None = mọi sản phẩm, như bản cũ).
+    Chi phí O(N) cho mỗi lần gọi (đổi forecast_result / kw_map sang mảng) — thử nhiều bộ trọng số
+    (what-if sweep) thì dựng ScoringEngine 1 lần rồi gọi sweep / sweep_top_k, đừng gọi hàm này lặp lại.
+    """
     if today is None:
         today = date.today()
 
     # 1) Forecast growth theo product
     growth_map = {d["productId"]: d.get("forecast_growth_pct") for d in forecast_result}
-    growth_list = [growth_map.get(pid) for pid in product_ids]
-    growth_scaled = minmax_scale(growth_list)
+    growth = to_float_array([growth_map.get(pid) for pid in product_ids])
 
-    # 2) Trend interest map theo từ khóa của từng product
+    # 2) Trend interest theo từ khóa của từng product (giá trị không phải số → thiếu)
     kw_map = product_kw_map or {}
-    avg_interest = trends.get("avg_interest", {})
-    trend_vals = []
-    for pid in product_ids:
-        kw = kw_map.get(pid)
-        val = avg_interest.get(kw) if kw else None
-        trend_vals.append(val if isinstance(val, (int, float)) else None)
-    trend_scaled = minmax_scale(trend_vals)
+    avg_interest = {kw: val for kw, val in trends.get("avg_interest", {}).items()
+                    if kw and isinstance(val, (int, float))}
+    trend = to_float_array([avg_interest.get(kw_map.get(pid)) for pid in product_ids])
 
     # 3) Seasonality — cùng giá trị cho mọi sản phẩm (yếu tố ngành)
     season = seasonality_score(today=today)
 
-    # 4) Tính điểm
-    scores = []
-    for i, pid in enumerate(product_ids):
-        s = w_forecast * growth_scaled[i] + w_trend * trend_scaled[i] + w_season * season
-        scores.append({
-            "productId": pid,
-            "forecast_growth_pct": growth_list[i],
-            "trend_avg_interest": trend_vals[i],
-            "seasonality": round(season, 3),
-            "score": round(float(s), 4)
-        })
-    scores.sort(key=lambda x: x["score"], reverse=True)
-    return scores
+    # 4) Tính điểm trên mảng (scoring_engine); chỉ dựng dict cho các sản phẩm được trả về
+    engine = ScoringEngine(product_ids, growth, trend)
+    order, score_arr = engine.ranked(k, decimals=4, w_forecast=w_forecast, w_trend=w_trend,
+                                     w_season=w_season, season=season)
+    season_rounded = round(season, 3)
+    return [{
+        "productId": product_ids[i],
+        "forecast_growth_pct": growth_map.get(product_ids[i]),
+        "trend_avg_interest": avg_interest.get(kw_map.get(product_ids[i])),
+        "seasonality": season_rounded,
+        "score": float(score_arr[i])
+    } for i in order]
 
 
 # ---------------------------
@@ -1,10 +1,18 @@
 # chatbot.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_cors import CORS, cross_origin
+import hashlib
+import json
 import os
+from typing import Optional
 import google.generativeai as genai
 from dotenv import load_dotenv
-from pymongo import MongoClient
+
+from components import ComponentNotReady, components
+import product_catalog  # noqa: F401  (đăng ký component "product_catalog")
+from product_retriever import ProductRetriever, normalize_text, product_line
+from ttl_cache import LRUCache
+from llm_gateway import GatewayBusy, GatewayTimeout, LLMGateway
 
 # === Load biến môi trường
 load_dotenv()
@@ -17,11 +25,6 @@ if not api_key or not mongo_uri:
 genai.configure(api_key=api_key)
 model = genai.GenerativeModel("models/gemini-1.5-flash")
 
-# === Kết nối MongoDB
-client = MongoClient(mongo_uri)
-db = client["test"]
-products = db["products"]
-
 # === Tạo blueprint
 chatbot_api = Blueprint("chatbot_api", __name__)
 CORS(chatbot_api, supports_credentials=True, resources={r"/*": {"origins": ["http://localhost:4200"]}})
@@ -39,27 +42,71 @@ system_prompt = (
     "- Hotline: 0773 715 827\n"
     "- Website: https://dashstack.vn\n"
     "- Chính sách: Đổi trả trong 7 ngày, giao hàng toàn quốc.\n\n"
-    "Dưới đây là danh sách sản phẩm hiện có:\n"
+    "Dưới đây là các sản phẩm hiện có liên quan nhất tới câu hỏi:\n"
 )
 
+# Context sản phẩm theo từng câu hỏi: chỉ top-k sản phẩm liên quan (BM25), trong ngân sách token.
+# Retriever là component "chat_index", dựng trên component "product_catalog" ở thread nền.
+def load_product_index() -> ProductRetriever:
+    """Load catalog + dựng index BM25 trước để request /chat đầu tiên không phải chờ."""
+    catalog = components.wait("product_catalog")
+    if catalog is None:
+        raise RuntimeError("Catalog sản phẩm chưa khởi tạo được")
+    retriever = ProductRetriever(
+        catalog,
+        top_k=int(os.getenv("CHAT_CONTEXT_TOP_K", "8")),
+        token_budget=int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "1500"))
+    )
+    retriever.refresh()
+    return retriever
+
+components.register("chat_index", load_product_index)
+
 def build_product_context():
-    context_lines = []
-    for p in products.find({"is_deleted": False}):
-        name = p.get("nameProduct", "Tên không rõ")
-        price = p.get("price", 0)
-        sale = p.get("sale", 0)
-        desc = p.get("desc", "Không có mô tả")
+    """Toàn bộ catalog (cách cũ) — giữ lại để so sánh / debug."""
+    return "\n".join(product_line(p) for p in components.require("product_catalog").list_active())
+
+def get_product_context(question: str) -> str:
+    """Đang dựng index → ComponentNotReady (503); dựng lỗi → không kèm sản phẩm, vẫn trả lời được
+    các câu hỏi về cửa hàng."""
+    retriever = components.require("chat_index")
+    return retriever.context_for(question) if retriever else ""
+
+# === Cache câu trả lời: câu hỏi lặp lại gần như nguyên văn ("giờ mở cửa", "giao hàng", ...)
+# Khóa = câu hỏi đã chuẩn hóa (chữ thường, bỏ dấu, gộp khoảng trắng) + hash context sản phẩm,
+# nên sản phẩm liên quan đổi giá/mô tả → khóa đổi; catalog đổi phiên bản → xóa cache.
+response_cache = LRUCache(
+    maxsize=int(os.getenv("CHAT_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("CHAT_CACHE_TTL", "3600"))
+)
+_cache_state = {"catalog_version": None, "stream_disconnects": 0}
+
+# === Gateway gọi Gemini: tối đa LLM_MAX_CONCURRENCY lời gọi cùng lúc, chờ slot tối đa
+# LLM_QUEUE_TIMEOUT giây (quá → 503), mỗi lời gọi tối đa LLM_CALL_TIMEOUT giây (quá → 504),
+# tối đa LLM_MAX_WAITING request chat giữ worker cùng lúc (đặt nhỏ hơn số worker của server)
+gateway = LLMGateway(
+    max_concurrent=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "2")),
+    call_timeout=float(os.getenv("LLM_CALL_TIMEOUT", "30")),
+    max_waiting=int(os.getenv("LLM_MAX_WAITING", "8"))
+)
 
-        if sale > 0:
-            new_price = price - sale
-            price_info = f"Giá gốc {price}₫, giảm {sale}₫ → còn {new_price}₫"
-        else:
-            price_info = f"Giá: {price}₫"
+def cache_key(prompt: str, context: str) -> tuple:
+    question = normalize_text(prompt).strip(" ?!.")
+    return question, hashlib.sha1(context.encode("utf-8")).hexdigest()[:16]
 
-        context_lines.append(f"- {name}: {price_info}. Mô tả: {desc}")
-    return "\n".join(context_lines)
+def _check_catalog_version():
+    retriever = components.require("chat_index")
+    version = retriever.catalog.version if retriever else None
+    if _cache_state["catalog_version"] != version:
+        response_cache.clear()
+        _cache_state["catalog_version"] = version
 
-product_context = build_product_context()
+def prepare_prompt(prompt: str) -> tuple:
+    """(khóa cache, prompt đầy đủ gửi Gemini) cho 1 câu hỏi."""
+    context = get_product_context(prompt)
+    _check_catalog_version()
+    return cache_key(prompt, context), f"{system_prompt}\n{context}\n\nCâu hỏi: {prompt}"
 
 @chatbot_api.route("/chat", methods=["POST", "OPTIONS"])
 @cross_origin(origins="http://localhost:4200", supports_credentials=True)
@@ -74,22 +121,125 @@ def chat():
         if not prompt:
             return jsonify({"response": "❌ Prompt rỗng"}), 400
 
-        full_prompt = f"{system_prompt}\n{product_context}\n\nCâu hỏi: {prompt}"
+        key, full_prompt = prepare_prompt(prompt)
+        reply = response_cache.get(key)
+        if reply is not None:
+            return jsonify({"response": reply}), 200, {"X-Cache": "HIT"}
 
-        response = model.generate_content(full_prompt)
+        # Qua gateway: giới hạn đồng thời + deadline; câu hỏi trùng đang chạy dùng chung 1 lời gọi
+        response = gateway.call(key, model.generate_content, full_prompt)
         reply = getattr(response, "text", None)
 
         if not reply:
             return jsonify({"response": "❌ Không có phản hồi từ Gemini."}), 500
 
-        return jsonify({"response": reply})
+        response_cache.set(key, reply)
+        return jsonify({"response": reply}), 200, {"X-Cache": "MISS"}
 
+    except GatewayBusy:
+        return jsonify({"response": "❌ Chatbot đang quá tải, vui lòng thử lại sau giây lát."}), 503, {"Retry-After": "2"}
+    except ComponentNotReady:
+        return jsonify({"response": "❌ Chatbot đang khởi động, vui lòng thử lại sau giây lát."}), 503, {"Retry-After": "5"}
+    except GatewayTimeout:
+        return jsonify({"response": "❌ Gemini phản hồi quá lâu, vui lòng thử lại."}), 504
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"response": f"❌ Lỗi chatbot: {str(e)}"}), 500
 
 
+# === Streaming (Server-Sent Events): gửi từng đoạn câu trả lời ngay khi Gemini sinh ra
+def sse(payload: dict, event: Optional[str] = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@chatbot_api.route("/chat/stream", methods=["GET", "POST", "OPTIONS"])
+@cross_origin(origins="http://localhost:4200", supports_credentials=True)
+def chat_stream():
+    """POST {"prompt": ...} hoặc GET ?prompt=... (EventSource chỉ hỗ trợ GET).
+    Sự kiện: `data: {"text": ...}` cho từng đoạn, kết thúc bằng `event: done` hoặc `event: error`.
+    /chat (JSON 1 lần) giữ nguyên cho client cũ.
+    """
+    if request.method == "OPTIONS":
+        return jsonify({"message": "Preflight OK"}), 200
+
+    if request.method == "GET":
+        prompt = request.args.get("prompt", "").strip()
+    else:
+        prompt = ((request.get_json(silent=True) or {}).get("prompt") or "").strip()
+    if not prompt:
+        return jsonify({"response": "❌ Prompt rỗng"}), 400
+
+    key, full_prompt = prepare_prompt(prompt)
+    cached = response_cache.get(key)
+
+    def events():
+        if cached is not None:
+            yield sse({"text": cached})
+            yield sse({"cached": True}, event="done")
+            return
+
+        parts = []
+        stream = None
+        try:
+            # Giữ 1 slot gateway suốt thời gian stream (ngắt kết nối → slot được trả lại);
+            # quá deadline giữa 2 chunk → đóng stream Gemini, không cache câu trả lời dở
+            with gateway.slot() as check_deadline:
+                stream = model.generate_content(full_prompt, stream=True)
+                for chunk in stream:
+                    check_deadline()
+                    text = getattr(chunk, "text", None)
+                    if text:
+                        parts.append(text)
+                        yield sse({"text": text})
+            reply = "".join(parts)
+            if reply:
+                response_cache.set(key, reply)
+                yield sse({"cached": False}, event="done")
+            else:
+                yield sse({"error": "❌ Không có phản hồi từ Gemini."}, event="error")
+        except GatewayBusy:
+            yield sse({"error": "❌ Chatbot đang quá tải, vui lòng thử lại sau giây lát."}, event="error")
+        except GatewayTimeout:
+            close = getattr(stream, "close", None)
+            if callable(close):
+                close()
+            yield sse({"error": "❌ Gemini phản hồi quá lâu, vui lòng thử lại."}, event="error")
+        except GeneratorExit:
+            # Client ngắt kết nối giữa chừng → ngừng đọc stream Gemini, không cache câu trả lời dở
+            _cache_state["stream_disconnects"] += 1
+            close = getattr(stream, "close", None)
+            if callable(close):
+                close()
+            raise
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield sse({"error": f"❌ Lỗi chatbot: {str(e)}"}, event="error")
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # tắt buffer của nginx để chunk tới client ngay
+        "X-Cache": "HIT" if cached is not None else "MISS"
+    }
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=headers)
+
+
+@chatbot_api.route("/chat/metrics", methods=["GET"])
+def chat_metrics():
+    try:
+        retriever = components.require("chat_index")
+    except ComponentNotReady:
+        retriever = None
+    return jsonify({
+        "cache": response_cache.stats(),
+        "gateway": gateway.stats(),
+        "stream_disconnects": _cache_state["stream_disconnects"],
+        "catalog_version": _cache_state["catalog_version"],
+        "retriever": retriever.stats() if retriever else None
+    })
+
+
 # 1. Công nghệ và thư viện sử dụng
 # Flask: Framework web Python nhẹ, dùng để tạo API REST.
 
@@ -0,0 +1,138 @@
+# components.py
+"""
+Khởi tạo các thành phần nặng của server (mô hình DL, lead model, forecast, catalog, ...)
+ở thread nền, song song, để Flask mở cổng ngay khi import xong.
+- Mỗi component có trạng thái: pending → loading → ready / failed (kèm lỗi, thời gian load).
+- Endpoint gọi `components.require(name)`:
+    ready  → trả về giá trị đã load,
+    failed → trả về None (endpoint xử lý như khi thiếu model trước đây) và, khi đã qua thời gian
+             chờ, load lại ở thread nền (backoff COMPONENT_RETRY_BASE × 2^(lần lỗi - 1), tối đa
+             COMPONENT_RETRY_MAX giây) → lỗi mạng lúc khởi động / artifact có sau khi boot tự hết,
+    còn đang load → raise ComponentNotReady (server trả 503 + Retry-After).
+- `/ready` trả về trạng thái từng component.
+"""
+
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+RETRY_BASE = float(os.getenv("COMPONENT_RETRY_BASE", 30))
+RETRY_MAX = float(os.getenv("COMPONENT_RETRY_MAX", 600))
+
+
+class ComponentNotReady(Exception):
+    def __init__(self, name: str):
+        super().__init__(f"Component '{name}' đang khởi động")
+        self.name = name
+
+
+class Component:
+    def __init__(self, name: str, loader: Callable[[], Any], failures: int = 0):
+        self.name = name
+        self.loader = loader
+        self.status = PENDING
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.failures = failures
+        self.failed_at: Optional[float] = None
+        self.done = threading.Event()
+
+    def load(self) -> None:
+        self.status = LOADING
+        t0 = time.perf_counter()
+        try:
+            self.value = self.loader()
+            self.status = READY
+        except Exception as e:
+            traceback.print_exc()
+            self.error = str(e)
+            self.failures += 1
+            self.failed_at = time.monotonic()
+            self.status = FAILED
+            print(f"⚠️ Không khởi tạo được '{self.name}': {e}")
+        finally:
+            self.seconds = round(time.perf_counter() - t0, 3)
+            self.done.set()
+
+    def retry_delay(self) -> float:
+        return min(RETRY_BASE * 2 ** max(self.failures - 1, 0), RETRY_MAX)
+
+
+class ComponentRegistry:
+    def __init__(self):
+        self._components: Dict[str, Component] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._retrying: set = set()
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        self._components[name] = Component(name, loader)
+
+    def start(self) -> None:
+        """Load mọi component song song ở thread nền (gọi 1 lần khi khởi động)."""
+        if self._executor is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self._components), 1),
+                                            thread_name_prefix="component-init")
+        for component in self._components.values():
+            self._executor.submit(component.load)
+        self._executor.shutdown(wait=False)
+
+    def require(self, name: str) -> Any:
+        component = self._components[name]
+        if component.status == READY:
+            return component.value
+        if component.status == FAILED:
+            self._retry_in_background(component)
+            return None
+        raise ComponentNotReady(name)
+
+    def _retry_in_background(self, failed: Component) -> None:
+        with self._lock:
+            if failed.name in self._retrying or time.monotonic() - failed.failed_at < failed.retry_delay():
+                return
+            self._retrying.add(failed.name)
+        threading.Thread(target=self._retry, args=(failed,), name=f"component-retry-{failed.name}",
+                         daemon=True).start()
+
+    def _retry(self, failed: Component) -> None:
+        """Load vào Component mới; trong lúc load, request vẫn thấy FAILED (None) thay vì 503."""
+        try:
+            component = Component(failed.name, failed.loader, failures=failed.failures)
+            component.load()
+            if self._components.get(failed.name) is failed:  # không đè reload() chạy song song
+                self._components[failed.name] = component
+        finally:
+            with self._lock:
+                self._retrying.discard(failed.name)
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> Any:
+        """Chờ component load xong (dùng cho script/thử nghiệm, không dùng trong request)."""
+        self._components[name].done.wait(timeout)
+        return self.require(name)
+
+    def reload(self, name: str, loader: Optional[Callable[[], Any]] = None) -> Any:
+        """Load lại 1 component ngay trong thread hiện tại (sau khi dựng lại artifact, benchmark).
+        `loader` thay loader cũ nếu có; request đang chạy vẫn thấy giá trị cũ cho tới khi load xong."""
+        component = Component(name, loader or self._components[name].loader)
+        component.load()
+        self._components[name] = component
+        return self.require(name)
+
+    def status(self) -> dict:
+        return {
+            name: {"status": c.status, "seconds": c.seconds, "error": c.error, "failures": c.failures}
+            for name, c in self._components.items()
+        }
+
+    def is_ready(self) -> bool:
+        """True khi không còn component nào đang load (component lỗi vẫn tính là xong)."""
+        return all(c.status in (READY, FAILED) for c in self._components.values())
+
+
+components = ComponentRegistry()
@@ -1,101 +1,398 @@
-import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
-from pymongo import MongoClient
-from bson import ObjectId
-import random
+# evaluate_recommendation.py
+"""
+Đánh giá offline hệ gợi ý: baseline user-based CF (cosine giữa user, cộng sản phẩm của 3 user gần
+nhất) hoặc mô hình DL, cùng bộ metric.
+- Dữ liệu từ snapshot cột dùng chung (orders_snapshot.py); chia train/test theo đơn của từng user
+  (xáo trộn có seed, 80% đơn đầu → train; user < 2 đơn → toàn bộ train) — vector hóa bằng NumPy.
+  Hoặc chia theo thời gian (--cut / watermark): đơn tạo sau mốc → test.
+- Ma trận user × sản phẩm dạng CSR (scipy.sparse) dựng 1 lần; cosine tính theo khối user
+  (Xn[khối] · Xnᵀ) → bộ nhớ giới hạn theo --max-block-mb thay vì ma trận dày n_users².
+- precision@k, recall@k, NDCG@k (nhị phân) cho mọi user tính theo khối bằng mảng; coverage =
+  tỉ lệ sản phẩm trong catalog xuất hiện trong ít nhất 1 danh sách gợi ý.
+- Các khối user chạy song song trên ProcessPoolExecutor (ma trận gửi sang worker 1 lần qua initializer).
+- --model deep: chấm chính mô hình đang phục vụ (recommendation_model.h5 hoặc --model-file) trên
+  phép chia theo thời gian tại watermark lần train của nó (rec_train_meta.json) → test chỉ gồm
+  đơn mô hình chưa từng được train. User không có trong encoder (mới sau lần train) không chấm
+  được → đếm riêng ở "unscored_users".
+- --model holdout: train 1 mô hình cùng kiến trúc (build_model) chỉ trên phần train của phép chia
+  ngẫu nhiên (fit_holdout) — đo khả năng tổng quát của kiến trúc, tốn 1 lần train từ đầu.
+- Mô hình DL: mỗi khối user chấm điểm với toàn catalog bằng 1 lượt forward NumPy
+  (NumpyRecommender.score_users); kích thước khối tính theo bề rộng các lớp Dense để bộ nhớ
+  không vượt --max-block-mb. Báo cáo thêm throughput (user/giây).
+- In thời gian + RSS đỉnh theo từng giai đoạn.
+
+Chạy (trong thư mục ml-model):
+    python evaluate_recommendation.py                       # db "test" (db server dùng và mô hình được train)
+    python evaluate_recommendation.py --k 10 --workers 4 --db marathon
+    python evaluate_recommendation.py --model deep          # cần TensorFlow (load .h5)
+    python evaluate_recommendation.py --model deep --model-file backup/recommendation_model.h5 --cut 2025-01-31T00:00:00
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
 import numpy as np
+from scipy import sparse
+
+from interaction_extract import children_peak_rss_mb, peak_rss_mb
+from recommender_inference import NumpyRecommender
+
+N_NEIGHBOURS = 3
+TRAIN_RATIO = 0.8
+HOLDOUT_EPOCHS = 10  # bằng số epoch khi train đầy đủ mô hình phục vụ
+
+
+# ---------------------------
+# Đo thời gian / bộ nhớ theo giai đoạn
+# ---------------------------
+class StageTimer:
+    def __init__(self):
+        self.stages: List[dict] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        yield
+        self.stages.append({
+            "stage": name,
+            "seconds": round(time.perf_counter() - t0, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "workers_peak_rss_mb": children_peak_rss_mb()
+        })
+
+    def print(self) -> None:
+        print(f"{'stage':>10} {'seconds':>9} {'RSS MB':>8} {'worker RSS MB':>14}")
+        for s in self.stages:
+            print(f"{s['stage']:>10} {s['seconds']:9.3f} {s['peak_rss_mb'] or 0:8.1f} "
+                  f"{s['workers_peak_rss_mb'] or 0:14.1f}")
+
+
+# ---------------------------
+# Chia train/test + ma trận CSR
+# ---------------------------
+def split_orders(order_user: np.ndarray, seed: int = 42, train_ratio: float = TRAIN_RATIO) -> np.ndarray:
+    """Mask đơn thuộc train: mỗi user xáo trộn đơn của mình, int(n * train_ratio) đơn đầu vào train
+    (user < 2 đơn → mọi đơn vào train). Đơn không có user → False."""
+    rng = np.random.default_rng(seed)
+    orders = np.flatnonzero(order_user >= 0)
+    orders = orders[rng.permutation(len(orders))]
+    orders = orders[np.argsort(order_user[orders], kind="stable")]    # nhóm theo user, thứ tự ngẫu nhiên
+    users = order_user[orders]
+    starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+    counts = np.diff(np.r_[starts, len(users)])
+    rank = np.arange(len(users)) - np.repeat(starts, counts)
+    n_train = np.where(counts >= 2, (counts * train_ratio).astype(np.int64), counts)
+    train = np.zeros(len(order_user), dtype=bool)
+    train[orders[rank < np.repeat(n_train, counts)]] = True
+    return train
+
+
+def user_item_matrix(line_user: np.ndarray, line_product: np.ndarray, line_mask: np.ndarray,
+                     n_users: int, n_products: int) -> sparse.csr_matrix:
+    """Số dòng (user, sản phẩm) trong các line được chọn (giống pd.crosstab cũ), CSR float32."""
+    users, products = line_user[line_mask], line_product[line_mask]
+    data = np.ones(len(users), dtype=np.float32)
+    x = sparse.csr_matrix((data, (users, products)), shape=(n_users, n_products))
+    x.sum_duplicates()
+    return x
+
+
+def block_size(n_columns: int, max_block_mb: float, copies: int = 3) -> int:
+    """Số user mỗi khối sao cho `copies` mảng dày (khối × n_columns) float32 vừa max_block_mb."""
+    return int(max(1, min(4096, max_block_mb * 2 ** 20 // (4 * copies * max(n_columns, 1)))))
+
+
+# ---------------------------
+# Chấm điểm + metric theo khối
+# ---------------------------
+def top_k_mask(values: np.ndarray, m: int) -> np.ndarray:
+    """Mask đúng m phần tử lớn nhất mỗi hàng; bằng điểm ở ngưỡng → chỉ số nhỏ hơn được chọn
+    (kết quả không phụ thuộc argpartition)."""
+    threshold = -np.partition(-values, m - 1, axis=1)[:, m - 1:m]
+    above = values > threshold
+    ties = values == threshold
+    room = m - above.sum(axis=1, keepdims=True)
+    return above | (ties & (np.cumsum(ties, axis=1) <= room))
+
+
+def cf_scores(users: np.ndarray, train: sparse.csr_matrix, normed: sparse.csr_matrix,
+              n_neighbours: int = N_NEIGHBOURS) -> np.ndarray:
+    """Điểm CF cho 1 khối user → (len(users), n_products): tổng số lần mua của n_neighbours
+    user cosine gần nhất (không tính chính nó)."""
+    n_users = train.shape[0]
+    m = min(n_neighbours, n_users - 1)
+    if m <= 0:
+        return np.zeros((len(users), train.shape[1]), dtype=np.float32)
+    # Làm tròn: các cặp bằng nhau về toán học không bị tách ra do sai số float32
+    sim = np.round((normed[users] @ normed.T).toarray(), 6)
+    sim[np.arange(len(users)), users] = -np.inf
+    w = sparse.csr_matrix(top_k_mask(sim, m), dtype=np.float32)
+    return (w @ train).toarray()
+
+
+class DeepScorer:
+    """Chấm điểm bằng mô hình DL, ánh xạ chỉ số encoder ↔ mã của snapshot.
+    Sản phẩm mô hình biết nhưng không có trong snapshot được nối thêm cột (vẫn gợi ý được)."""
+
+    def __init__(self, recommender: NumpyRecommender, user_classes, product_classes,
+                 user_ids: np.ndarray, product_ids: np.ndarray):
+        self.recommender = recommender
+        model_user = {str(uid): i for i, uid in enumerate(user_classes)}
+        self.user_map = np.array([model_user.get(str(uid), -1) for uid in user_ids], dtype=np.int64)
+        column = {str(pid): i for i, pid in enumerate(product_ids)}
+        extra = [str(pid) for pid in product_classes if str(pid) not in column]
+        column.update({pid: len(product_ids) + i for i, pid in enumerate(extra)})
+        self.product_cols = np.array([column[str(pid)] for pid in product_classes], dtype=np.int64)
+        self.n_columns = len(product_ids) + len(extra)
+        # Bề rộng các lớp Dense: mảng trung gian (khối × n_products × bề rộng) của score_projected
+        self.width = recommender.hidden_width
+
+    def widen(self, x: sparse.csr_matrix) -> sparse.csr_matrix:
+        x = x.copy()
+        x.resize((x.shape[0], self.n_columns))
+        return x
+
+    def scores(self, users: np.ndarray) -> np.ndarray:
+        out = np.full((len(users), self.n_columns), -np.inf, dtype=np.float32)
+        out[:, self.product_cols] = self.recommender.score_users(self.user_map[users])
+        return out
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k mỗi hàng (điểm giảm dần, bằng nhau → chỉ số nhỏ trước). Return: (chỉ số, hợp lệ = điểm hữu hạn)."""
+    k = min(k, scores.shape[1])
+    top = np.nonzero(top_k_mask(scores, k))[1].reshape(len(scores), k)   # chỉ số tăng dần mỗi hàng
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    return top, np.isfinite(np.take_along_axis(top_scores, order, axis=1))
+
+
+def ranking_metrics(top: np.ndarray, valid: np.ndarray, test: sparse.csr_matrix, k: int) -> Dict[str, np.ndarray]:
+    """precision/recall/NDCG@k của từng user trong khối; `test` = hàng CSR sản phẩm test của khối."""
+    n = top.shape[0]
+    relevant = (test[np.repeat(np.arange(n), top.shape[1]), top.ravel()].A1 > 0).reshape(top.shape) & valid
+    n_test = np.diff(test.indptr)
+    hits = relevant.sum(axis=1)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (relevant * discounts[:top.shape[1]]).sum(axis=1)
+    idcg = np.cumsum(discounts)[np.clip(np.minimum(n_test, k), 1, k) - 1]
+    return {
+        "precision": hits / k,
+        "recall": hits / np.maximum(n_test, 1),
+        "ndcg": dcg / idcg,
+        # giống bản cũ: chỉ tính user có sản phẩm test và có ít nhất 1 gợi ý
+        "evaluated": (n_test > 0) & valid.any(axis=1)
+    }
+
+
+_STATE: dict = {}
+
+
+def _init_worker(state: dict) -> None:
+    _STATE.clear()
+    _STATE.update(state)
 
-# MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['marathon']
-orders = list(db['orders'].find())
-products = db['products']
-
-# Tách đơn hàng theo user
-orders_by_user = {}
-for order in orders:
-    uid = str(order["userId"])
-    orders_by_user.setdefault(uid, []).append(order)
-
-# Chia train/test
-train_data = []
-test_data = []
-
-for uid, user_orders in orders_by_user.items():
-    if len(user_orders) < 2:
-        train_data.extend(user_orders)
+
+def _evaluate_block(users: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    s = _STATE
+    if s["scorer"] is None:
+        scores = cf_scores(users, s["train"], s["normed"], s["n_neighbours"])
+        scores[scores <= 0] = -np.inf  # CF chỉ gợi ý sản phẩm hàng xóm đã mua
+    else:
+        scores = s["scorer"].scores(users)
+    bought = s["train"][users]
+    scores[np.repeat(np.arange(len(users)), np.diff(bought.indptr)), bought.indices] = -np.inf  # bỏ sp đã mua
+    top, valid = top_k_rows(scores, s["k"])
+    metrics = ranking_metrics(top, valid, s["test"][users], s["k"])
+    return metrics, np.unique(top[valid & metrics["evaluated"][:, None]])
+
+
+def evaluate(train: sparse.csr_matrix, test: sparse.csr_matrix, k: int = 5, workers: int = 1,
+             max_block_mb: float = 256, n_neighbours: int = N_NEIGHBOURS,
+             scorer: Optional[DeepScorer] = None) -> dict:
+    """Đánh giá mọi user có dữ liệu train (CF, hoặc mô hình DL nếu có `scorer`);
+    song song theo khối user khi workers > 1."""
+    t0 = time.perf_counter()
+    users = np.flatnonzero(np.diff(train.indptr) > 0)
+    unscored = 0
+    if scorer is None:
+        row_norms = np.sqrt(np.asarray(train.multiply(train).sum(axis=1)).ravel())
+        normed = sparse.csr_matrix(sparse.diags(1.0 / np.maximum(row_norms, 1e-12)) @ train, dtype=np.float32)
+        size = block_size(max(train.shape), max_block_mb)
+    else:
+        train, test, normed = scorer.widen(train), scorer.widen(test), None
+        known = scorer.user_map[users] >= 0
+        unscored = int((~known & (np.diff(test.indptr)[users] > 0)).sum())
+        users = users[known]
+        size = block_size(scorer.n_columns, max_block_mb, copies=scorer.width + 2)
+    state = {"train": train, "test": test, "normed": normed, "k": k, "n_neighbours": n_neighbours,
+             "scorer": scorer}
+    blocks = [users[i:i + size] for i in range(0, len(users), size)]
+
+    if workers <= 1:
+        _init_worker(state)
+        results = [_evaluate_block(b) for b in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(state,)) as pool:
+            results = list(pool.map(_evaluate_block, blocks))
+
+    merged = {name: np.concatenate([r[0][name] for r in results]) if results else np.empty(0)
+              for name in ("precision", "recall", "ndcg", "evaluated")}
+    evaluated = merged["evaluated"].astype(bool)
+    recommended = np.unique(np.concatenate([r[1] for r in results])) if results else np.empty(0)
+    seconds = time.perf_counter() - t0
+    return {
+        "model": "cf" if scorer is None else "deep",
+        "k": k,
+        "users": int(evaluated.sum()),
+        "scored_users": len(users),
+        "unscored_users": unscored,
+        f"precision@{k}": float(merged["precision"][evaluated].mean()) if evaluated.any() else 0.0,
+        f"recall@{k}": float(merged["recall"][evaluated].mean()) if evaluated.any() else 0.0,
+        f"ndcg@{k}": float(merged["ndcg"][evaluated].mean()) if evaluated.any() else 0.0,
+        "coverage": len(recommended) / train.shape[1] if train.shape[1] else 0.0,
+        "block_size": size,
+        "blocks": len(blocks),
+        "seconds": round(seconds, 3),
+        "users_per_sec": round(len(users) / seconds, 1) if seconds > 0 else None
+    }
+
+
+def split_by_time(order_created: np.ndarray, cut: str) -> np.ndarray:
+    """Mask đơn thuộc train khi chia theo thời gian: tạo <= cut (cùng mốc watermark của lần train,
+    chuỗi ISO) hoặc không có ngày → train; sau cut → test."""
+    created = np.asarray(order_created)
+    return np.isnat(created) | (created <= np.datetime64(cut, "s"))
+
+
+def split_lines(snapshot, seed: int = 42, cut: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Chia theo đơn (split_orders, hoặc split_by_time nếu có cut) rồi đổi sang dòng.
+    Return: (user mỗi dòng, mask train, mask test)."""
+    if cut is None:
+        order_train = split_orders(np.asarray(snapshot.order_user), seed)
     else:
-        random.shuffle(user_orders)
-        split = int(len(user_orders) * 0.8)
-        train_data.extend(user_orders[:split])
-        test_data.extend(user_orders[split:])
-
-# Tạo user-product matrix từ train
-def get_user_product_matrix(data):
-    rows = []
-    for order in data:
-        uid = str(order["userId"])
-        for p in order["products"]:
-            pid = str(p["productId"])
-            rows.append((uid, pid))
-    df = pd.DataFrame(rows, columns=["user", "product"])
-    return pd.crosstab(df["user"], df["product"])
-
-train_matrix = get_user_product_matrix(train_data)
-
-# Hàm gợi ý cho 1 user
-def recommend_for_user(user_id, matrix, k=5):
-    if user_id not in matrix.index:
-        return []
-
-    sim = cosine_similarity(matrix)
-    sim_df = pd.DataFrame(sim, index=matrix.index, columns=matrix.index)
-
-    similar_users = sim_df[user_id].sort_values(ascending=False)[1:4]
-    recommendations = {}
-
-    for sim_user in similar_users.index:
-        user_products = matrix.loc[sim_user]
-        for pid, bought in user_products.items():
-            if bought > 0 and matrix.loc[user_id][pid] == 0:
-                recommendations[pid] = recommendations.get(pid, 0) + bought
-
-    sorted_recommend = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)[:k]
-    return [pid for pid, _ in sorted_recommend]
-
-# Đánh giá precision@k
-def precision_at_k(user_id, k=5):
-    recommended = recommend_for_user(user_id, train_matrix, k)
-    if not recommended:
-        return None
-
-    purchased_in_test = set()
-    for o in test_data:
-        if str(o["userId"]) == user_id:
-            for p in o["products"]:
-                purchased_in_test.add(str(p["productId"]))
-
-    if not purchased_in_test:
-        return None
-
-    hits = set(recommended).intersection(purchased_in_test)
-    precision = len(hits) / k
-    return precision
-
-# Tính avg precision trên tất cả user
-def evaluate_all(k=5):
-    user_ids = list(train_matrix.index)
-    results = []
-
-    for uid in user_ids:
-        p = precision_at_k(uid, k)
-        if p is not None:
-            results.append(p)
-
-    avg_precision = np.mean(results) if results else 0
-    print(f"🎯 Average Precision@{k}: {avg_precision:.4f} (Trên {len(results)} người dùng có dữ liệu test)")
-    return avg_precision
+        order_train = split_by_time(snapshot.order_created, cut) & (np.asarray(snapshot.order_user) >= 0)
+    line_order = np.asarray(snapshot.line_order)
+    line_user = np.asarray(snapshot.order_user)[line_order]
+    line_train = order_train[line_order]
+    return line_user, line_train, ~line_train & (line_user >= 0)
+
+
+def prepare(snapshot, seed: int = 42, timer: Optional[StageTimer] = None,
+            cut: Optional[str] = None) -> Tuple[sparse.csr_matrix, sparse.csr_matrix]:
+    """Snapshot → (ma trận train, ma trận test) user × sản phẩm theo mã của snapshot
+    (cut: chia theo thời gian thay vì ngẫu nhiên theo user)."""
+    timer = timer or StageTimer()
+    n_users, n_products = len(snapshot.user_ids), len(snapshot.product_ids)
+    with timer.stage("split"):
+        line_user, line_train, line_test = split_lines(snapshot, seed, cut)
+    with timer.stage("matrix"):
+        line_product = np.asarray(snapshot.line_product)
+        train = user_item_matrix(line_user, line_product, line_train, n_users, n_products)
+        test = user_item_matrix(line_user, line_product, line_test, n_users, n_products)
+    return train, test
+
+
+# ---------------------------
+# Mô hình DL: mô hình đang phục vụ / mô hình train trên phần train của phép chia
+# ---------------------------
+def load_keras_recommender(model_path: str) -> NumpyRecommender:
+    """File .h5 → NumpyRecommender (cần TensorFlow)."""
+    from tensorflow.keras.losses import MeanSquaredError
+    from tensorflow.keras.models import load_model
+
+    return NumpyRecommender.from_keras(load_model(model_path, custom_objects={"mse": MeanSquaredError()}))
+
+
+def served_scorer(recommender: NumpyRecommender, user_encoder, product_encoder, snapshot) -> DeepScorer:
+    """DeepScorer cho mô hình đã train với encoder của nó. Encoder có thể dài hơn bảng embedding
+    (đã nối id mới trước khi fine-tune) → chỉ lấy các id mô hình biết."""
+    return DeepScorer(recommender, user_encoder.classes_[:recommender.user_emb.shape[0]],
+                      product_encoder.classes_[:recommender.product_emb.shape[0]],
+                      snapshot.user_ids, snapshot.product_ids)
+
+
+def holdout_interactions(snapshot, seed: int = 42) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Dòng (user, product, quantity) theo mã snapshot, chỉ các đơn thuộc train của prepare(snapshot, seed);
+    quantity thiếu → 1 như OrdersSnapshot.interactions."""
+    line_user, line_train, _ = split_lines(snapshot, seed)
+    line_product = np.asarray(snapshot.line_product)
+    quantity = np.nan_to_num(np.asarray(snapshot.line_quantity)[line_train], nan=1.0).astype(np.float32)
+    return line_user[line_train].astype(np.int32), line_product[line_train].astype(np.int32), quantity
+
+
+def fit_holdout(snapshot, seed: int = 42, epochs: int = HOLDOUT_EPOCHS) -> DeepScorer:
+    """Train mô hình cùng kiến trúc mô hình phục vụ trên holdout_interactions, trả về DeepScorer
+    theo mã snapshot (dùng với evaluate(*prepare(snapshot, seed), scorer=...)). Cần TensorFlow."""
+    from incremental_training import build_model
+
+    users, products, quantity = holdout_interactions(snapshot, seed)
+    n_users, n_products = len(snapshot.user_ids), len(snapshot.product_ids)
+    model = build_model(n_users, n_products)
+    model.fit([users, products], quantity, epochs=epochs, batch_size=32, verbose=0)
+    return DeepScorer(NumpyRecommender.from_keras(model), snapshot.user_ids, snapshot.product_ids,
+                      snapshot.user_ids, snapshot.product_ids)
+
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    from orders_snapshot import OrdersSnapshot
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-block-mb", type=float, default=256)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model", choices=["cf", "deep", "holdout"], default="cf")
+    parser.add_argument("--model-file", default=None, help="--model deep: mặc định recommendation_model.h5")
+    parser.add_argument("--cut", default=None,
+                        help="chia theo thời gian tại mốc này (ISO); --model deep: mặc định watermark trong rec_train_meta.json")
+    parser.add_argument("--epochs", type=int, default=HOLDOUT_EPOCHS, help="--model holdout: số epoch train trên phần train")
+    parser.add_argument("--db", default="test")
+    args = parser.parse_args()
+
+    load_dotenv()
     print("🚀 Đánh giá hệ thống gợi ý...")
-    evaluate_all(k=5)
+    timer = StageTimer()
+    with timer.stage("load"):
+        client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
+        snapshot = OrdersSnapshot.load_or_build(client[args.db])
+
+    scorer, cut = None, args.cut
+    if args.model == "deep":
+        with timer.stage("model"):
+            from incremental_training import load_encoders, load_train_meta
+            from recommendation_store import MODEL_FILE
+
+            cut = cut or load_train_meta().get("watermark")
+            if not cut:
+                raise SystemExit("❌ Không rõ mô hình được train tới đâu: chưa có watermark trong "
+                                 "rec_train_meta.json, truyền --cut")
+            user_encoder, product_encoder = load_encoders()
+            scorer = served_scorer(load_keras_recommender(args.model_file or MODEL_FILE),
+                                   user_encoder, product_encoder, snapshot)
+        print(f"✂️ Chia theo thời gian tại {cut}: test = đơn mô hình chưa được train")
+    train_matrix, test_matrix = prepare(snapshot, args.seed, timer, cut)
+    if args.model == "holdout":
+        with timer.stage("fit"):
+            scorer = fit_holdout(snapshot, args.seed, args.epochs)
+
+    with timer.stage("evaluate"):
+        report = evaluate(train_matrix, test_matrix, args.k, args.workers, args.max_block_mb, scorer=scorer)
+
+    k = args.k
+    print(f"🎯 Precision@{k}: {report[f'precision@{k}']:.4f} | Recall@{k}: {report[f'recall@{k}']:.4f} | "
+          f"NDCG@{k}: {report[f'ndcg@{k}']:.4f} | Coverage: {report['coverage']:.4f} "
+          f"(Trên {report['users']} người dùng có dữ liệu test)")
+    print(f"⚡ {report['model']}: {report['scored_users']} user chấm điểm, {report['users_per_sec']} user/s "
+          f"(khối {report['block_size']} user × {report['blocks']} khối)")
+    if report["unscored_users"]:
+        print(f"⚠️ {report['unscored_users']} user có dữ liệu test nhưng mô hình chưa biết (cần train lại)")
+    timer.print()
@@ -0,0 +1,59 @@
+# forecast_engine.py
+"""
+Hồi quy tuyến tính theo tháng cho TẤT CẢ sản phẩm cùng lúc (thay vòng lặp LinearRegression/sản phẩm).
+- Với mỗi sản phẩm: y = a + b * t, t = year * 12 + month.
+- Nghiệm đóng (OLS) từ các tổng theo nhóm: n, Σt, Σy, Σt², Σty — tính bằng np.bincount,
+  không lọc DataFrame theo từng productId nên chi phí O(số dòng).
+- t được trừ đi t nhỏ nhất của nhóm trước khi cộng Σt², Σty để tránh sai số khi t ~ 24000.
+- Kết quả giống vòng lặp cũ: chỉ sản phẩm có >= 2 tháng dữ liệu, dự báo tháng kế tiếp
+  (max(t) + 1), predicted_quantity = max(int(dự báo), 0), sắp xếp giảm dần.
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+def batch_linear_forecast(grouped: pd.DataFrame) -> List[dict]:
+    """grouped cột: productId, time, quantity (mỗi dòng = 1 tháng của 1 sản phẩm).
+    Return: list dict productId, predicted_quantity (giảm dần theo predicted_quantity).
+    """
+    if grouped.empty:
+        return []
+
+    codes, uniques = pd.factorize(grouped["productId"], sort=False)
+    n_groups = len(uniques)
+    t = grouped["time"].to_numpy(dtype=np.float64)
+    y = grouped["quantity"].to_numpy(dtype=np.float64)
+
+    n = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    t_min = np.full(n_groups, np.inf)
+    t_max = np.full(n_groups, -np.inf)
+    np.minimum.at(t_min, codes, t)
+    np.maximum.at(t_max, codes, t)
+
+    ts = t - t_min[codes]
+    sum_t = np.bincount(codes, weights=ts, minlength=n_groups)
+    sum_y = np.bincount(codes, weights=y, minlength=n_groups)
+    sum_tt = np.bincount(codes, weights=ts * ts, minlength=n_groups)
+    sum_ty = np.bincount(codes, weights=ts * y, minlength=n_groups)
+
+    # b = (nΣty - ΣtΣy) / D, a = (ΣyΣt² - ΣtΣty) / D, D = nΣt² - (Σt)²
+    # → a + b·x = (num_b·x + num_a) / D: chỉ 1 phép chia, các tổng nguyên được giữ chính xác
+    keep = n >= 2
+    denom = n * sum_tt - sum_t * sum_t
+    num_b = n * sum_ty - sum_t * sum_y
+    num_a = sum_y * sum_tt - sum_t * sum_ty
+
+    next_ts = t_max - t_min + 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        predicted = np.where(keep, (num_b * next_ts + num_a) / denom, 0.0)
+    predicted_qty = np.maximum(np.trunc(predicted), 0).astype(np.int64)
+
+    idx = np.flatnonzero(keep)
+    order = idx[np.argsort(-predicted_qty[idx], kind="stable")]
+    return [
+        {"productId": uniques[i], "predicted_quantity": int(predicted_qty[i])}
+        for i in order
+    ]
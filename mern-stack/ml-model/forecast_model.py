@@ -1,10 +1,9 @@
 import os
 import pandas as pd
 from pymongo import MongoClient
-from sklearn.linear_model import LinearRegression
-from datetime import datetime
+from forecast_engine import batch_linear_forecast
+from orders_snapshot import OrdersSnapshot
 from dotenv import load_dotenv
-from collections import Counter
 import json
 import locale
 
@@ -23,77 +22,28 @@ if not mongo_uri:
 
 client = MongoClient(mongo_uri)
 db = client["marathon"]
-orders = db["orders"]
 
-# Bước 1: Trích xuất dữ liệu đơn hàng
-data = []
-product_freq = Counter()
+# Bước 1: Tổng hợp đơn hàng theo (productId, year, month) từ snapshot cột dùng chung
+# (memory-map, chỉ query MongoDB khi snapshot chưa có / đã cũ — xem orders_snapshot.py)
+snapshot = OrdersSnapshot.load_or_build(db)
+df = snapshot.monthly_product_quantities()
 
-for order in orders.find():
-    created_at = order.get("createdAt")
-
-    # Convert nếu là ISO string
-    if isinstance(created_at, str):
-        try:
-            created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-        except:
-            continue
-
-    if not isinstance(created_at, datetime):
-        continue
-
-    for p in order.get("products", []):
-        pid = p.get("productId")
-        qty = p.get("quantity")
-
-        if not pid or qty is None:
-            continue
-
-        # Tính tần suất xuất hiện của sản phẩm
-        product_freq[str(pid)] += 1
-
-        data.append({
-            "productId": str(pid),
-            "month": created_at.month,
-            "year": created_at.year,
-            "quantity": qty
-        })
-
-df = pd.DataFrame(data)
-
-# 1. Top sản phẩm được mua nhiều nhất
+# 1. Top sản phẩm được mua nhiều nhất (tần suất xuất hiện trong đơn)
+product_freq = df.groupby("productId", sort=False)["lines"].sum().sort_values(ascending=False, kind="stable")
 top_selling_result = [
-    {"productId": pid, "bought_count": count}
-    for pid, count in product_freq.most_common(8)
+    {"productId": pid, "bought_count": int(count)}
+    for pid, count in product_freq.head(8).items()
 ]
 
 # 2. Dự đoán sản phẩm bán chạy tương lai
 forecast_result = []
 
 if not df.empty:
-    grouped = df.groupby(["productId", "year", "month"]).agg({"quantity": "sum"}).reset_index()
+    grouped = df[["productId", "year", "month", "quantity"]].sort_values(["productId", "year", "month"])
     grouped["time"] = grouped["year"] * 12 + grouped["month"]
 
-    for pid in grouped["productId"].unique():
-        df_pid = grouped[grouped["productId"] == pid]
-        if len(df_pid) < 2:
-            continue
-
-        X = df_pid[["time"]]
-        y = df_pid["quantity"]
-
-        model = LinearRegression()
-        model.fit(X, y)
-
-        next_month = X["time"].max() + 1
-        predicted = model.predict([[next_month]])[0]
-
-        forecast_result.append({
-            "productId": pid,
-            "predicted_quantity": max(int(predicted), 0)
-        })
-
-    forecast_result = sorted(forecast_result, key=lambda x: x["predicted_quantity"], reverse=True)
+    # Hồi quy tuyến tính cho mọi sản phẩm cùng lúc (xem forecast_engine.py)
+    forecast_result = batch_linear_forecast(grouped)
 
 # Xuất ra file JSON
 with open("top_selling_result.json", "w", encoding="utf-8") as f:
@@ -102,7 +52,7 @@ with open("top_selling_result.json", "w", encoding="utf-8") as f:
 with open("forecast_result.json", "w", encoding="utf-8") as f:
     json.dump(forecast_result, f, ensure_ascii=False, indent=4)
 
-# sử dụng mô hình Linear Regression (Hồi quy tuyến tính) từ thư viện sklearn.linear_model để dự đoán lượng bán sản phẩm trong tháng tiếp theo dựa trên dữ liệu lịch sử.
+# sử dụng mô hình Linear Regression (Hồi quy tuyến tính, nghiệm đóng tính bằng NumPy trong forecast_engine.py — cho kết quả giống sklearn LinearRegression) để dự đoán lượng bán sản phẩm trong tháng tiếp theo dựa trên dữ liệu lịch sử.
 
 # Cụ thể:
 
@@ -0,0 +1,60 @@
+# id_encoder.py
+"""
+Bộ mã hóa id chỉ thêm (append-only), API giống sklearn LabelEncoder.
+- Id đã có giữ nguyên chỉ số mãi mãi; id mới được gán chỉ số tiếp theo (n, n+1, ...)
+  → hàng embedding cũ của model vẫn đúng user/product, chỉ cần nối thêm hàng mới.
+- `classes_[i]` = id của chỉ số i (không còn sắp xếp như LabelEncoder sau khi thêm id mới).
+- Đọc được từ user_encoder.pkl / product_encoder.pkl cũ (LabelEncoder) bằng `from_label_encoder`,
+  chỉ số không đổi.
+"""
+
+from typing import Dict, Iterable
+
+import numpy as np
+
+
+class AppendOnlyEncoder:
+    def __init__(self):
+        self.classes_ = np.empty(0, dtype=object)
+        self._index: Dict[str, int] = {}
+
+    @classmethod
+    def from_label_encoder(cls, encoder) -> "AppendOnlyEncoder":
+        """Chuyển LabelEncoder (hoặc AppendOnlyEncoder) đã fit, giữ nguyên chỉ số."""
+        if isinstance(encoder, cls):
+            return encoder
+        out = cls()
+        out.extend(encoder.classes_)
+        return out
+
+    def __len__(self) -> int:
+        return len(self.classes_)
+
+    def extend(self, ids: Iterable) -> int:
+        """Thêm id chưa có (theo thứ tự xuất hiện). Return: số id mới."""
+        new = []
+        for value in ids:
+            key = str(value)
+            if key not in self._index:
+                self._index[key] = len(self._index)
+                new.append(key)
+        if new:
+            self.classes_ = np.concatenate([self.classes_, np.array(new, dtype=object)])
+        return len(new)
+
+    def fit(self, ids: Iterable) -> "AppendOnlyEncoder":
+        self.extend(ids)
+        return self
+
+    def transform(self, ids: Iterable) -> np.ndarray:
+        try:
+            return np.array([self._index[str(value)] for value in ids], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"y contains previously unseen labels: {e.args[0]}") from None
+
+    def fit_transform(self, ids: Iterable) -> np.ndarray:
+        ids = list(ids)
+        return self.fit(ids).transform(ids)
+
+    def inverse_transform(self, indices: Iterable) -> np.ndarray:
+        return self.classes_[np.asarray(indices, dtype=np.int64)]
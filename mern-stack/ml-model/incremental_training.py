@@ -0,0 +1,201 @@
+# incremental_training.py
+"""
+Train tăng dần mô hình gợi ý (train_recommendation_model.py).
+- Encoder append-only (id_encoder.py): id cũ giữ chỉ số, id mới nối vào cuối.
+- Nới bảng embedding: hàng cũ chép nguyên từ recommendation_model.h5, hàng mới khởi tạo như
+  Keras (uniform ±0.05); các lớp Dense giữ trọng số cũ.
+- Dữ liệu fine-tune: tương tác mới (đơn sau watermark lần train trước, hoặc có user/product mới)
+  + mẫu replay ngẫu nhiên từ tương tác cũ (tránh quên), thay vì toàn bộ lịch sử.
+  Watermark tính theo giây: đơn cùng giây với watermark là mới trừ khi _id nằm trong
+  watermark_order_ids (đơn của giây đó đã train) → không bỏ sót, không train lặp.
+- Trạng thái lần train (watermark, chế độ, số dòng, thời gian) lưu ở rec_train_meta.json.
+
+TensorFlow chỉ import bên trong hàm dựng/nới model (giống server.py).
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+
+from id_encoder import AppendOnlyEncoder
+from interaction_extract import Interactions
+
+TRAIN_META_FILE = "rec_train_meta.json"
+USER_ENCODER_FILE = "user_encoder.pkl"
+PRODUCT_ENCODER_FILE = "product_encoder.pkl"
+EMBEDDING_DIM = 50
+EMBEDDING_INIT = 0.05  # Keras Embedding mặc định: RandomUniform(-0.05, 0.05)
+
+
+# ---------------------------
+# Encoder + trạng thái train
+# ---------------------------
+def has_previous_model(model_path: str) -> bool:
+    return all(os.path.exists(p) for p in (model_path, USER_ENCODER_FILE, PRODUCT_ENCODER_FILE))
+
+
+def load_encoders(user_path: str = USER_ENCODER_FILE,
+                  product_path: str = PRODUCT_ENCODER_FILE) -> Tuple[AppendOnlyEncoder, AppendOnlyEncoder]:
+    """Encoder lần train trước (LabelEncoder cũ được chuyển, giữ chỉ số); chưa có → encoder rỗng."""
+    if os.path.exists(user_path) and os.path.exists(product_path):
+        return (AppendOnlyEncoder.from_label_encoder(joblib.load(user_path)),
+                AppendOnlyEncoder.from_label_encoder(joblib.load(product_path)))
+    return AppendOnlyEncoder(), AppendOnlyEncoder()
+
+
+def load_train_meta(path: str = TRAIN_META_FILE) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_train_meta(meta: dict, path: str = TRAIN_META_FILE) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def encode(data: Interactions, user_encoder: AppendOnlyEncoder,
+           product_encoder: AppendOnlyEncoder) -> Tuple[np.ndarray, np.ndarray, int, int]:
+    """Nối id mới vào encoder rồi đổi mã của `data` sang chỉ số encoder.
+    Return: (users, products) int32 theo encoder, số user cũ, số product cũ."""
+    old_users, old_products = len(user_encoder), len(product_encoder)
+    user_encoder.extend(data.user_classes)
+    product_encoder.extend(data.product_classes)
+    users = user_encoder.transform(data.user_classes).astype(np.int32)[data.users]
+    products = product_encoder.transform(data.product_classes).astype(np.int32)[data.products]
+    return users, products, old_users, old_products
+
+
+def select_rows(users: np.ndarray, products: np.ndarray, created: Optional[np.ndarray],
+                old_users: int, old_products: int, watermark: Optional[str],
+                replay_ratio: float = 2.0, seed: int = 42, order_ids: Optional[np.ndarray] = None,
+                seen_order_ids: Sequence[str] = ()) -> Tuple[np.ndarray, int, int]:
+    """Dòng dùng để fine-tune: dòng mới + replay_ratio × số dòng mới dòng cũ ngẫu nhiên.
+    Dòng mới = user/product mới hoặc đơn tạo từ watermark trở đi (>=), trừ đơn cùng giây watermark
+    có _id trong seen_order_ids (đã train ở lần trước); đơn không có ngày coi là cũ.
+    Return: (chỉ số dòng, số dòng mới, số dòng replay)."""
+    new = (users >= old_users) | (products >= old_products)
+    if created is not None and watermark:
+        cut = np.datetime64(watermark, "s")
+        new |= created > cut
+        at_cut = created == cut
+        if order_ids is not None:
+            at_cut &= ~np.isin(order_ids, np.asarray(list(seen_order_ids), dtype="S24"))
+        new |= at_cut
+    new_rows = np.flatnonzero(new)
+    old_rows = np.flatnonzero(~new)
+    n_replay = min(len(old_rows), int(round(replay_ratio * len(new_rows))))
+    rng = np.random.default_rng(seed)
+    rows = np.concatenate([new_rows, rng.choice(old_rows, size=n_replay, replace=False)])
+    rng.shuffle(rows)  # trộn: validation_split của Keras lấy phần cuối mảng
+    return rows, len(new_rows), n_replay
+
+
+def max_created(created: Optional[np.ndarray]) -> Optional[str]:
+    """Watermark mới = createdAt lớn nhất trong dữ liệu (chuỗi ISO, giây)."""
+    if created is None:
+        return None
+    dated = created[~np.isnat(created)]
+    return str(dated.max()) if len(dated) else None
+
+
+def watermark_order_ids(created: Optional[np.ndarray], order_ids: Optional[np.ndarray],
+                        watermark: Optional[str]) -> List[str]:
+    """_id các đơn tạo đúng giây watermark (đã train lần này) → lần sau không coi là mới."""
+    if created is None or order_ids is None or not watermark:
+        return []
+    ids = np.unique(order_ids[created == np.datetime64(watermark, "s")])
+    return [i.decode("ascii") for i in ids.tolist()]
+
+
+# ---------------------------
+# Model Keras
+# ---------------------------
+def build_model(n_users: int, n_products: int, learning_rate: float = 0.001, dim: int = EMBEDDING_DIM):
+    """Kiến trúc gốc: Embedding(user) ⊕ Embedding(product) → Dense 128 → Dense 64 → Dense 1."""
+    from tensorflow.keras.layers import Concatenate, Dense, Embedding, Flatten, Input
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.optimizers import Adam
+
+    user_input = Input(shape=(1,))
+    product_input = Input(shape=(1,))
+    user_embedding = Embedding(input_dim=n_users, output_dim=dim)(user_input)
+    product_embedding = Embedding(input_dim=n_products, output_dim=dim)(product_input)
+
+    user_vec = Flatten()(user_embedding)
+    product_vec = Flatten()(product_embedding)
+    concat = Concatenate()([user_vec, product_vec])
+    dense1 = Dense(128, activation="relu")(concat)
+    dense2 = Dense(64, activation="relu")(dense1)
+    output = Dense(1)(dense2)
+
+    model = Model(inputs=[user_input, product_input], outputs=output)
+    model.compile(optimizer=Adam(learning_rate), loss="mse")
+    return model
+
+
+def grow_rows(weights: np.ndarray, n_rows: int, seed: int = 42) -> np.ndarray:
+    """Bảng embedding (n_old, dim) → (n_rows, dim): giữ hàng cũ, hàng mới uniform ±EMBEDDING_INIT."""
+    n_old, dim = weights.shape
+    if n_rows < n_old:
+        raise ValueError(f"Không thu nhỏ được bảng embedding ({n_old} → {n_rows})")
+    extra = np.random.default_rng(seed).uniform(-EMBEDDING_INIT, EMBEDDING_INIT, (n_rows - n_old, dim))
+    return np.concatenate([weights, extra.astype(weights.dtype)])
+
+
+def _ordered_embeddings(model) -> list:
+    """2 lớp Embedding theo thứ tự input (user, product) — như NumpyRecommender.from_keras."""
+    embeddings = [l for l in model.layers if type(l).__name__ == "Embedding"]
+    inputs = list(getattr(model, "inputs", []) or [])
+
+    def input_index(layer) -> int:
+        for i, tensor in enumerate(inputs):
+            if layer.input is tensor:
+                return i
+        return len(inputs)
+
+    return sorted(embeddings, key=input_index)
+
+
+def grow_model(old_model, n_users: int, n_products: int, learning_rate: float = 0.0005):
+    """Model mới cùng kiến trúc với bảng embedding đã nới; chép toàn bộ trọng số cũ."""
+    user_old, product_old = (l.get_weights()[0] for l in _ordered_embeddings(old_model))
+    model = build_model(n_users, n_products, learning_rate, dim=user_old.shape[1])
+    user_new, product_new = _ordered_embeddings(model)
+    user_new.set_weights([grow_rows(user_old, n_users)])
+    product_new.set_weights([grow_rows(product_old, n_products, seed=43)])
+
+    old_dense = [l for l in old_model.layers if type(l).__name__ == "Dense"]
+    new_dense = [l for l in model.layers if type(l).__name__ == "Dense"]
+    for old, new in zip(old_dense, new_dense):
+        new.set_weights(old.get_weights())
+    return model
+
+
+def save_encoders(user_encoder: AppendOnlyEncoder, product_encoder: AppendOnlyEncoder) -> None:
+    joblib.dump(user_encoder, USER_ENCODER_FILE)
+    joblib.dump(product_encoder, PRODUCT_ENCODER_FILE)
+
+
+def train_meta(mode: str, watermark: Optional[str], rows: int, n_new: int, n_replay: int,
+               n_users: int, n_products: int, seconds: float, seen_order_ids: Sequence[str] = ()) -> dict:
+    return {
+        "mode": mode,
+        "watermark": watermark,
+        "watermark_order_ids": list(seen_order_ids),
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "rows_trained": rows,
+        "new_rows": n_new,
+        "replay_rows": n_replay,
+        "n_users": n_users,
+        "n_products": n_products,
+        "seconds": round(seconds, 1)
+    }
@@ -0,0 +1,167 @@
+# interaction_extract.py
+"""
+Trích dữ liệu train gợi ý (user, product, quantity) theo kiểu cột, đọc cursor theo lô.
+- Không dựng list tuple / DataFrame chuỗi: mỗi lô dòng từ MongoDB được mã hóa ngay thành
+  số nguyên (dict id → code) và ghi vào mảng NumPy tự giãn (int32, int32, float32).
+- Cuối cùng đánh lại mã theo thứ tự id đã sắp xếp → trùng khớp với LabelEncoder
+  (classes_ sắp xếp tăng dần), nên encoder .pkl và model cũ vẫn tương thích.
+- Báo cáo số dòng/giây và RSS đỉnh của process.
+
+Chạy thử (trong thư mục ml-model, chỉ trích xuất, không train):
+    python interaction_extract.py
+"""
+
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+
+from order_queries import user_product_rows
+
+
+def peak_rss_mb(who: str = "RUSAGE_SELF") -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(getattr(resource, who)).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def children_peak_rss_mb() -> Optional[float]:
+    """RSS đỉnh của process con lớn nhất đã kết thúc (worker của ProcessPoolExecutor); None nếu chưa có."""
+    return peak_rss_mb("RUSAGE_CHILDREN") or None
+
+
+class GrowableArray:
+    """Mảng NumPy 1 chiều thêm được theo lô, giãn gấp đôi khi đầy."""
+
+    def __init__(self, dtype, capacity: int = 1 << 16):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extend(self, values) -> None:
+        values = np.asarray(values, dtype=self._data.dtype)
+        end = self._size + len(values)
+        if end > len(self._data):
+            grown = np.empty(max(end, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:end] = values
+        self._size = end
+
+    def finish(self) -> np.ndarray:
+        """Mảng đúng kích thước (bản sao gọn, bỏ phần dư)."""
+        out = self._data[:self._size].copy()
+        self._data = np.empty(0, dtype=self._data.dtype)
+        self._size = 0
+        return out
+
+
+def remap_sorted(codes: np.ndarray, vocab: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Đổi mã theo thứ tự xuất hiện → mã theo thứ tự id tăng dần (giống LabelEncoder).
+    Mã -1 (thiếu id) giữ nguyên. Return: (mã mới, mảng id đã sắp xếp)."""
+    ids = np.array(list(vocab.keys()), dtype=str)
+    order = np.argsort(ids, kind="stable")
+    rank = np.empty(len(ids) + 1, dtype=np.int32)
+    rank[order] = np.arange(len(ids), dtype=np.int32)
+    rank[-1] = -1  # codes == -1 → rank[-1]
+    return rank[codes], ids[order]
+
+
+class Interactions:
+    def __init__(self, users: np.ndarray, products: np.ndarray, quantity: np.ndarray,
+                 user_classes: np.ndarray, product_classes: np.ndarray, report: Optional[dict] = None,
+                 created: Optional[np.ndarray] = None, order_ids: Optional[np.ndarray] = None):
+        self.users = users                      # int32, mã user (trùng user_encoder.transform)
+        self.products = products                # int32, mã product
+        self.quantity = quantity                # float32
+        self.user_classes = user_classes        # id user (str) theo mã
+        self.product_classes = product_classes  # id product (str) theo mã
+        self.report = report or {}
+        self.created = created                  # datetime64[s] createdAt của đơn (None nếu không có)
+        self.order_ids = order_ids              # S24 _id của đơn (None nếu không có)
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_classes)
+
+    @property
+    def n_products(self) -> int:
+        return len(self.product_classes)
+
+    def encoders(self) -> Tuple[LabelEncoder, LabelEncoder]:
+        """LabelEncoder tương đương fit_transform trên cột user/product cũ."""
+        return LabelEncoder().fit(self.user_classes), LabelEncoder().fit(self.product_classes)
+
+
+def extract_interactions(orders, match: Optional[dict] = None, batch_size: int = 50000,
+                         progress_every: int = 1_000_000) -> Interactions:
+    t0 = time.perf_counter()
+    user_vocab: Dict[str, int] = {}
+    product_vocab: Dict[str, int] = {}
+    users = GrowableArray(np.int32)
+    products = GrowableArray(np.int32)
+    quantity = GrowableArray(np.float32)
+
+    batch_u: List[int] = []
+    batch_p: List[int] = []
+    batch_q: List[float] = []
+    next_report = progress_every
+
+    def flush():
+        users.extend(batch_u)
+        products.extend(batch_p)
+        quantity.extend(batch_q)
+        batch_u.clear()
+        batch_p.clear()
+        batch_q.clear()
+
+    for row in user_product_rows(orders, match, batch_size=batch_size):
+        batch_u.append(user_vocab.setdefault(row["user"], len(user_vocab)))
+        batch_p.append(product_vocab.setdefault(row["product"], len(product_vocab)))
+        batch_q.append(row["quantity"])
+        if len(batch_u) >= batch_size:
+            flush()
+            if len(users) >= next_report:
+                rate = len(users) / (time.perf_counter() - t0)
+                print(f"[extract] {len(users):,} dòng, {rate:,.0f} dòng/s, RSS đỉnh {peak_rss_mb()} MB")
+                next_report += progress_every
+    flush()
+
+    user_codes, user_classes = remap_sorted(users.finish(), user_vocab)
+    product_codes, product_classes = remap_sorted(products.finish(), product_vocab)
+    seconds = time.perf_counter() - t0
+    report = {
+        "rows": len(user_codes),
+        "users": len(user_classes),
+        "products": len(product_classes),
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(len(user_codes) / seconds) if seconds > 0 else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+    return Interactions(user_codes, product_codes, quantity.finish(), user_classes, product_classes, report)
+
+
+if __name__ == "__main__":
+    import os
+
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise Exception("❌ MONGO_URI not found in .env")
+
+    data = extract_interactions(MongoClient(mongo_uri)["test"]["orders"])
+    print("✅", data.report)
@@ -0,0 +1,196 @@
+# item_similarity.py
+"""
+Index sản phẩm tương tự theo mua cùng nhau (item-item co-purchase), dạng CSR thưa.
+- Offline: ma trận nhị phân đơn hàng × sản phẩm B (scipy.sparse, từ snapshot orders_snapshot.py),
+  đồng xuất hiện C = Bᵀ·B tính theo khối hàng sản phẩm, chuẩn hóa cosine
+  C_ij / sqrt(n_i · n_j) (n_i = số đơn có sản phẩm i), bỏ đường chéo, chỉ giữ top-k láng giềng
+  mỗi sản phẩm → ghi indptr / indices / scores (.npy) + danh sách id sản phẩm.
+- Online: mở bằng memory-map; láng giềng của 1 sản phẩm = đọc 1 đoạn indices[indptr[i]:indptr[i+1]]
+  (O(k)), đủ rẻ để gọi trên mọi trang sản phẩm (/similar/<product_id>).
+- Gợi ý cho user chưa có trong mô hình DL: cộng điểm láng giềng của các sản phẩm mua gần đây.
+
+Chạy lại thủ công (trong thư mục ml-model, dùng snapshot db "test"):
+    python item_similarity.py [--k 20] [--min-co 1]
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+SIM_INDPTR_FILE = "item_sim_indptr.npy"
+SIM_INDICES_FILE = "item_sim_indices.npy"
+SIM_SCORES_FILE = "item_sim_scores.npy"
+SIM_PRODUCTS_FILE = "item_sim_products.npy"
+SIM_META_FILE = "item_sim_meta.json"
+
+
+# ---------------------------
+# Dựng index (offline)
+# ---------------------------
+def order_item_matrix(line_order: np.ndarray, line_product: np.ndarray, n_orders: int,
+                      n_products: int) -> sparse.csr_matrix:
+    """Ma trận nhị phân (đơn × sản phẩm); sản phẩm lặp trong 1 đơn chỉ tính 1 lần."""
+    data = np.ones(len(line_order), dtype=np.float32)
+    b = sparse.csr_matrix((data, (line_order, line_product)), shape=(n_orders, n_products))
+    b.sum_duplicates()
+    b.data[:] = 1.0
+    return b
+
+
+def top_k_neighbours(b: sparse.csr_matrix, k: int = 20, min_co: int = 1,
+                     block: int = 2048) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Top-k láng giềng cosine của mọi sản phẩm. Return: CSR (indptr int64, indices int32, scores float32)."""
+    n_products = b.shape[1]
+    bt = b.T.tocsr()
+    counts = np.asarray(b.sum(axis=0)).ravel()
+    norms = np.sqrt(np.maximum(counts, 1))
+
+    lengths = np.zeros(n_products, dtype=np.int64)
+    all_indices: List[np.ndarray] = []
+    all_scores: List[np.ndarray] = []
+    for start in range(0, n_products, block):
+        co = (bt[start:start + block] @ b).tocsr()  # (block, n_products) số đơn chung
+        for r in range(co.shape[0]):
+            lo, hi = co.indptr[r], co.indptr[r + 1]
+            cols, vals = co.indices[lo:hi], co.data[lo:hi]
+            keep = (cols != start + r) & (vals >= min_co)  # bỏ chính nó
+            cols, vals = cols[keep], vals[keep]
+            scores = vals / (norms[start + r] * norms[cols])
+            # Điểm bằng nhau → id sản phẩm nhỏ hơn trước (ổn định giữa các lần build)
+            top = np.lexsort((cols, -scores))[:k]
+            all_indices.append(cols[top].astype(np.int32))
+            all_scores.append(scores[top].astype(np.float32))
+            lengths[start + r] = len(top)
+
+    indptr = np.zeros(n_products + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.concatenate(all_indices) if all_indices else np.empty(0, dtype=np.int32)
+    scores = np.concatenate(all_scores) if all_scores else np.empty(0, dtype=np.float32)
+    return indptr, indices, scores
+
+
+def build_item_index(snapshot, k: int = 20, min_co: int = 1, out_dir: str = ".") -> dict:
+    """Dựng index từ OrdersSnapshot (mọi đơn, kể cả đơn không có userId) và ghi ra out_dir."""
+    t0 = time.perf_counter()
+    n_orders, n_products = len(snapshot.order_user), len(snapshot.product_ids)
+    b = order_item_matrix(np.asarray(snapshot.line_order), np.asarray(snapshot.line_product),
+                          n_orders, n_products)
+    indptr, indices, scores = top_k_neighbours(b, k, min_co)
+
+    arrays = {
+        SIM_INDPTR_FILE: indptr,
+        SIM_INDICES_FILE: indices,
+        SIM_SCORES_FILE: scores,
+        SIM_PRODUCTS_FILE: np.asarray(snapshot.product_ids)
+    }
+    for name, arr in arrays.items():
+        path = os.path.join(out_dir, name)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, arr)
+        os.replace(path + ".tmp", path)
+
+    meta = {
+        "k": k,
+        "min_co": min_co,
+        "n_products": n_products,
+        "n_orders": n_orders,
+        "n_pairs": int(len(indices)),
+        "snapshot_built_at": snapshot.meta.get("built_at"),
+        "built_at": datetime.utcnow().isoformat() + "Z",
+        "build_seconds": round(time.perf_counter() - t0, 2)
+    }
+    # Meta ghi sau cùng và thay nguyên file: server (load) không bao giờ thấy meta ghi dở
+    meta_path = os.path.join(out_dir, SIM_META_FILE)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+    print(f"✅ Đã dựng index sản phẩm tương tự: {n_products} sản phẩm, {meta['n_pairs']} cặp "
+          f"trong {meta['build_seconds']}s")
+    return meta
+
+
+# ---------------------------
+# Phục vụ (online)
+# ---------------------------
+class ItemSimilarityIndex:
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, scores: np.ndarray,
+                 product_ids: np.ndarray, meta: dict):
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self.product_ids = product_ids
+        self.meta = meta
+        self.index_of: Dict[str, int] = {str(pid): i for i, pid in enumerate(product_ids)}
+
+    @classmethod
+    def load(cls, out_dir: str = ".") -> Optional["ItemSimilarityIndex"]:
+        """Mở index bằng memory-map; None nếu chưa dựng."""
+        meta_path = os.path.join(out_dir, SIM_META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = [np.load(os.path.join(out_dir, name), mmap_mode="r")
+                  for name in (SIM_INDPTR_FILE, SIM_INDICES_FILE, SIM_SCORES_FILE, SIM_PRODUCTS_FILE)]
+        return cls(*arrays, meta=meta)
+
+    @property
+    def n_products(self) -> int:
+        return len(self.product_ids)
+
+    def neighbours(self, product_id: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k sản phẩm hay được mua cùng (id, điểm cosine), đã sắp giảm dần; [] nếu không biết sản phẩm."""
+        i = self.index_of.get(product_id)
+        if i is None:
+            return []
+        lo = int(self.indptr[i])
+        hi = min(int(self.indptr[i + 1]), lo + k)
+        ids = self.product_ids[self.indices[lo:hi]].tolist()
+        return list(zip(ids, self.scores[lo:hi].tolist()))
+
+    def recommend(self, product_ids: Sequence[str], k: int = 5,
+                  exclude: Sequence[str] = ()) -> List[str]:
+        """Gợi ý từ nhiều sản phẩm (vd. mua gần đây, mới nhất trước): cộng điểm láng giềng,
+        sản phẩm đứng trước có trọng số cao hơn (1, 1/2, 1/3, ...). Bỏ các id trong exclude."""
+        seen = {self.index_of[p] for p in (*product_ids, *exclude) if p in self.index_of}
+        totals: Dict[int, float] = {}
+        for rank, pid in enumerate(product_ids):
+            i = self.index_of.get(pid)
+            if i is None:
+                continue
+            lo, hi = int(self.indptr[i]), int(self.indptr[i + 1])
+            weight = 1.0 / (rank + 1)
+            for j, s in zip(self.indices[lo:hi].tolist(), self.scores[lo:hi].tolist()):
+                if j not in seen:
+                    totals[j] = totals.get(j, 0.0) + weight * s
+        ranked = sorted(totals.items(), key=lambda x: (-x[1], x[0]))[:k]
+        return [str(self.product_ids[j]) for j, _ in ranked]
+
+    def stats(self) -> dict:
+        return {"n_products": self.n_products, "k": self.meta.get("k"), "n_pairs": self.meta.get("n_pairs"),
+                "built_at": self.meta.get("built_at")}
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    from orders_snapshot import OrdersSnapshot
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--min-co", type=int, default=1, help="số đơn chung tối thiểu")
+    parser.add_argument("--db", default="test")
+    args = parser.parse_args()
+
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise Exception("❌ MONGO_URI not found in .env")
+    build_item_index(OrdersSnapshot.load_or_build(MongoClient(mongo_uri)[args.db]), args.k, args.min_co)
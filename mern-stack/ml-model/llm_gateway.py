@@ -0,0 +1,162 @@
+# llm_gateway.py
+"""
+Cổng gọi LLM (Gemini) dùng chung cho chatbot, để Gemini chậm không chiếm hết worker của server.
+- Giới hạn số lời gọi upstream đồng thời (`max_concurrent`), chạy trên thread pool riêng.
+- Hàng chờ có giới hạn thời gian: chờ slot quá `queue_timeout` → GatewayBusy (trả 503 ngay).
+- Giới hạn tổng số request đang nằm trong gateway (`max_waiting`: đang gọi + đang chờ slot +
+  đang chờ kết quả gộp) — mỗi request này giữ 1 worker Flask, nên đặt nhỏ hơn số worker của
+  server để /recommend, /forecast luôn còn worker trống khi chat bị bão hòa.
+- Deadline mỗi lời gọi (`call_timeout`, tính cả thời gian chờ): quá hạn → GatewayTimeout (504),
+  worker Flask được giải phóng; lời gọi upstream vẫn giữ slot tới khi thật sự kết thúc
+  nên giới hạn đồng thời luôn đúng.
+- Gộp lời gọi trùng: các request cùng khóa (câu hỏi đã chuẩn hóa + context) đang chạy
+  dùng chung 1 lời gọi upstream.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class GatewayBusy(Exception):
+    """Hết slot gọi LLM và chờ quá queue_timeout."""
+
+
+class GatewayTimeout(Exception):
+    """Lời gọi LLM vượt quá deadline."""
+
+
+class LLMGateway:
+    def __init__(self, max_concurrent: int = 4, queue_timeout: float = 2.0, call_timeout: float = 30.0,
+                 max_waiting: Optional[int] = None):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting or 2 * max_concurrent
+        self.queue_timeout = queue_timeout
+        self.call_timeout = call_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="llm-gateway")
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._counts = {"calls": 0, "coalesced": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+        self._active = 0
+        self._waiting = 0
+        self._upstream_seconds = 0.0
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += n
+
+    def _enter(self) -> None:
+        with self._lock:
+            if self._waiting >= self.max_waiting:
+                self._counts["rejected"] += 1
+                raise GatewayBusy(f"Đã có {self.max_waiting} request chat đang chờ")
+            self._waiting += 1
+
+    def _leave(self) -> None:
+        with self._lock:
+            self._waiting -= 1
+
+    def _acquire(self) -> None:
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count("rejected")
+            raise GatewayBusy(f"Quá {self.max_concurrent} lời gọi LLM đồng thời")
+        with self._lock:
+            self._active += 1
+
+    def _release(self, seconds: float) -> None:
+        with self._lock:
+            self._active -= 1
+            self._upstream_seconds += seconds
+        self._slots.release()
+
+    def call(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Gọi fn(*args, **kwargs) qua gateway; request cùng `key` đang chạy sẽ dùng chung kết quả."""
+        self._enter()
+        try:
+            return self._call(key, fn, args, kwargs)
+        finally:
+            self._leave()
+
+    def _call(self, key: Hashable, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        deadline = time.monotonic() + self.call_timeout
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self._counts["coalesced"] += 1
+
+        if leader:
+            try:
+                self._acquire()
+            except GatewayBusy as e:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                future.set_exception(e)
+                raise
+            self._count("calls")
+            self._executor.submit(self._run, key, future, fn, args, kwargs)
+
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeout:
+            self._count("timeouts")
+            raise GatewayTimeout(f"LLM không trả lời trong {self.call_timeout}s")
+
+    def _run(self, key: Hashable, future: Future, fn: Callable, args: tuple, kwargs: dict) -> None:
+        t0 = time.perf_counter()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            self._count("errors")
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            self._release(time.perf_counter() - t0)
+
+    @contextmanager
+    def slot(self):
+        """Giữ 1 slot trong suốt khối lệnh (dùng cho streaming — không gộp lời gọi).
+        Trả về hàm `check()`: gọi giữa các chunk, quá `call_timeout` (tính từ lúc vào gateway,
+        giống call()) → GatewayTimeout để bên gọi đóng stream và trả slot.
+        """
+        deadline = time.monotonic() + self.call_timeout
+
+        def check() -> None:
+            if time.monotonic() > deadline:
+                self._count("timeouts")
+                raise GatewayTimeout(f"LLM không trả lời xong trong {self.call_timeout}s")
+
+        self._enter()
+        try:
+            self._acquire()
+            self._count("calls")
+            t0 = time.perf_counter()
+            try:
+                yield check
+            finally:
+                self._release(time.perf_counter() - t0)
+        finally:
+            self._leave()
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self._counts["calls"]
+            return {
+                **self._counts,
+                "active": self._active,
+                "waiting": self._waiting,
+                "max_waiting": self.max_waiting,
+                "in_flight_keys": len(self._inflight),
+                "max_concurrent": self.max_concurrent,
+                "queue_timeout": self.queue_timeout,
+                "call_timeout": self.call_timeout,
+                "avg_upstream_seconds": round(self._upstream_seconds / calls, 3) if calls else None
+            }
@@ -0,0 +1,88 @@
+# market_snapshot.py
+"""
+Snapshot dữ liệu thị trường (Google Trends + Shopee) theo kiểu stale-while-revalidate.
+- Giữ bản mới nhất trong RAM và trên đĩa (market_snapshot.json) → restart không phải fetch lại.
+- Request luôn nhận ngay bản tốt gần nhất kèm tuổi (giây); khi bản đã quá TTL thì 1 thread
+  nền fetch lại (chỉ 1 lần fetch chạy cùng lúc).
+- Lần fetch trả về rỗng (Trends lỗi + Shopee chặn) không ghi đè bản tốt trước đó.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+
+class MarketSnapshot:
+    def __init__(self, fetch: Callable[[], dict], path: str = "market_snapshot.json", ttl: float = 6 * 3600):
+        self.fetch = fetch
+        self.path = path
+        self.ttl = ttl
+        self.data: Optional[dict] = None
+        self.fetched_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._refreshing = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+            self.data, self.fetched_at = saved["data"], saved["fetched_at"]
+        except Exception as e:
+            print(f"⚠️ Không đọc được {self.path}: {e}")
+
+    def _save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self.fetched_at, "data": self.data}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _is_empty(data: dict) -> bool:
+        trends = data.get("market_trends", {})
+        gt = trends.get("google_trends_raw", {})
+        shopee = trends.get("shopee_stats_raw", {})
+        return not gt.get("avg_interest") and not any(v.get("items_count") for v in shopee.values())
+
+    def age_seconds(self) -> Optional[float]:
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+    def refresh(self) -> bool:
+        """Fetch lại (bỏ qua nếu đang có lần fetch khác chạy). True nếu snapshot được cập nhật."""
+        if not self._refreshing.acquire(blocking=False):
+            return False
+        try:
+            data = self.fetch()
+            if self._is_empty(data) and self.data is not None:
+                self.last_error = "Dữ liệu thị trường rỗng, giữ snapshot cũ"
+                return False
+            self.data, self.fetched_at, self.last_error = data, time.time(), None
+            self._save()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ Không cập nhật được market snapshot: {e}")
+            return False
+        finally:
+            self._refreshing.release()
+
+    def refresh_in_background(self) -> None:
+        threading.Thread(target=self.refresh, name="market-snapshot-refresh", daemon=True).start()
+
+    def get(self) -> Tuple[dict, float]:
+        """(market_data, tuổi theo giây). Chưa từng có snapshot → fetch đồng bộ lần đầu."""
+        if self.data is None:
+            self.refresh()
+            if self.data is None:
+                # Vẫn chờ lần fetch đang chạy ở thread khác (nếu có) rồi đọc lại
+                with self._refreshing:
+                    pass
+            if self.data is None:
+                raise Exception(f"Chưa có dữ liệu thị trường: {self.last_error}")
+        elif self.age_seconds() > self.ttl:
+            self.refresh_in_background()
+        return self.data, self.age_seconds()
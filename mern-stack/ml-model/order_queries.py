@@ -0,0 +1,167 @@
+# order_queries.py
+"""
+Tầng truy vấn đơn hàng bằng aggregation pipeline của MongoDB.
+- `$unwind` products, `$group`, tách năm/tháng từ createdAt ngay trên server,
+  projection chặt → chỉ các dòng đã tổng hợp được gửi về Python.
+- Dùng cho server.py (forecast) và interaction_extract.py; các script train/đánh giá
+  đọc snapshot cột (orders_snapshot.py) thay vì query trực tiếp.
+- Chỉ dùng các toán tử mà cả mongod lẫn mongomock đều hỗ trợ ($match/$project/$unwind/
+  $group/$toString/$year/$month/$max/$sum/$ifNull) để test được bằng mongomock.
+
+createdAt lưu bởi mongoose là kiểu Date → xử lý hoàn toàn trên server. Dữ liệu cũ import
+với createdAt dạng chuỗi ISO / {"$date": ...} (hiếm) được đọc riêng và parse bằng Python.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CREATED_AT_IS_DATE = {"createdAt": {"$type": "date"}}
+CREATED_AT_IS_LEGACY = {"$or": [{"createdAt": {"$type": "string"}}, {"createdAt": {"$type": "object"}}]}
+CREATED_AT_NOT_LEGACY = {"$nor": CREATED_AT_IS_LEGACY["$or"]}  # Date hoặc không có createdAt
+HAS_USER = {"userId": {"$ne": None}}
+
+
+def parse_created_at(created_at) -> Optional[datetime]:
+    """Chuẩn hóa createdAt (datetime / {"$date": ...} / ISO string) → datetime UTC không tz
+    (giống datetime pymongo trả về), lỗi → None."""
+    if isinstance(created_at, dict) and "$date" in created_at:
+        created_at = created_at["$date"]
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(created_at, datetime):
+        return None
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at
+
+
+def _with(match: Optional[dict], extra: dict) -> dict:
+    return {"$and": [match, extra]} if match else extra
+
+
+# ---------------------------
+# Số lượng bán theo (productId, year, month)
+# ---------------------------
+def monthly_product_quantities(orders, match: Optional[dict] = None) -> List[dict]:
+    """Tổng hợp line items theo (productId, year, month).
+    Return: list dict productId (str), year, month, quantity (tổng số lượng),
+            lines (số dòng sản phẩm), last_created_at (createdAt lớn nhất).
+    """
+    pipeline = [
+        {"$match": _with(match, CREATED_AT_IS_DATE)},
+        {"$project": {"_id": 0, "createdAt": 1, "products.productId": 1, "products.quantity": 1}},
+        {"$unwind": "$products"},
+        {"$match": {"products.productId": {"$ne": None}, "products.quantity": {"$ne": None}}},
+        {"$group": {
+            "_id": {
+                "productId": {"$toString": "$products.productId"},
+                "year": {"$year": "$createdAt"},
+                "month": {"$month": "$createdAt"}
+            },
+            "quantity": {"$sum": "$products.quantity"},
+            "lines": {"$sum": 1},
+            "last_created_at": {"$max": "$createdAt"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "productId": "$_id.productId",
+            "year": "$_id.year",
+            "month": "$_id.month",
+            "quantity": 1,
+            "lines": 1,
+            "last_created_at": 1
+        }}
+    ]
+    rows = {
+        (r["productId"], r["year"], r["month"]): r
+        for r in orders.aggregate(pipeline, allowDiskUse=True)
+    }
+    _merge_legacy_monthly_rows(orders, match, rows)
+    return list(rows.values())
+
+
+def _merge_legacy_monthly_rows(orders, match: Optional[dict], rows: Dict[Tuple[str, int, int], dict]) -> None:
+    projection = {"createdAt": 1, "products.productId": 1, "products.quantity": 1}
+    for order in orders.find(_with(match, CREATED_AT_IS_LEGACY), projection):
+        created_at = parse_created_at(order.get("createdAt"))
+        if created_at is None:
+            continue
+        for p in order.get("products", []):
+            pid = p.get("productId")
+            qty = p.get("quantity")
+            if not pid or qty is None:
+                continue
+            key = (str(pid), created_at.year, created_at.month)
+            row = rows.setdefault(key, {
+                "productId": key[0], "year": key[1], "month": key[2],
+                "quantity": 0, "lines": 0, "last_created_at": created_at
+            })
+            row["quantity"] += qty
+            row["lines"] += 1
+            row["last_created_at"] = max(row["last_created_at"], created_at)
+
+
+# ---------------------------
+# Tương tác user - product (train gợi ý)
+# ---------------------------
+def user_product_rows(orders, match: Optional[dict] = None, batch_size: int = 10000) -> Iterator[dict]:
+    """Mỗi line item 1 dòng {user, product, quantity} (id dạng str, quantity thiếu → 1)."""
+    pipeline = [
+        {"$match": _with(match, HAS_USER)},
+        {"$project": {"_id": 0, "userId": 1, "products.productId": 1, "products.quantity": 1}},
+        {"$unwind": "$products"},
+        {"$match": {"products.productId": {"$ne": None}}},
+        {"$project": {
+            "user": {"$toString": "$userId"},
+            "product": {"$toString": "$products.productId"},
+            "quantity": {"$ifNull": ["$products.quantity", 1]}
+        }}
+    ]
+    return orders.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size)
+
+
+# ---------------------------
+# Thống kê đơn hàng theo user (lead scoring)
+# ---------------------------
+def user_order_stats(orders, match: Optional[dict] = None) -> List[dict]:
+    """Return: list dict user_id (str), total_spent, order_count, last_order_date.
+    `$max` chỉ chạy trên đơn có createdAt kiểu Date (trộn chuỗi / Date thì so sánh khác nhau giữa
+    mongod và mongomock); đơn createdAt dạng cũ được cộng dồn bằng Python."""
+    pipeline = [
+        {"$match": _with(match, {"$and": [HAS_USER, CREATED_AT_NOT_LEGACY]})},
+        {"$group": {
+            "_id": "$userId",
+            "total_spent": {"$sum": "$total"},
+            "order_count": {"$sum": 1},
+            "last_order_date": {"$max": "$createdAt"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": {"$toString": "$_id"},
+            "total_spent": 1,
+            "order_count": 1,
+            "last_order_date": 1
+        }}
+    ]
+    stats = {r["user_id"]: r for r in orders.aggregate(pipeline, allowDiskUse=True)}
+    _merge_legacy_user_stats(orders, match, stats)
+    return list(stats.values())
+
+
+def _merge_legacy_user_stats(orders, match: Optional[dict], stats: Dict[str, dict]) -> None:
+    projection = {"userId": 1, "total": 1, "createdAt": 1}
+    for order in orders.find(_with(match, {"$and": [HAS_USER, CREATED_AT_IS_LEGACY]}), projection):
+        user_id = str(order["userId"])
+        row = stats.setdefault(user_id, {
+            "user_id": user_id, "total_spent": 0, "order_count": 0, "last_order_date": None
+        })
+        total = order.get("total")
+        if isinstance(total, (int, float)):
+            row["total_spent"] += total
+        row["order_count"] += 1
+        created_at = parse_created_at(order.get("createdAt"))
+        if created_at is not None and (row["last_order_date"] is None or created_at > row["last_order_date"]):
+            row["last_order_date"] = created_at
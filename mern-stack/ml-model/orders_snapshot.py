@@ -0,0 +1,298 @@
+# orders_snapshot.py
+"""
+Snapshot đơn hàng dạng cột (.npy) dùng chung cho các script train / đánh giá.
+- Đọc MongoDB 1 lần (orders + line items + users), ghi ra thư mục `orders_snapshot/<db>/`;
+  forecast_model.py, train_lead_prediction.py, train_recommendation_model.py,
+  evaluate_recommendation.py mở lại bằng memory-map thay vì tự query Mongo.
+- Id thống nhất: mọi id (user, product) đổi sang str rồi mã hóa int32 theo thứ tự id đã
+  sắp xếp (giống LabelEncoder); -1 = thiếu id.
+- Ngày thống nhất: createdAt (Date / chuỗi ISO / {"$date": ...}) parse 1 lần bằng
+  parse_created_at → datetime64[s] UTC; không parse được → NaT.
+- Ghi vào thư mục tạm rồi đổi tên → script khác không bao giờ đọc phải snapshot dở dang.
+
+Bảng (mỗi cột 1 file .npy):
+    orders:  order_user (int32), order_created (datetime64[s]), order_total (float64, thiếu → NaN),
+             order_ids (S24, str(_id) — phân biệt đơn cùng giây với watermark khi train tăng dần)
+    lines:   line_order (int32, chỉ số dòng trong orders), line_product (int32),
+             line_quantity (float32, thiếu → NaN)
+    users:   user_ids / product_ids (vocab str), user_created (datetime64[s]),
+             user_is_customer (bool) — căn theo mã user
+
+Dựng lại thủ công (trong thư mục ml-model):
+    python orders_snapshot.py            # db "test"
+    python orders_snapshot.py marathon
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from interaction_extract import GrowableArray, Interactions, peak_rss_mb, remap_sorted
+from order_queries import parse_created_at
+
+SNAPSHOT_DIR = "orders_snapshot"
+META_FILE = "meta.json"
+MAX_AGE = float(os.getenv("ORDERS_SNAPSHOT_MAX_AGE", 6 * 3600))
+COLUMNS = [
+    "order_user", "order_created", "order_total", "order_ids",
+    "line_order", "line_product", "line_quantity",
+    "user_ids", "product_ids", "user_created", "user_is_customer"
+]
+
+ORDER_PROJECTION = {"userId": 1, "createdAt": 1, "total": 1, "products.productId": 1, "products.quantity": 1}
+USER_PROJECTION = {"role": 1, "createdAt": 1}
+
+
+def _number(value) -> float:
+    """Giá trị số → float, còn lại (None, chuỗi...) → NaN (giống $sum bỏ qua giá trị không phải số)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+def snapshot_path(db_name: str, root: str = SNAPSHOT_DIR) -> str:
+    return os.path.join(root, db_name)
+
+
+# ---------------------------
+# Dựng snapshot từ MongoDB
+# ---------------------------
+def build_snapshot(db, path: Optional[str] = None, batch_size: int = 10000) -> "OrdersSnapshot":
+    """Quét orders + users 1 lượt (cursor theo lô), ghi snapshot .npy. Return: snapshot đã mở (mmap)."""
+    path = path or snapshot_path(db.name)
+    t0 = time.perf_counter()
+    user_vocab: Dict[str, int] = {}
+    product_vocab: Dict[str, int] = {}
+
+    order_user = GrowableArray(np.int32)
+    order_created = GrowableArray("datetime64[s]")
+    order_total = GrowableArray(np.float64)
+    order_ids = GrowableArray("S24")
+    line_order = GrowableArray(np.int32)
+    line_product = GrowableArray(np.int32)
+    line_quantity = GrowableArray(np.float32)
+    batch = {"ou": [], "oc": [], "ot": [], "oi": [], "lo": [], "lp": [], "lq": []}
+
+    def flush():
+        order_user.extend(batch["ou"])
+        order_created.extend(np.array(batch["oc"], dtype="datetime64[s]"))
+        order_total.extend(batch["ot"])
+        order_ids.extend(batch["oi"])
+        line_order.extend(batch["lo"])
+        line_product.extend(batch["lp"])
+        line_quantity.extend(batch["lq"])
+        for values in batch.values():
+            values.clear()
+
+    n_orders = 0
+    for order in db["orders"].find({}, ORDER_PROJECTION, batch_size=batch_size):
+        uid = order.get("userId")
+        batch["ou"].append(-1 if uid is None else user_vocab.setdefault(str(uid), len(user_vocab)))
+        batch["oc"].append(parse_created_at(order.get("createdAt")))
+        batch["ot"].append(_number(order.get("total")))
+        batch["oi"].append(str(order["_id"]).encode("ascii", "replace")[:24])
+        for p in order.get("products") or []:
+            pid = p.get("productId")
+            if pid is None:
+                continue
+            batch["lo"].append(n_orders)
+            batch["lp"].append(product_vocab.setdefault(str(pid), len(product_vocab)))
+            batch["lq"].append(_number(p.get("quantity")))
+        n_orders += 1
+        if len(batch["ou"]) >= batch_size:
+            flush()
+    flush()
+
+    # users: gộp vào cùng vocab (khách chưa mua vẫn có mã)
+    user_code, user_created, user_customer = [], [], []
+    for user in db["users"].find({}, USER_PROJECTION, batch_size=batch_size):
+        user_code.append(user_vocab.setdefault(str(user["_id"]), len(user_vocab)))
+        user_created.append(parse_created_at(user.get("createdAt")))
+        user_customer.append(user.get("role") == "customer")
+
+    order_user_codes, user_ids = remap_sorted(order_user.finish(), user_vocab)
+    line_product_codes, product_ids = remap_sorted(line_product.finish(), product_vocab)
+    user_rows, _ = remap_sorted(np.asarray(user_code, dtype=np.int32), user_vocab)
+    created_by_user = np.full(len(user_ids), np.datetime64("NaT"), dtype="datetime64[s]")
+    created_by_user[user_rows] = np.array(user_created, dtype="datetime64[s]")
+    customer_by_user = np.zeros(len(user_ids), dtype=bool)
+    customer_by_user[user_rows] = user_customer
+
+    columns = {
+        "order_user": order_user_codes,
+        "order_created": order_created.finish(),
+        "order_total": order_total.finish(),
+        "order_ids": order_ids.finish(),
+        "line_order": line_order.finish(),
+        "line_product": line_product_codes,
+        "line_quantity": line_quantity.finish(),
+        "user_ids": user_ids,
+        "product_ids": product_ids,
+        "user_created": created_by_user,
+        "user_is_customer": customer_by_user
+    }
+    seconds = time.perf_counter() - t0
+    meta = {
+        "db": db.name,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "built_ts": time.time(),
+        "orders": len(columns["order_user"]),
+        "lines": len(columns["line_order"]),
+        "users": len(user_ids),
+        "products": len(product_ids),
+        "seconds": round(seconds, 3),
+        "peak_rss_mb": peak_rss_mb()
+    }
+    _write(path, columns, meta)
+    print(f"📸 Snapshot {path}: {meta['orders']:,} đơn, {meta['lines']:,} dòng, "
+          f"{meta['users']:,} user trong {meta['seconds']}s (RSS đỉnh {meta['peak_rss_mb']} MB)")
+    return OrdersSnapshot(path)
+
+
+def _write(path: str, columns: Dict[str, np.ndarray], meta: dict) -> None:
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in COLUMNS:
+        np.save(os.path.join(tmp, f"{name}.npy"), columns[name])
+    with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    # Đổi tên thư mục: bản cũ → .old, bản mới → path (mỗi bước đều nguyên tử)
+    old = f"{path}.old-{os.getpid()}"
+    if os.path.isdir(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+# ---------------------------
+# Đọc snapshot (memory-map)
+# ---------------------------
+class OrdersSnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+
+    @classmethod
+    def load_or_build(cls, db, path: Optional[str] = None, max_age: Optional[float] = MAX_AGE) -> "OrdersSnapshot":
+        """Mở snapshot có sẵn nếu còn mới (tuổi <= max_age giây, None = không hết hạn), ngược lại dựng lại."""
+        path = path or snapshot_path(db.name)
+        try:
+            snapshot = cls(path)
+        except (OSError, ValueError):
+            return build_snapshot(db, path)
+        if max_age is not None and snapshot.age_seconds() > max_age:
+            return build_snapshot(db, path)
+        print(f"📸 Dùng snapshot {path} (tạo lúc {snapshot.meta['built_at']})")
+        return snapshot
+
+    def age_seconds(self) -> float:
+        return time.time() - self.meta["built_ts"]
+
+    @property
+    def line_user(self) -> np.ndarray:
+        return self.order_user[self.line_order]
+
+    # ---- forecast ----
+    def monthly_product_quantities(self) -> pd.DataFrame:
+        """Giống order_queries.monthly_product_quantities: chỉ đơn có createdAt hợp lệ, dòng có quantity.
+        Return: DataFrame productId, year, month, quantity, lines, last_created_at."""
+        created = self.order_created[self.line_order]
+        keep = ~np.isnat(created) & ~np.isnan(self.line_quantity)
+        created = created[keep]
+        df = pd.DataFrame({
+            "product": self.line_product[keep],
+            "year": created.astype("datetime64[Y]").astype(np.int64) + 1970,
+            "month": created.astype("datetime64[M]").astype(np.int64) % 12 + 1,
+            "quantity": self.line_quantity[keep].astype(np.float64),
+            "lines": 1,
+            "last_created_at": created
+        })
+        grouped = df.groupby(["product", "year", "month"], sort=False).agg(
+            quantity=("quantity", "sum"), lines=("lines", "sum"), last_created_at=("last_created_at", "max")
+        ).reset_index()
+        grouped.insert(0, "productId", self.product_ids[grouped.pop("product").to_numpy()])
+        return grouped
+
+    # ---- gợi ý ----
+    def interactions(self) -> Interactions:
+        """Dòng (user, product, quantity) giống interaction_extract: đơn có userId, quantity thiếu → 1.
+        Mã user/product đánh lại trên tập id có mặt → trùng LabelEncoder.fit_transform cũ."""
+        t0 = time.perf_counter()
+        users = self.line_user
+        keep = users >= 0
+        used_users, user_codes = np.unique(users[keep], return_inverse=True)
+        used_products, product_codes = np.unique(self.line_product[keep], return_inverse=True)
+        quantity = np.nan_to_num(self.line_quantity[keep], nan=1.0).astype(np.float32)
+        seconds = time.perf_counter() - t0
+        report = {
+            "rows": len(quantity),
+            "users": len(used_users),
+            "products": len(used_products),
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(len(quantity) / seconds) if seconds > 0 else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "snapshot": self.path
+        }
+        rows_order = self.line_order[keep]
+        return Interactions(user_codes.astype(np.int32), product_codes.astype(np.int32), quantity,
+                            self.user_ids[used_users], self.product_ids[used_products], report,
+                            created=self.order_created[rows_order], order_ids=self.order_ids[rows_order])
+
+    def order_records(self) -> Iterator[dict]:
+        """Đơn có userId dạng dict {"userId", "products": [{"productId", "quantity"}]} (id str)."""
+        starts = np.searchsorted(self.line_order, np.arange(len(self.order_user) + 1))
+        for i in np.flatnonzero(self.order_user >= 0):
+            lo, hi = starts[i], starts[i + 1]
+            yield {
+                "userId": str(self.user_ids[self.order_user[i]]),
+                "products": [
+                    {"productId": str(self.product_ids[p]), "quantity": float(q)}
+                    for p, q in zip(self.line_product[lo:hi], self.line_quantity[lo:hi])
+                ]
+            }
+
+    # ---- lead scoring ----
+    def user_order_stats(self) -> pd.DataFrame:
+        """Giống order_queries.user_order_stats. Return: DataFrame user_id, total_spent, order_count,
+        last_order_date (datetime đã chuẩn hóa)."""
+        keep = self.order_user >= 0
+        df = pd.DataFrame({
+            "user": self.order_user[keep],
+            "total": self.order_total[keep],
+            "created": self.order_created[keep]
+        })
+        grouped = df.groupby("user", sort=False).agg(
+            total_spent=("total", "sum"), order_count=("total", "size"), last_order_date=("created", "max")
+        ).reset_index()
+        grouped.insert(0, "user_id", self.user_ids[grouped.pop("user").to_numpy()])
+        return grouped
+
+    def customers(self) -> pd.DataFrame:
+        """User role "customer". Return: DataFrame user_id, created_at."""
+        rows = np.flatnonzero(self.user_is_customer)
+        return pd.DataFrame({"user_id": self.user_ids[rows], "created_at": self.user_created[rows]})
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise Exception("❌ MONGO_URI not found in .env")
+
+    db_name = sys.argv[1] if len(sys.argv) > 1 else "test"
+    snapshot = build_snapshot(MongoClient(mongo_uri)[db_name])
+    print("✅", snapshot.meta)
@@ -0,0 +1,193 @@
+# product_catalog.py
+"""
+Catalog sản phẩm dùng chung trong 1 process (server.py + chatbot.py).
+- Lấy nhiều sản phẩm bằng 1 truy vấn `$in` thay vì `find_one` cho từng id.
+- Cache LRU/TTL theo ObjectId (kể cả id không tồn tại, để không hỏi lại DB).
+- Vô hiệu hóa cache theo watermark `updatedAt` (polling) hoặc change stream
+  nếu MongoDB chạy replica set.
+- `list_active()` trả về toàn bộ sản phẩm chưa xóa, chỉ load 1 lần / process
+  cho tới khi catalog thay đổi.
+- Catalog dùng chung là component "product_catalog" (components.py): MongoClient và thread change
+  stream chỉ được tạo khi server gọi components.start(), không phải lúc import module.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from components import components
+from ttl_cache import LRUCache
+
+# Chỉ lấy các trường mà server/chatbot thực sự dùng
+PRODUCT_PROJECTION = {
+    "nameProduct": 1,
+    "price": 1,
+    "sale": 1,
+    "desc": 1,
+    "images": 1,
+    "is_deleted": 1,
+    "updatedAt": 1
+}
+
+_NOT_FOUND = object()
+
+
+class ProductCatalog:
+    def __init__(self, collection, maxsize: int = 5000, ttl: float = 600, poll_interval: float = 30):
+        self.collection = collection
+        self.poll_interval = poll_interval
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._active: Optional[List[dict]] = None
+        self._watermark: Optional[datetime] = None
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+        self._watch_thread: Optional[threading.Thread] = None
+        # Tăng mỗi khi phát hiện sản phẩm thay đổi → dùng làm "phiên bản catalog"
+        self.version = 0
+
+    # ---------------------------
+    # Đọc sản phẩm
+    # ---------------------------
+    def get(self, pid: str) -> Optional[dict]:
+        return self.get_many([pid]).get(str(pid))
+
+    def get_many(self, pids: Iterable[str]) -> Dict[str, dict]:
+        """Trả về dict str(_id) → document cho các id tồn tại. Miss cache → 1 query `$in`."""
+        self._maybe_poll()
+
+        wanted = {}
+        for pid in pids:
+            try:
+                wanted[ObjectId(str(pid))] = str(pid)
+            except (InvalidId, TypeError):
+                continue
+
+        cached = self._cache.get_many(wanted.keys())
+        missing = [oid for oid in wanted if oid not in cached]
+        if missing:
+            for doc in self.collection.find({"_id": {"$in": missing}}, PRODUCT_PROJECTION):
+                cached[doc["_id"]] = doc
+                # Không đẩy watermark ở đây: bản sửa chỉ thấy qua đọc lẻ vẫn phải được refresh()
+                # phát hiện để làm mới list_active() / version
+                self._cache.set(doc["_id"], doc)
+            for oid in missing:
+                if oid not in cached:
+                    self._cache.set(oid, _NOT_FOUND)
+
+        return {
+            wanted[oid]: doc
+            for oid, doc in cached.items()
+            if doc is not _NOT_FOUND
+        }
+
+    def list_active(self) -> List[dict]:
+        """Toàn bộ sản phẩm chưa xóa (is_deleted=False), load 1 lần cho tới khi catalog đổi."""
+        self._maybe_poll()
+        with self._lock:
+            if self._active is None:
+                active = []
+                for doc in self.collection.find({"is_deleted": False}, PRODUCT_PROJECTION):
+                    self._cache.set(doc["_id"], doc)
+                    self._advance_watermark(doc.get("updatedAt"))
+                    active.append(doc)
+                self._active = active
+            return self._active
+
+    # ---------------------------
+    # Vô hiệu hóa cache
+    # ---------------------------
+    def _advance_watermark(self, updated_at) -> None:
+        # Gọi khi đang giữ self._lock
+        if isinstance(updated_at, datetime) and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+
+    def _maybe_poll(self) -> None:
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+        with self._lock:
+            due = time.monotonic() - self._last_poll >= self.poll_interval
+        if due:
+            self.refresh()
+
+    def refresh(self) -> int:
+        """Đọc các sản phẩm có updatedAt > watermark, cập nhật cache. Trả về số sản phẩm đổi."""
+        with self._lock:
+            self._last_poll = time.monotonic()
+            watermark = self._watermark
+        if watermark is None:
+            latest = list(self.collection.find({}, {"updatedAt": 1}).sort("updatedAt", -1).limit(1))
+            if latest:
+                with self._lock:
+                    self._advance_watermark(latest[0].get("updatedAt"))
+            return 0
+
+        docs = list(self.collection.find({"updatedAt": {"$gt": watermark}}, PRODUCT_PROJECTION))
+        with self._lock:
+            for doc in docs:
+                self._cache.set(doc["_id"], doc)
+                self._advance_watermark(doc.get("updatedAt"))
+        if docs:
+            self._mark_changed()
+        return len(docs)
+
+    def invalidate(self, pid) -> None:
+        try:
+            self._cache.pop(ObjectId(str(pid)))
+        except (InvalidId, TypeError):
+            return
+        self._mark_changed()
+
+    def _mark_changed(self) -> None:
+        with self._lock:
+            self._active = None
+            self.version += 1
+
+    def start_change_stream(self) -> None:
+        """Nghe change stream ở thread nền; nếu DB không hỗ trợ (standalone) thì giữ polling."""
+        if self._watch_thread is not None:
+            return
+
+        def _watch():
+            try:
+                with self.collection.watch() as stream:
+                    for change in stream:
+                        key = change.get("documentKey", {}).get("_id")
+                        if key is not None:
+                            self.invalidate(key)
+            except Exception as e:
+                print(f"⚠️ Change stream products không khả dụng, dùng polling updatedAt: {e}")
+
+        self._watch_thread = threading.Thread(target=_watch, name="product-catalog-watch", daemon=True)
+        self._watch_thread.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            watermark = self._watermark
+        return {
+            **self._cache.stats(),
+            "version": self.version,
+            "watermark": watermark.isoformat() if watermark else None
+        }
+
+
+# === Catalog dùng chung cho cả process (component "product_catalog")
+def load_catalog() -> ProductCatalog:
+    """Tạo MongoClient + catalog và bật change stream (chạy trong thread nền của components)."""
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise Exception("❌ MONGO_URI not found")
+
+    catalog = ProductCatalog(MongoClient(mongo_uri)["test"]["products"])
+    catalog.start_change_stream()
+    return catalog
+
+
+components.register("product_catalog", load_catalog)
@@ -0,0 +1,161 @@
+# product_retriever.py
+"""
+Chọn sản phẩm liên quan tới câu hỏi để đưa vào prompt chatbot, thay vì nhồi cả catalog.
+- Index BM25 trong process trên nameProduct (nhân đôi trọng số) + desc.
+- Token hóa: chữ thường, bỏ dấu tiếng Việt (đ → d) để khách gõ không dấu vẫn khớp,
+  thêm bigram ("hoa hồng" → hoa, hong, hoa_hong) vì từ tiếng Việt thường gồm nhiều âm tiết.
+- Index dựng lại khi catalog đổi phiên bản (catalog.version).
+- Context gồm top-k sản phẩm điểm cao nhất, cắt theo ngân sách token (ước lượng thô
+  ~3 ký tự / token); câu hỏi không khớp sản phẩm nào → liệt kê sản phẩm đầu catalog
+  trong cùng ngân sách.
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from recommender_inference import top_k_indices
+
+CHARS_PER_TOKEN = 3
+STOPWORDS = {
+    "a", "ah", "ban", "bao", "cac", "cho", "co", "cua", "duoc", "gi", "hay", "khong", "la",
+    "lam", "mot", "minh", "nao", "nhe", "nhieu", "nhung", "shop", "toi", "va", "voi", "vay"
+}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt (đ → d), gộp khoảng trắng."""
+    text = unicodedata.normalize("NFD", str(text).casefold().replace("đ", "d"))
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return " ".join(text.split())
+
+
+def tokenize(text: str) -> List[str]:
+    words = [w for w in _TOKEN_RE.findall(normalize_text(text)) if w not in STOPWORDS]
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def product_line(p: dict, max_desc_chars: Optional[int] = None) -> str:
+    # Các trường không bắt buộc trong product.model.js có thể thiếu hoặc null
+    name = p.get("nameProduct") or "Tên không rõ"
+    price = p.get("price") or 0
+    sale = p.get("sale") or 0
+    desc = p.get("desc") or "Không có mô tả"
+    if max_desc_chars is not None and len(desc) > max_desc_chars:
+        desc = desc[:max_desc_chars].rsplit(" ", 1)[0] + "…"
+
+    if sale > 0:
+        new_price = price - sale
+        price_info = f"Giá gốc {price}₫, giảm {sale}₫ → còn {new_price}₫"
+    else:
+        price_info = f"Giá: {price}₫"
+
+    return f"- {name}: {price_info}. Mô tả: {desc}"
+
+
+def search_text(p: dict) -> str:
+    """Văn bản được index: tên (nhân đôi trọng số) + mô tả; trường null → chuỗi rỗng."""
+    name = p.get("nameProduct") or ""
+    return f"{name} {name} {p.get('desc') or ''}"
+
+
+# ---------------------------
+# BM25
+# ---------------------------
+class BM25Index:
+    def __init__(self, docs: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.n_docs = len(docs)
+        self.k1 = k1
+        doc_len = np.array([len(d) for d in docs], dtype=np.float64)
+        avgdl = doc_len.mean() if self.n_docs and doc_len.mean() > 0 else 1.0
+        # Phần chuẩn hóa độ dài của mẫu số BM25, tính sẵn cho từng tài liệu
+        self.norm = k1 * (1 - b + b * doc_len / avgdl)
+
+        postings: Dict[str, list] = defaultdict(list)
+        for i, tokens in enumerate(docs):
+            for term, tf in Counter(tokens).items():
+                postings[term].append((i, tf))
+        self.postings = {}
+        for term, entries in postings.items():
+            ids, tfs = zip(*entries)
+            df = len(ids)
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            self.postings[term] = (np.array(ids, dtype=np.int64), np.array(tfs, dtype=np.float64), idf)
+
+    def scores(self, query_tokens: List[str]) -> np.ndarray:
+        out = np.zeros(self.n_docs, dtype=np.float64)
+        for term in set(query_tokens):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            ids, tf, idf = entry
+            out[ids] += idf * tf * (self.k1 + 1) / (tf + self.norm[ids])
+        return out
+
+
+# ---------------------------
+# Retriever trên catalog
+# ---------------------------
+class ProductRetriever:
+    def __init__(self, catalog, top_k: int = 8, token_budget: int = 1500, max_desc_chars: int = 300):
+        """catalog: đối tượng có `list_active()` và `version` (product_catalog.ProductCatalog)."""
+        self.catalog = catalog
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.max_desc_chars = max_desc_chars
+        self._lock = threading.Lock()
+        # (phiên bản catalog, dòng mô tả từng sản phẩm, index) — thay nguyên khối khi dựng lại
+        self._state = None
+
+    def refresh(self) -> tuple:
+        """Dựng lại index nếu catalog đã đổi phiên bản; trả về trạng thái hiện tại."""
+        products = self.catalog.list_active()  # kích hoạt polling → catalog.version mới nhất
+        with self._lock:
+            if self._state is None or self._state[0] != self.catalog.version:
+                docs = [tokenize(search_text(p)) for p in products]
+                lines = [product_line(p, self.max_desc_chars) for p in products]
+                self._state = (self.catalog.version, lines, BM25Index(docs))
+            return self._state
+
+    @staticmethod
+    def _search(index: BM25Index, question: str, k: int) -> List[int]:
+        scores = index.scores(tokenize(question))
+        return [int(i) for i in top_k_indices(scores, k) if scores[i] > 0]
+
+    def search(self, question: str, k: Optional[int] = None) -> List[int]:
+        """Chỉ số sản phẩm liên quan nhất (điểm > 0), giảm dần theo điểm."""
+        return self._search(self.refresh()[2], question, k or self.top_k)
+
+    def context_for(self, question: str, k: Optional[int] = None, token_budget: Optional[int] = None) -> str:
+        _, all_lines, index = self.refresh()
+        budget = token_budget or self.token_budget
+        hits = self._search(index, question, k or self.top_k)
+        order = hits if hits else range(len(all_lines))
+        lines, used = [], 0
+        for i in order:
+            cost = estimate_tokens(all_lines[i]) + 1
+            if used + cost > budget:
+                break
+            lines.append(all_lines[i])
+            used += cost
+        return "\n".join(lines)
+
+    def stats(self) -> dict:
+        version, lines, index = self._state or (None, [], None)
+        return {
+            "products": len(lines),
+            "terms": len(index.postings) if index else 0,
+            "catalog_version": version,
+            "top_k": self.top_k,
+            "token_budget": self.token_budget
+        }
@@ -0,0 +1,257 @@
+# prophet_engine.py
+"""
+Huấn luyện Prophet cho từng sản phẩm, song song trên nhiều process, có cache theo sản phẩm.
+- Mỗi sản phẩm → chuỗi bán theo ngày (ds, y); khóa cache = hash(chuỗi ngày + cấu hình Prophet
+  + periods/freq). Chạy lại mà chuỗi không đổi → lấy kết quả từ cache, không fit lại.
+- Sản phẩm cần fit được chia thành nhiều chunk, chạy trên ProcessPoolExecutor
+  (Prophet/Stan fit chủ yếu tốn CPU, thread không giúp được vì GIL).
+- Lưu tham số đã fit của từng sản phẩm (k, m, delta, beta, sigma_obs). Khi chuỗi thay đổi
+  (thêm ngày bán mới), fit lại bắt đầu từ tham số cũ (`Prophet.fit(init=...)`) nên tối ưu hội tụ
+  nhanh hơn nhiều so với fit nguội; nếu tham số cũ không còn khớp kích thước (số changepoint đổi)
+  thì tự fit nguội.
+- In tiến độ khi từng chunk xong; thời gian fit từng sản phẩm nằm trong `engine.timings`.
+
+Kết quả cùng thứ tự productId và cùng các trường như vòng lặp cũ trong
+business_strategy.train_prophet_per_product, trừ 1 khác biệt: sản phẩm fit lỗi không làm hỏng cả lượt
+chạy mà trả về status "error" (+ "error": thông điệp lỗi, các trường số là None) và không được cache.
+Cache chỉ giữ sản phẩm có trong sales_df của lần chạy gần nhất.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+PROPHET_PARAMS = {
+    "growth": "linear",
+    "yearly_seasonality": True,
+    "weekly_seasonality": True,
+    "daily_seasonality": False
+}
+MIN_DAYS = 10
+
+
+# ---------------------------
+# Chuẩn bị dữ liệu
+# ---------------------------
+def daily_series(sales_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """sales_df (date, productId, qty) → {productId: DataFrame(ds, y)} tổng theo ngày, ds tăng dần."""
+    required = {"date", "productId", "qty"}
+    if not required.issubset(set(sales_df.columns)):
+        raise ValueError("sales_df cần các cột: date, productId, qty")
+
+    df = sales_df[["date", "productId", "qty"]].copy()
+    df["date"] = pd.to_datetime(df["date"])
+    daily = df.groupby(["productId", "date"], as_index=False)["qty"].sum()
+    daily = daily.rename(columns={"date": "ds", "qty": "y"})
+    return {pid: grp[["ds", "y"]].reset_index(drop=True) for pid, grp in daily.groupby("productId")}
+
+
+def series_key(daily: pd.DataFrame, periods: int, freq: str) -> str:
+    h = hashlib.sha1()
+    h.update(daily["ds"].values.astype("datetime64[ns]").astype(np.int64).tobytes())
+    h.update(daily["y"].values.astype(np.float64).tobytes())
+    h.update(json.dumps({"prophet": PROPHET_PARAMS, "periods": periods, "freq": freq}, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def _insufficient(pid) -> dict:
+    return {
+        "productId": pid,
+        "status": "insufficient_data",
+        "forecast_next_period_sum": None,
+        "last_period_sum": None,
+        "forecast_growth_pct": None
+    }
+
+
+# ---------------------------
+# Fit 1 sản phẩm / 1 chunk (chạy trong process con)
+# ---------------------------
+def stan_init(m) -> dict:
+    """Tham số đã fit của model Prophet, dạng dùng được cho `fit(init=...)`."""
+    params = {name: float(m.params[name][0][0]) for name in ("k", "m", "sigma_obs")}
+    for name in ("delta", "beta"):
+        params[name] = np.asarray(m.params[name][0], dtype=float)
+    return params
+
+
+def fit_product(pid, daily: pd.DataFrame, periods: int, freq: str,
+                init: Optional[dict] = None) -> Tuple[dict, dict, bool]:
+    """Return: (kết quả, tham số đã fit, có warm-start hay không)."""
+    # Import trong hàm: process con tự load Prophet, module này import được khi thiếu prophet
+    try:
+        from prophet import Prophet
+    except Exception:
+        from fbprophet import Prophet  # type: ignore
+
+    horizon = periods
+    warm = False
+    m = None
+    if init is not None:
+        try:
+            m = Prophet(**PROPHET_PARAMS)
+            m.fit(daily, init=init)
+            warm = True
+        except Exception:
+            m = None  # tham số cũ không khớp (vd. số changepoint đổi) → fit nguội
+    if m is None:
+        m = Prophet(**PROPHET_PARAMS)
+        m.fit(daily)
+
+    future = m.make_future_dataframe(periods=horizon, freq=freq, include_history=True)
+    fcst = m.predict(future)
+
+    history_end = daily["ds"].max()
+    hist_window_start = history_end - pd.Timedelta(days=horizon - 1)
+    next_window_start = history_end + pd.Timedelta(days=1)
+    next_window_end = history_end + pd.Timedelta(days=horizon)
+    next_fcst = fcst[(fcst["ds"] >= next_window_start) & (fcst["ds"] <= next_window_end)]
+
+    last_sum = float(daily[(daily["ds"] >= hist_window_start) & (daily["ds"] <= history_end)]["y"].sum())
+    next_sum = float(next_fcst["yhat"].sum()) if not next_fcst.empty else None
+
+    growth_pct = None
+    if next_sum is not None and last_sum > 0:
+        growth_pct = (next_sum - last_sum) / last_sum * 100.0
+
+    result = {
+        "productId": pid,
+        "status": "ok",
+        "forecast_next_period_sum": None if next_sum is None else round(next_sum, 2),
+        "last_period_sum": round(last_sum, 2),
+        "forecast_growth_pct": None if growth_pct is None else round(growth_pct, 2)
+    }
+    return result, stan_init(m), warm
+
+
+def _fit_chunk(chunk: List[Tuple[str, pd.DataFrame, Optional[dict]]],
+               periods: int, freq: str) -> List[Tuple[str, dict, Optional[dict], bool, float]]:
+    out = []
+    for pid, daily, init in chunk:
+        t0 = time.perf_counter()
+        try:
+            result, params, warm = fit_product(pid, daily, periods, freq, init)
+        except Exception as e:
+            result, params, warm = {**_insufficient(pid), "status": "error", "error": str(e)}, None, False
+        out.append((pid, result, params, warm, time.perf_counter() - t0))
+    return out
+
+
+# ---------------------------
+# Engine
+# ---------------------------
+class ProphetEngine:
+    def __init__(self, periods: int = 30, freq: str = "D", workers: Optional[int] = None,
+                 chunk_size: Optional[int] = None, cache_path: Optional[str] = "prophet_cache.pkl"):
+        self.periods = periods
+        self.freq = freq
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.cache_path = cache_path
+        # productId → {"key": series_key, "result": kết quả, "params": tham số Prophet đã fit}
+        self.cache: Dict[str, dict] = {}
+        self.timings: Dict[str, float] = {}            # productId → giây fit (lần chạy gần nhất)
+        self.stats: dict = {}
+        self._load_cache()
+
+    def _load_cache(self) -> None:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            self.cache = {pid: e for pid, e in joblib.load(self.cache_path).items() if isinstance(e, dict)}
+        except Exception as e:
+            print(f"⚠️ Không đọc được {self.cache_path}, fit lại toàn bộ: {e}")
+            self.cache = {}
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        joblib.dump(self.cache, tmp_path)
+        os.replace(tmp_path, self.cache_path)
+
+    def _chunks(self, todo: list) -> List[list]:
+        # Mặc định ~4 chunk mỗi worker: đủ nhỏ để cân tải, đủ lớn để ít chi phí pickle
+        size = self.chunk_size or max(1, -(-len(todo) // (self.workers * 4)))
+        return [todo[i:i + size] for i in range(0, len(todo), size)]
+
+    def run(self, sales_df: pd.DataFrame) -> List[dict]:
+        t_start = time.perf_counter()
+        series = daily_series(sales_df)
+        results: Dict[str, dict] = {}
+        keys: Dict[str, str] = {}
+        todo = []
+
+        for pid, daily in series.items():
+            if len(daily) < MIN_DAYS:
+                results[pid] = _insufficient(pid)
+                continue
+            keys[pid] = series_key(daily, self.periods, self.freq)
+            cached = self.cache.get(pid)
+            if cached is not None and cached["key"] == keys[pid]:
+                results[pid] = cached["result"]
+            else:
+                todo.append((pid, daily, cached["params"] if cached else None))
+
+        n_cached = len(keys) - len(todo)
+        n_warm = sum(1 for _, _, init in todo if init is not None)
+        print(f"[prophet] {len(series)} sản phẩm: {len(todo)} cần fit ({n_warm} warm-start), "
+              f"{n_cached} lấy từ cache, {len(series) - len(keys)} thiếu dữ liệu")
+
+        # Bỏ cache của sản phẩm không còn trong dữ liệu → file cache không phình mãi
+        stale = [pid for pid in self.cache if pid not in series]
+        for pid in stale:
+            del self.cache[pid]
+
+        self.timings = {}
+        self._warm_started = 0
+        if todo:
+            chunks = self._chunks(todo)
+            if self.workers == 1:
+                finished = (_fit_chunk(c, self.periods, self.freq) for c in chunks)
+                self._collect(finished, results, keys, len(todo), t_start)
+            else:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks))) as pool:
+                    futures = [pool.submit(_fit_chunk, c, self.periods, self.freq) for c in chunks]
+                    self._collect((f.result() for f in as_completed(futures)), results, keys, len(todo), t_start)
+        if todo or stale:
+            self._save_cache()
+
+        fit_seconds = list(self.timings.values())
+        self.stats = {
+            "products": len(series),
+            "fitted": len(todo),
+            "cached": n_cached,
+            "warm_started": self._warm_started,
+            "insufficient_data": len(series) - len(keys),
+            "wall_seconds": round(time.perf_counter() - t_start, 3),
+            "fit_seconds_total": round(sum(fit_seconds), 3),
+            "fit_seconds_mean": round(float(np.mean(fit_seconds)), 3) if fit_seconds else None,
+            "fit_seconds_max": round(max(fit_seconds), 3) if fit_seconds else None,
+            "workers": self.workers
+        }
+        print(f"✅ [prophet] Xong trong {self.stats['wall_seconds']}s "
+              f"(fit TB {self.stats['fit_seconds_mean']}s/sp, chậm nhất {self.stats['fit_seconds_max']}s)")
+        # Giữ thứ tự productId như groupby trong bản cũ
+        return [results[pid] for pid in series]
+
+    def _collect(self, finished, results: dict, keys: dict, total: int, t_start: float) -> None:
+        done = 0
+        for chunk_result in finished:
+            for pid, result, params, warm, seconds in chunk_result:
+                results[pid] = result
+                self.timings[pid] = round(seconds, 3)
+                self._warm_started += warm
+                if result["status"] == "ok":
+                    self.cache[pid] = {"key": keys[pid], "result": result, "params": params}
+            done += len(chunk_result)
+            elapsed = time.perf_counter() - t_start
+            print(f"[prophet] {done}/{total} sản phẩm đã fit, {elapsed:.1f}s, "
+                  f"còn ~{elapsed / done * (total - done):.0f}s")
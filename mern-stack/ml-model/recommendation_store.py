@@ -0,0 +1,152 @@
+# recommendation_store.py
+"""
+Bảng top-N gợi ý tính sẵn cho mọi user (điểm chỉ đổi khi train lại mô hình).
+- Batch job: chấm điểm toàn bộ user trong user_encoder.classes_ bằng NumpyRecommender,
+  ghi 2 mảng .npy (chỉ số sản phẩm int32 + điểm float32, mỗi dòng = 1 user, đã sắp giảm dần).
+  Số user mỗi lô (và đoạn catalog mỗi lượt forward) tính từ số sản phẩm × bề rộng các lớp Dense
+  để mảng trung gian không vượt --max-block-mb, dù catalog lớn tới đâu.
+- Server: mở các mảng bằng memory-map (không load hết vào RAM), phục vụ qua LRU có đếm hit/miss.
+- User mới sau snapshot (không có dòng trong bảng) → server chấm điểm trực tiếp như cũ.
+
+Chạy lại thủ công (trong thư mục ml-model):
+    python recommendation_store.py [--max-block-mb 256]
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from recommender_inference import NumpyRecommender
+from ttl_cache import LRUCache
+
+TOPN_IDX_FILE = "rec_topn_idx.npy"
+TOPN_SCORES_FILE = "rec_topn_scores.npy"
+TOPN_META_FILE = "rec_topn_meta.json"
+MODEL_FILE = "recommendation_model.h5"
+MAX_BATCH_USERS = 256
+
+
+def batch_shape(recommender: NumpyRecommender, max_block_mb: float) -> Tuple[int, int]:
+    """(số user mỗi lô, số sản phẩm mỗi lượt forward) sao cho mảng trung gian
+    (lô × đoạn × (bề rộng Dense + 2)) float32 vừa max_block_mb."""
+    budget = int(max_block_mb * 2 ** 20 // 4)
+    per_pair = recommender.hidden_width + 2
+    users = int(min(MAX_BATCH_USERS, max(1, budget // (per_pair * recommender.n_products))))
+    chunk = int(min(recommender.n_products, max(1, budget // (per_pair * users))))
+    return users, chunk
+
+
+def build_topn_store(recommender: NumpyRecommender, top_n: int = 20, max_block_mb: float = 256,
+                     out_dir: str = ".", model_path: str = MODEL_FILE) -> dict:
+    """Chấm điểm mọi user theo lô, ghi trực tiếp vào file .npy (open_memmap) → RAM giới hạn theo
+    max_block_mb, không phụ thuộc số user / số sản phẩm (ngoài 1 hàng điểm mỗi user trong lô)."""
+    n_users, n_products = recommender.n_users, recommender.n_products
+    top_n = min(top_n, n_products)
+    batch_users, chunk = batch_shape(recommender, max_block_mb)
+    idx_path = os.path.join(out_dir, TOPN_IDX_FILE)
+    scores_path = os.path.join(out_dir, TOPN_SCORES_FILE)
+
+    t0 = time.perf_counter()
+    idx_out = np.lib.format.open_memmap(idx_path + ".tmp", mode="w+", dtype=np.int32, shape=(n_users, top_n))
+    scores_out = np.lib.format.open_memmap(scores_path + ".tmp", mode="w+", dtype=np.float32, shape=(n_users, top_n))
+    for start in range(0, n_users, batch_users):
+        users = np.arange(start, min(start + batch_users, n_users))
+        u = recommender.user_proj(users)
+        scores = np.empty((len(users), n_products), dtype=np.float32)
+        for lo in range(0, n_products, chunk):
+            scores[:, lo:lo + chunk] = recommender.score_projected(u, recommender.product_proj[lo:lo + chunk])
+        part = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+        part_scores = np.take_along_axis(scores, part, axis=1)
+        order = np.argsort(-part_scores, axis=1, kind="stable")
+        idx_out[users] = np.take_along_axis(part, order, axis=1)
+        scores_out[users] = np.take_along_axis(part_scores, order, axis=1)
+    idx_out.flush()
+    scores_out.flush()
+    del idx_out, scores_out
+    # Ghi ra file .tmp rồi mới đổi tên → server không bao giờ mở phải file đang ghi dở
+    os.replace(idx_path + ".tmp", idx_path)
+    os.replace(scores_path + ".tmp", scores_path)
+
+    meta = {
+        "n_users": int(n_users),
+        "n_products": int(n_products),
+        "top_n": int(top_n),
+        "batch_users": batch_users,
+        "product_chunk": chunk,
+        "model_mtime": os.path.getmtime(model_path) if os.path.exists(model_path) else None,
+        "built_at": datetime.utcnow().isoformat() + "Z",
+        "build_seconds": round(time.perf_counter() - t0, 2)
+    }
+    meta_path = os.path.join(out_dir, TOPN_META_FILE)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+    print(f"✅ Đã tính top-{top_n} cho {n_users} user trong {meta['build_seconds']}s")
+    return meta
+
+
+class TopNStore:
+    def __init__(self, idx: np.ndarray, scores: np.ndarray, meta: dict, cache_size: int = 10000):
+        self.idx = idx
+        self.scores = scores
+        self.meta = meta
+        self._cache = LRUCache(maxsize=cache_size)
+
+    @classmethod
+    def load(cls, out_dir: str = ".", model_path: str = MODEL_FILE, cache_size: int = 10000) -> Optional["TopNStore"]:
+        """Mở bảng top-N bằng memory-map; None nếu chưa có hoặc đã cũ hơn model hiện tại."""
+        meta_path = os.path.join(out_dir, TOPN_META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if os.path.exists(model_path) and meta.get("model_mtime") != os.path.getmtime(model_path):
+            print("⚠️ Bảng top-N cũ hơn recommendation_model.h5, bỏ qua (chạy lại recommendation_store.py)")
+            return None
+        idx = np.load(os.path.join(out_dir, TOPN_IDX_FILE), mmap_mode="r")
+        scores = np.load(os.path.join(out_dir, TOPN_SCORES_FILE), mmap_mode="r")
+        return cls(idx, scores, meta, cache_size=cache_size)
+
+    @property
+    def n_users(self) -> int:
+        return self.idx.shape[0]
+
+    @property
+    def top_n(self) -> int:
+        return self.idx.shape[1]
+
+    def lookup(self, user_index: int, k: int = 5) -> Optional[List[int]]:
+        """Top-k chỉ số sản phẩm của user; None nếu user không có trong snapshot hoặc k > top_n."""
+        if user_index >= self.n_users or k > self.top_n:
+            return None
+        top = self._cache.get(user_index)
+        if top is None:
+            top = self.idx[user_index].tolist()
+            self._cache.set(user_index, top)
+        return top[:k]
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "n_users": self.n_users, "top_n": self.top_n,
+                "built_at": self.meta.get("built_at")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-block-mb", type=float, default=256)
+    args = parser.parse_args()
+
+    import joblib
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.losses import MeanSquaredError
+
+    model = load_model(MODEL_FILE, custom_objects={"mse": MeanSquaredError()})
+    user_encoder = joblib.load("user_encoder.pkl")
+    recommender = NumpyRecommender.from_keras(model)
+    if recommender.n_users != len(user_encoder.classes_):
+        raise Exception("❌ user_encoder.pkl không khớp với recommendation_model.h5")
+    build_topn_store(recommender, max_block_mb=args.max_block_mb)
@@ -0,0 +1,117 @@
+# recommender_inference.py
+"""
+Suy luận mô hình gợi ý (recommendation_model.h5) bằng NumPy thay cho Keras `predict`.
+
+Kiến trúc (train_recommendation_model.py):
+    Embedding(user) ⊕ Embedding(product) → Dense(128, relu) → Dense(64, relu) → Dense(1)
+
+- Lúc load: tách bảng embedding + trọng số Dense ra mảng NumPy.
+- Tính trước phần product của Dense đầu tiên: P = E_product · W1[d_user:] + b1,
+  nên mỗi request chỉ còn: relu(P + e_user · W1[:d_user]) → 2 phép nhân ma trận nhỏ.
+- Top-k dùng `np.argpartition` (O(n)) rồi chỉ sắp xếp k phần tử.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x)
+}
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Chỉ số k phần tử lớn nhất, đã sắp xếp giảm dần."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+class NumpyRecommender:
+    def __init__(self, user_emb: np.ndarray, product_emb: np.ndarray,
+                 dense: Sequence[Tuple[np.ndarray, np.ndarray, str]]):
+        if not dense:
+            raise ValueError("Cần ít nhất 1 lớp Dense")
+        for _, _, act in dense:
+            if act not in _ACTIVATIONS:
+                raise ValueError(f"Activation chưa hỗ trợ: {act}")
+
+        self.user_emb = np.ascontiguousarray(user_emb, dtype=np.float32)
+        self.product_emb = np.ascontiguousarray(product_emb, dtype=np.float32)
+        d_user = self.user_emb.shape[1]
+
+        w1, b1, act1 = dense[0]
+        w1 = np.asarray(w1, dtype=np.float32)
+        self.w1_user = w1[:d_user]
+        self.act1 = act1
+        # Phần product của lớp Dense đầu: (n_products, hidden), không phụ thuộc user
+        self.product_proj = self.product_emb @ w1[d_user:] + np.asarray(b1, dtype=np.float32)
+        self.rest = [
+            (np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32), act)
+            for w, b, act in dense[1:]
+        ]
+
+    @property
+    def n_users(self) -> int:
+        return self.user_emb.shape[0]
+
+    @property
+    def n_products(self) -> int:
+        return self.product_emb.shape[0]
+
+    @classmethod
+    def from_keras(cls, model) -> "NumpyRecommender":
+        """Tách trọng số từ model Keras đã load (không cần import tensorflow ở đây)."""
+        embeddings = [l for l in model.layers if type(l).__name__ == "Embedding"]
+        dense_layers = [l for l in model.layers if type(l).__name__ == "Dense"]
+        if len(embeddings) != 2:
+            raise ValueError(f"Cần đúng 2 lớp Embedding, tìm thấy {len(embeddings)}")
+
+        # Embedding nối với input thứ 0 là user, input thứ 1 là product
+        def input_index(layer) -> Optional[int]:
+            for i, tensor in enumerate(getattr(model, "inputs", []) or []):
+                if layer.input is tensor:
+                    return i
+            return None
+
+        idx = [input_index(l) for l in embeddings]
+        if None not in idx:
+            embeddings = [l for _, l in sorted(zip(idx, embeddings), key=lambda x: x[0])]
+
+        dense = []
+        for layer in dense_layers:
+            w, b = layer.get_weights()
+            dense.append((w, b, layer.get_config().get("activation", "linear")))
+
+        return cls(embeddings[0].get_weights()[0], embeddings[1].get_weights()[0], dense)
+
+    @property
+    def hidden_width(self) -> int:
+        """Tổng bề rộng các lớp Dense = số float32 trung gian cho mỗi cặp (user, product) khi chấm điểm."""
+        return self.w1_user.shape[1] + sum(w.shape[1] for w, _, _ in self.rest)
+
+    def user_proj(self, user_indices: np.ndarray) -> np.ndarray:
+        """Phần user của lớp Dense đầu → (B, hidden)."""
+        return self.user_emb[np.asarray(user_indices)] @ self.w1_user
+
+    def score_projected(self, u: np.ndarray, product_proj: np.ndarray) -> np.ndarray:
+        """Chạy phần còn lại của MLP cho u (B, hidden) với các vector product_proj (N, hidden) → (B, N).
+        product_proj có thể là một phần catalog hoặc tâm cụm của ANN index."""
+        h = product_proj[None, :, :] + u[:, None, :]                    # (B, N, hidden)
+        h = _ACTIVATIONS[self.act1](h)
+        for w, b, act in self.rest:
+            h = _ACTIVATIONS[act](h @ w + b)
+        return h[..., 0]
+
+    def score_users(self, user_indices: np.ndarray) -> np.ndarray:
+        """Điểm của nhiều user với toàn bộ sản phẩm → (len(user_indices), n_products)."""
+        return self.score_projected(self.user_proj(user_indices), self.product_proj)
+
+    def score_user(self, user_index: int) -> np.ndarray:
+        return self.score_users(np.array([user_index]))[0]
+
+    def recommend(self, user_index: int, k: int = 5) -> List[int]:
+        return top_k_indices(self.score_user(user_index), k).tolist()
@@ -0,0 +1,90 @@
+# sales_aggregate.py
+"""
+Bảng tổng hợp bán hàng theo tháng (productId, year, month) → quantity, cập nhật tăng dần.
+- Lưu ra file (joblib) cùng watermark `_id`/`createdAt` của đơn hàng cuối cùng đã đọc.
+- Mỗi lần refresh chỉ đọc các đơn có `_id` > watermark (ObjectId tăng theo thời gian tạo),
+  nên chi phí tỉ lệ với số đơn mới chứ không phải toàn bộ lịch sử.
+- Dự báo / top bán chạy được tính từ bảng nhỏ này thay vì quét lại collection orders.
+
+Lưu ý: đơn hàng bị xóa/sửa số lượng sau khi đã tổng hợp sẽ không được trừ lại;
+gọi `rebuild()` nếu cần tính lại từ đầu.
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import joblib
+import pandas as pd
+
+from order_queries import monthly_product_quantities
+
+
+class MonthlySalesAggregate:
+    def __init__(self, orders, path: str = "sales_monthly.pkl"):
+        self.orders = orders
+        self.path = path
+        self.monthly: Dict[Tuple[str, int, int], float] = {}
+        self.last_order_id = None
+        self.last_created_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            state = joblib.load(self.path)
+            self.monthly = state["monthly"]
+            self.last_order_id = state["last_order_id"]
+            self.last_created_at = state.get("last_created_at")
+        except Exception as e:
+            print(f"⚠️ Không đọc được {self.path}, tổng hợp lại từ đầu: {e}")
+            self.monthly, self.last_order_id, self.last_created_at = {}, None, None
+
+    def _save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        joblib.dump({
+            "monthly": self.monthly,
+            "last_order_id": self.last_order_id,
+            "last_created_at": self.last_created_at
+        }, tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self) -> int:
+        """Cộng dồn các đơn mới (sau watermark) vào bảng tháng.
+        Việc tổng hợp chạy trên MongoDB (order_queries), chỉ các dòng tháng mới được gửi về.
+        Return: số dòng (productId, year, month) vừa cộng dồn.
+        """
+        with self._lock:
+            id_range = {} if self.last_order_id is None else {"$gt": self.last_order_id}
+            # Chốt cận trên trước khi tổng hợp để đơn chèn thêm trong lúc chạy không bị bỏ sót
+            latest = list(self.orders.find({"_id": id_range} if id_range else {}, {"_id": 1})
+                          .sort("_id", -1).limit(1))
+            if not latest:
+                return 0
+            upper = latest[0]["_id"]
+
+            rows = monthly_product_quantities(self.orders, {"_id": {**id_range, "$lte": upper}})
+            for r in rows:
+                key = (r["productId"], r["year"], r["month"])
+                self.monthly[key] = self.monthly.get(key, 0) + r["quantity"]
+                created_at = r.get("last_created_at")
+                if self.last_created_at is None or (created_at and created_at > self.last_created_at):
+                    self.last_created_at = created_at
+
+            self.last_order_id = upper
+            self._save()
+            return len(rows)
+
+    def rebuild(self) -> int:
+        with self._lock:
+            self.monthly, self.last_order_id, self.last_created_at = {}, None, None
+        return self.refresh()
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame cột productId, year, month, quantity (đã cộng theo tháng)."""
+        with self._lock:
+            rows = [(pid, year, month, qty) for (pid, year, month), qty in sorted(self.monthly.items())]
+        return pd.DataFrame(rows, columns=["productId", "year", "month", "quantity"])
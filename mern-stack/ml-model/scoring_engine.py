@@ -0,0 +1,170 @@
+# scoring_engine.py
+"""
+Chấm điểm tổng hợp sản phẩm (forecast growth + Trends interest + mùa vụ) bằng mảng NumPy.
+- Đầu vào là các mảng song song: product_ids, growth (%), trend interest (NaN = thiếu).
+- Min-max scale 1 lần lúc khởi tạo; điểm với bộ trọng số bất kỳ chỉ là vài phép cộng mảng,
+  nên thử nhiều kịch bản trọng số (what-if sweep) trên 100k sản phẩm chạy tức thì.
+- Lịch mùa vụ tính sẵn cho mọi ngày trong năm (vector 365/366 phần tử) → tra điểm mùa vụ
+  cho nhiều ngày/kịch bản trong 1 lần gọi.
+
+business_strategy.minmax_scale / compute_weighted_scores / seasonality_score dùng module này
+và cho kết quả giống hệt bản vòng lặp cũ (tests/test_scoring_engine.py so với bản cũ).
+"""
+
+from datetime import date
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from recommender_inference import top_k_indices
+
+
+# ---------------------------
+# Min-max scale
+# ---------------------------
+def minmax_scale_array(values: np.ndarray) -> np.ndarray:
+    """Scale [0,1], NaN → 0; mọi giá trị bằng nhau → 0.5."""
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    out = np.zeros(len(values), dtype=np.float64)
+    if not present.any():
+        return out
+    vmin, vmax = values[present].min(), values[present].max()
+    if vmin == vmax:
+        out[present] = 0.5
+        return out
+    out[present] = (values[present] - vmin) / (vmax - vmin)
+    return out
+
+
+def to_float_array(values: Sequence[Optional[float]]) -> np.ndarray:
+    """List có None → mảng float64 với NaN."""
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+# ---------------------------
+# Lịch mùa vụ
+# ---------------------------
+def _second_sunday_of_may(year: int) -> np.datetime64:
+    first = np.datetime64(f"{year}-05-01")
+    # 1970-01-01 là thứ Năm → (ngày + 3) % 7: Monday=0 ... Sunday=6
+    weekday = (first.astype(np.int64) + 3) % 7
+    return first + np.timedelta64(int((6 - weekday) % 7) + 7, "D")
+
+
+@lru_cache(maxsize=64)
+def seasonality_calendar(year: int) -> np.ndarray:
+    """Điểm mùa vụ [0,1] cho từng ngày trong năm (index = ngày thứ mấy trong năm - 1).
+    Đỉnh: Tết (xấp xỉ), 14/2, 8/3, Mother's Day (CN thứ 2 tháng 5), 20/11, mùa cưới 9–3.
+    """
+    days = np.arange(np.datetime64(f"{year}-01-01"), np.datetime64(f"{year + 1}-01-01"))
+    months = days.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    score = np.zeros(len(days), dtype=np.float64)
+
+    def bump(peak: np.datetime64, window_days: int, weight: float):
+        near = np.abs((days - peak).astype(np.int64)) <= window_days
+        score[near] += weight
+
+    # Tết nặng điểm hơn — xấp xỉ 20/1 → 15/2
+    tet = (days >= np.datetime64(f"{year}-01-20")) & (days <= np.datetime64(f"{year}-02-15"))
+    score[tet] += 0.35
+
+    bump(np.datetime64(f"{year}-02-14"), 5, 0.2)
+    bump(np.datetime64(f"{year}-03-08"), 5, 0.2)
+    bump(_second_sunday_of_may(year), 5, 0.15)
+    bump(np.datetime64(f"{year}-11-20"), 5, 0.2)
+
+    # Mùa cưới: 9→3
+    score[np.isin(months, [9, 10, 11, 12, 1, 2, 3])] += 0.15
+
+    np.minimum(score, 1.0, out=score)
+    score.flags.writeable = False
+    return score
+
+
+def seasonality_for_dates(dates) -> np.ndarray:
+    """Điểm mùa vụ cho nhiều ngày (list date/str hoặc mảng datetime64) trong 1 lần gọi."""
+    days = np.asarray(dates, dtype="datetime64[D]")
+    year_start = days.astype("datetime64[Y]")
+    years = year_start.astype(np.int64) + 1970
+    day_of_year = (days - year_start.astype("datetime64[D]")).astype(np.int64)
+    out = np.empty(days.shape, dtype=np.float64)
+    for year in np.unique(years):
+        mask = years == year
+        out[mask] = seasonality_calendar(int(year))[day_of_year[mask]]
+    return out
+
+
+def seasonality_on(day: date) -> float:
+    return float(seasonality_calendar(day.year)[day.timetuple().tm_yday - 1])
+
+
+# ---------------------------
+# Engine
+# ---------------------------
+class ScoringEngine:
+    def __init__(self, product_ids: Sequence[str], growth: np.ndarray, trend: np.ndarray):
+        self.product_ids = np.asarray(product_ids)
+        self.growth = np.asarray(growth, dtype=np.float64)
+        self.trend = np.asarray(trend, dtype=np.float64)
+        if not (len(self.product_ids) == len(self.growth) == len(self.trend)):
+            raise ValueError("product_ids, growth, trend phải cùng độ dài")
+        self.growth_scaled = minmax_scale_array(self.growth)
+        self.trend_scaled = minmax_scale_array(self.trend)
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def scores(self, w_forecast: float = 0.5, w_trend: float = 0.3, w_season: float = 0.2,
+               season: float = 0.0) -> np.ndarray:
+        return w_forecast * self.growth_scaled + w_trend * self.trend_scaled + w_season * season
+
+    def sweep(self, weights: np.ndarray, seasons=None) -> np.ndarray:
+        """Điểm cho S kịch bản cùng lúc.
+        weights: (S, 3) = (w_forecast, w_trend, w_season); seasons: (S,) hoặc 1 số (mặc định 0).
+        Return: (S, n_products).
+        """
+        weights = np.asarray(weights, dtype=np.float64).reshape(-1, 3)
+        seasons = np.broadcast_to(np.asarray(0.0 if seasons is None else seasons, dtype=np.float64),
+                                  (len(weights),))
+        out = weights[:, 0:1] * self.growth_scaled[None, :]
+        out += weights[:, 1:2] * self.trend_scaled[None, :]
+        out += (weights[:, 2] * seasons)[:, None]
+        return out
+
+    def ranked(self, k: Optional[int] = None, decimals: Optional[int] = None,
+               **weights) -> Tuple[np.ndarray, np.ndarray]:
+        """(chỉ số k sản phẩm điểm cao nhất theo thứ tự giảm dần, mảng điểm của mọi sản phẩm).
+        k=None → mọi sản phẩm. Điểm bằng nhau (sau khi làm tròn `decimals`) → sản phẩm đứng trước
+        trong product_ids đứng trước, như sort ổn định của bản vòng lặp cũ.
+        """
+        scores = self.scores(**weights)
+        if decimals is not None:
+            scores = np.round(scores, decimals)
+        if k is None or k >= len(scores):
+            return np.argsort(-scores, kind="stable"), scores
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), scores
+        # Mọi sản phẩm bằng điểm thứ k đều vào ứng viên → cắt theo thứ tự gốc, không phụ thuộc argpartition
+        kth = scores[top_k_indices(scores, k)[-1]]
+        candidates = np.flatnonzero(scores >= kth)
+        return candidates[np.argsort(-scores[candidates], kind="stable")][:k], scores
+
+    def top_k(self, k: int = 5, **weights) -> List[dict]:
+        order, scores = self.ranked(k, **weights)
+        return [{"productId": self.product_ids[i].item(), "score": float(scores[i])} for i in order]
+
+    def sweep_top_k(self, weights: np.ndarray, seasons=None, k: int = 5, chunk: int = 64) -> np.ndarray:
+        """Chỉ số top-k sản phẩm cho mỗi kịch bản → (S, k); chia khối để giới hạn bộ nhớ."""
+        weights = np.asarray(weights, dtype=np.float64).reshape(-1, 3)
+        seasons = np.broadcast_to(np.asarray(0.0 if seasons is None else seasons, dtype=np.float64),
+                                  (len(weights),))
+        k = min(k, len(self))
+        out = np.empty((len(weights), k), dtype=np.int64)
+        for start in range(0, len(weights), chunk):
+            block = self.sweep(weights[start:start + chunk], seasons[start:start + chunk])
+            part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(block, part, axis=1), axis=1, kind="stable")
+            out[start:start + chunk] = np.take_along_axis(part, order, axis=1)
+        return out
@@ -1,26 +1,33 @@
 import os
+import json
 import pandas as pd
 import requests
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from pymongo import MongoClient
-from bson.objectid import ObjectId
-from bson.errors import InvalidId
-from sklearn.linear_model import LinearRegression
 from sklearn.metrics.pairwise import cosine_similarity
 from datetime import datetime
 from dotenv import load_dotenv
 import joblib
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.losses import MeanSquaredError  # ✅ NEW
+from typing import Optional
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
 from chatbot import chatbot_api
-from business_strategy import fetch_market_data
+from components import components, ComponentNotReady
+from sales_aggregate import MonthlySalesAggregate
+from order_queries import parse_created_at, user_order_stats
+from forecast_engine import batch_linear_forecast
+from recommender_inference import NumpyRecommender, top_k_indices
+from recommendation_store import TopNStore
+from ann_index import ANN_MIN_RECALL, IVFIndex
+from item_similarity import ItemSimilarityIndex
+from market_snapshot import MarketSnapshot
 
 load_dotenv()
 
 app = Flask(__name__)
-CORS(app, supports_credentials=True, resources={
+CORS(app, supports_credentials=True, expose_headers=["X-Total-Count"], resources={
     r"/*": {"origins": ["http://localhost:4200", "http://localhost:3000"]}
 })
 
@@ -35,26 +42,55 @@ orders = db["orders"]
 products = db["products"]
 users = db["users"]
 
-# ✅ Load Deep Learning model và encoders
-try:
-    recommendation_model = load_model("recommendation_model.h5", custom_objects={"mse": MeanSquaredError()})
+# ✅ Load Deep Learning model và encoders (chạy nền, xem components.py)
+def load_recommender():
+    # Import TensorFlow ở đây để không chặn lúc khởi động server
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.losses import MeanSquaredError
+
+    model = load_model("recommendation_model.h5", custom_objects={"mse": MeanSquaredError()})
     user_encoder = joblib.load("user_encoder.pkl")
     product_encoder = joblib.load("product_encoder.pkl")
-    all_product_ids = list(product_encoder.classes_)
-    print("✅ Đã load mô hình gợi ý DL")
-except Exception as e:
-    print(f"⚠️ Không load được mô hình gợi ý DL: {e}")
-    recommendation_model = None
 
-# Lấy thông tin sản phẩm
-def get_product_info(pid: str):
+    # ✅ Suy luận bằng NumPy (tránh overhead của Keras predict mỗi request)
+    numpy_recommender = None
     try:
-        obj_id = ObjectId(pid)
-    except InvalidId:
+        numpy_recommender = NumpyRecommender.from_keras(model)
+    except Exception as e:
+        print(f"⚠️ Không tách được trọng số mô hình gợi ý, dùng Keras predict: {e}")
+
+    print("✅ Đã load mô hình gợi ý DL")
+    return {
+        "model": model,
+        "numpy": numpy_recommender,
+        # ✅ Bảng top-N tính sẵn sau khi train (recommendation_store.py), đọc qua memory-map + LRU
+        "topn_store": TopNStore.load(),
+        # ✅ ANN index (ann_index.py) cho catalog lớn: lấy vài trăm ứng viên rồi chấm lại bằng MLP.
+        # Chỉ bật khi `python ann_index.py eval` đã lưu recall đạt ANN_MIN_RECALL cho index hiện tại
+        "ann_index": load_ann_index(),
+        "all_product_ids": list(product_encoder.classes_),
+        "user_index": {uid: i for i, uid in enumerate(user_encoder.classes_)}
+    }
+
+def load_ann_index():
+    """(index, nprobe) nếu recall đã đo đạt ngưỡng, ngược lại None (chấm toàn catalog)."""
+    ann = IVFIndex.load()
+    if ann is None:
         return None
-    product = products.find_one({"_id": obj_id})
-    if not product:
+    nprobe = ann.serving_nprobe(ANN_MIN_RECALL)
+    if nprobe is None:
+        print(f"⚠️ ANN index chưa đo recall hoặc recall < {ANN_MIN_RECALL}, chấm toàn catalog "
+              f"(chạy python ann_index.py eval)")
         return None
+    return ann, nprobe
+
+components.register("recommender", load_recommender)
+
+# Catalog nhỏ hơn ngưỡng này thì chấm toàn bộ (đã đủ nhanh và chính xác tuyệt đối)
+ANN_MIN_PRODUCTS = int(os.getenv("ANN_MIN_PRODUCTS", 20000))
+
+# Lấy thông tin sản phẩm (qua catalog dùng chung, có cache)
+def format_product(product: dict):
     price = float(product.get("price", 0))
     sale = float(product.get("sale", 0))
     return {
@@ -62,72 +98,48 @@ def get_product_info(pid: str):
         "name": product.get("nameProduct", ""),
         "price": price,
         "sale": sale,
-        "image": product.get("images", [{}])[0].get("url", "")
+        "image": (product.get("images") or [{}])[0].get("url", "")
     }
 
-# Dự báo sản phẩm bán chạy
-def run_forecast():
-    data = []
-    for order in orders.find():
-        created_at = order.get("createdAt")
-        if isinstance(created_at, dict) and "$date" in created_at:
-            created_at = created_at["$date"]
-        if isinstance(created_at, str):
-            try:
-                created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-            except:
-                continue
-        if not isinstance(created_at, datetime):
-            continue
-        for p in order.get("products", []):
-            pid = p.get("productId")
-            qty = p.get("quantity")
-            if not pid or qty is None:
-                continue
-            data.append({
-                "productId": str(pid),
-                "month": created_at.month,
-                "year": created_at.year,
-                "quantity": qty
-            })
+def get_product_info(pid: str):
+    catalog = components.require("product_catalog")
+    product = catalog.get(pid) if catalog else None
+    return format_product(product) if product else None
+
+def get_products_info(pids):
+    """Lấy nhiều sản phẩm bằng 1 lần đọc catalog; giữ thứ tự `pids`, bỏ id không tồn tại."""
+    catalog = components.require("product_catalog")
+    found = catalog.get_many(pids) if catalog else {}
+    return {pid: format_product(found[pid]) for pid in pids if pid in found}
+
+# Dự báo sản phẩm bán chạy (từ bảng tổng hợp theo tháng, chỉ đọc thêm đơn mới)
+sales_aggregate = MonthlySalesAggregate(orders)
 
-    df = pd.DataFrame(data)
-    if df.empty:
+def run_forecast():
+    sales_aggregate.refresh()
+    grouped = sales_aggregate.to_frame()
+    if grouped.empty:
         print("Không có dữ liệu đơn hàng để dự báo!")
         return [], []
 
-    grouped = df.groupby(["productId", "year", "month"]).agg({"quantity": "sum"}).reset_index()
     grouped["time"] = grouped["year"] * 12 + grouped["month"]
 
-    forecast = []
-    for pid in grouped["productId"].unique():
-        df_pid = grouped[grouped["productId"] == pid]
-        if len(df_pid) < 2:
-            continue
-        X = df_pid[["time"]]
-        y = df_pid["quantity"]
-        model = LinearRegression()
-        model.fit(X, y)
-        next_time = X["time"].max() + 1
-        predicted = model.predict([[next_time]])[0]
-        forecast.append({
-            "productId": pid,
-            "predicted_quantity": max(int(predicted), 0)
-        })
-
-    forecast_sorted = sorted(forecast, key=lambda x: x["predicted_quantity"], reverse=True)
-    product_freq = df.groupby("productId")["quantity"].sum().sort_values(ascending=False).head(8)
+    forecast_sorted = batch_linear_forecast(grouped)
+    product_freq = grouped.groupby("productId")["quantity"].sum().sort_values(ascending=False).head(8)
     top_selling = [{"productId": pid, "bought_count": int(qty)} for pid, qty in product_freq.items()]
     return top_selling, forecast_sorted
 
-top_selling_result, forecast_result = run_forecast()
+components.register("forecast", run_forecast)
 
 @app.route("/forecast", methods=["GET"])
 def forecast_api():
+    forecast_result = (components.require("forecast") or ([], []))[1]
     result = []
     total_revenue = 0
-    for item in forecast_result[:8]:
-        p = get_product_info(item["productId"])
+    top_items = forecast_result[:8]
+    infos = get_products_info([item["productId"] for item in top_items])
+    for item in top_items:
+        p = infos.get(item["productId"])
         if p:
             price = p["price"]
             sale = p.get("sale", 0)
@@ -152,9 +164,11 @@ def forecast_api():
 
 @app.route("/popular", methods=["GET"])
 def popular_products():
+    top_selling_result = (components.require("forecast") or ([], []))[0]
     result = []
+    infos = get_products_info([item["productId"] for item in top_selling_result])
     for item in top_selling_result:
-        p = get_product_info(item["productId"])
+        p = infos.get(item["productId"])
         if p:
             result.append({**p, "bought_count": item["bought_count"]})
     return jsonify(result)
@@ -162,72 +176,189 @@ def popular_products():
 # ✅ Gợi ý sản phẩm dùng Deep Learning
 @app.route("/recommend/<user_id>", methods=["GET"])
 def recommend_user(user_id):
-    if not recommendation_model:
-        return jsonify([])
-
-    try:
-        user_encoded = user_encoder.transform([user_id])[0]
-    except:
-        return jsonify([])
-
-    product_encoded = product_encoder.transform(all_product_ids)
-    user_ids = np.full(len(product_encoded), user_encoded)
+    rec = components.require("recommender")
+    user_encoded = rec["user_index"].get(user_id) if rec else None
+    if user_encoded is None:
+        # User chưa có trong mô hình DL (mới / chưa train lại) → láng giềng của sản phẩm mua gần đây
+        return jsonify(recommend_from_similar(user_id, 5))
 
-    predictions = recommendation_model.predict([user_ids, product_encoded], verbose=0).flatten()
-    top_indices = predictions.argsort()[::-1][:5]
-    top_product_ids = [all_product_ids[i] for i in top_indices]
+    top_indices = rec["topn_store"].lookup(user_encoded, 5) if rec["topn_store"] else None
+    if top_indices is None:
+        top_indices = score_user_live(rec, user_encoded, 5)
+    top_product_ids = [rec["all_product_ids"][i] for i in top_indices]
 
-    result = []
-    for pid in top_product_ids:
-        p = get_product_info(pid)
-        if p:
-            result.append(p)
+    infos = get_products_info(top_product_ids)
+    result = [infos[pid] for pid in top_product_ids if pid in infos]
 
     return jsonify(result)
 
+def score_user_live(rec, user_encoded, k):
+    """Chấm điểm trực tiếp khi bảng top-N không trả được: bảng chưa dựng / cũ hơn model
+    (TopNStore.load → None sau khi train lại mà chưa dựng lại) hoặc user ngoài bảng.
+    Catalog >= ANN_MIN_PRODUCTS và ANN đã đo đạt recall → chỉ chấm ứng viên của ANN."""
+    if rec["numpy"] is not None and rec["ann_index"] is not None and len(rec["all_product_ids"]) >= ANN_MIN_PRODUCTS:
+        ann, nprobe = rec["ann_index"]
+        return ann.recommend(rec["numpy"], user_encoded, k, nprobe=nprobe)
+    if rec["numpy"] is not None:
+        predictions = rec["numpy"].score_user(user_encoded)
+    else:
+        product_encoded = np.arange(len(rec["all_product_ids"]))
+        user_ids = np.full(len(product_encoded), user_encoded)
+        predictions = rec["model"].predict([user_ids, product_encoded], verbose=0).flatten()
+    return top_k_indices(predictions, k).tolist()
+
+# Sản phẩm hay được mua cùng (index CSR top-k dựng offline, xem item_similarity.py)
+def load_item_similarity():
+    index = ItemSimilarityIndex.load()
+    if index is None:
+        # Lỗi → component FAILED, được load lại (có backoff) khi index được dựng sau lúc khởi động
+        raise FileNotFoundError("Chưa có index sản phẩm tương tự (chạy python item_similarity.py)")
+    return index
+
+components.register("item_similarity", load_item_similarity)
+
+SIMILAR_DEFAULT_K = 8
+SIMILAR_MAX_K = 50
+RECENT_ORDERS_FOR_SIMILAR = 5
+
+def recent_purchases(user_id: str, limit: int = RECENT_ORDERS_FOR_SIMILAR):
+    """productId trong `limit` đơn gần nhất của user (mới nhất trước, không trùng)."""
+    try:
+        uid = ObjectId(user_id)
+    except (InvalidId, TypeError):
+        return []
+    pids = []
+    for order in orders.find({"userId": uid}, {"products.productId": 1}).sort("_id", -1).limit(limit):
+        for p in order.get("products") or []:
+            pid = str(p.get("productId"))
+            if p.get("productId") is not None and pid not in pids:
+                pids.append(pid)
+    return pids
+
+def recommend_from_similar(user_id: str, k: int):
+    similarity = components.require("item_similarity")
+    if not similarity:
+        return []
+    recent = recent_purchases(user_id)
+    if not recent:
+        return []
+    pids = similarity.recommend(recent, k, exclude=recent)
+    infos = get_products_info(pids)
+    return [infos[pid] for pid in pids if pid in infos]
+
+@app.route("/similar/<product_id>", methods=["GET"])
+def similar_products(product_id):
+    similarity = components.require("item_similarity")
+    if not similarity:
+        return jsonify([])
+    k = min(max(request.args.get("k", SIMILAR_DEFAULT_K, type=int), 1), SIMILAR_MAX_K)
+    neighbours = similarity.neighbours(product_id, k)
+    infos = get_products_info([pid for pid, _ in neighbours])
+    return jsonify([{**infos[pid], "score": round(score, 4)} for pid, score in neighbours if pid in infos])
+
+@app.route("/stats/recommend", methods=["GET"])
+def recommend_stats():
+    rec = components.require("recommender")
+    topn_store = rec["topn_store"] if rec else None
+    similarity = components.require("item_similarity")
+    return jsonify({
+        "topn_store": topn_store.stats() if topn_store else None,
+        "item_similarity": similarity.stats() if similarity else None
+    })
+
 # Lead scoring
-try:
-    lead_model = joblib.load("lead_model.pkl")
-except:
-    lead_model = None
-    print("⚠️ Không tìm thấy model lead_model.pkl")
+def load_lead_model():
+    return joblib.load("lead_model.pkl")
+
+components.register("lead_model", load_lead_model)
+
+LEAD_FEATURES = ["total_spent", "order_count", "account_age_days"]
+LEADS_DEFAULT_LIMIT = 50
+LEADS_MAX_LIMIT = 500
+
+def leads_page(items, total: int, page: Optional[int], limit: Optional[int]):
+    """Body phân trang {items, total, page, limit}; total = tổng số lead (mọi trang).
+    page/limit None (client cũ không gửi ?page=&limit=) → list trần mọi lead như trước đây.
+    """
+    if page is None:
+        response = jsonify(items)
+    else:
+        response = jsonify({"items": items, "total": total, "page": page, "limit": limit})
+    response.headers["X-Total-Count"] = str(total)
+    return response
 
 @app.route("/predicted-leads", methods=["GET"])
 def get_predicted_leads():
+    page = limit = None
+    if "page" in request.args or "limit" in request.args:
+        page = max(request.args.get("page", 1, type=int), 1)
+        limit = min(max(request.args.get("limit", LEADS_DEFAULT_LIMIT, type=int), 1), LEADS_MAX_LIMIT)
+
+    lead_model = components.require("lead_model")
     if not lead_model:
-        return jsonify([])
+        return leads_page([], 0, page, limit)
+
+    customers = list(users.find(
+        {"role": "customer"},
+        {"email": 1, "address": 1, "phone": 1, "createdAt": 1}
+    ))
+    if not customers:
+        return leads_page([], 0, page, limit)
+
+    # 1 lần $group trên orders cho tất cả khách hàng (thay vì 1 query / khách)
+    order_stats = {s["user_id"]: s for s in user_order_stats(orders)}
+
+    now = datetime.now()
+    rows = []
+    for user in customers:
+        created = parse_created_at(user.get("createdAt"))
+        stats = order_stats.get(str(user["_id"]), {})
+        rows.append([
+            stats.get("total_spent", 0),
+            stats.get("order_count", 0),
+            (now - created).days if created else 0
+        ])
+    features = pd.DataFrame(rows, columns=LEAD_FEATURES)
+
+    # 1 lần predict_proba cho tất cả; predict() == 1 tương đương P(1) > 0.5
+    classes = list(lead_model.classes_)
+    if 1 not in classes:
+        return leads_page([], 0, page, limit)
+    proba = lead_model.predict_proba(features)[:, classes.index(1)]
+
+    lead_idx = np.flatnonzero(proba > 0.5)
+    lead_idx = lead_idx[np.argsort(-proba[lead_idx], kind="stable")]
+    page_idx = lead_idx if page is None else lead_idx[(page - 1) * limit: page * limit]
 
-    user_cursor = users.find({"role": "customer"})
     user_data = []
-    for user in user_cursor:
-        uid = str(user["_id"])
-        created = user.get("createdAt")
-        if isinstance(created, dict) and "$date" in created:
-            created = created["$date"]
-        if isinstance(created, str):
-            created = datetime.fromisoformat(created.replace("Z", "+00:00"))
-        age_days = (datetime.now() - created).days if created else 0
-
-        order_list = list(orders.find({"userId": user["_id"]}))
-        total_spent = sum(o.get("total", 0) for o in order_list)
-        order_count = len(order_list)
-
-        features = [[total_spent, order_count, age_days]]
-        predicted = lead_model.predict(features)[0]
-        if predicted == 1:
-            user_data.append({
-                "user_id": uid,
-                "email": user.get("email", ""),
-                "address": user.get("address", ""),
-                "phone": user.get("phone", ""),
-                "total_spent": total_spent,
-                "order_count": order_count
-            })
-    return jsonify(user_data)
+    for i in page_idx:
+        user = customers[i]
+        user_data.append({
+            "user_id": str(user["_id"]),
+            "email": user.get("email", ""),
+            "address": user.get("address", ""),
+            "phone": user.get("phone", ""),
+            "total_spent": rows[i][0],
+            "order_count": rows[i][1],
+            "probability": round(float(proba[i]), 4)
+        })
+
+    return leads_page(user_data, len(lead_idx), page, limit)
 
 # Business strategy giả lập
-def run_business_strategy_ai():
-    market_data = fetch_market_data()
+def load_market_snapshot():
+    # business_strategy kéo theo prophet/pytrends → import nền
+    import business_strategy as bs
+    snapshot = MarketSnapshot(bs.fetch_market_data)
+    if snapshot.data is None:
+        # Chưa có snapshot trên đĩa: fetch ở nền, không để lỗi mạng lúc khởi động làm hỏng component;
+        # request trước khi fetch xong → snapshot.get() fetch đồng bộ (như trước đây mỗi request)
+        snapshot.refresh_in_background()
+    return snapshot
+
+components.register("market_data", load_market_snapshot)
+
+def run_business_strategy_ai(market_data):
     try:
         model = joblib.load("business_strategy_model.pkl")
 
@@ -249,14 +380,19 @@ def run_business_strategy_ai():
 
 @app.route("/business-strategy", methods=["GET"])
 def business_strategy():
+    snapshot = components.require("market_data")
     try:
-        market_data = fetch_market_data()
-        strategy_from_ai = run_business_strategy_ai()
+        if snapshot is None:
+            raise Exception("không khởi tạo được dữ liệu thị trường")
+        # Trả ngay snapshot gần nhất; snapshot quá TTL sẽ được làm mới ở nền
+        market_data, market_age = snapshot.get()
+        strategy_from_ai = run_business_strategy_ai(market_data)
         top_selling_result, forecast_result = run_forecast()
 
         enriched_products = []
+        infos = get_products_info([item["productId"] for item in top_selling_result])
         for item in top_selling_result:
-            p_info = get_product_info(item["productId"])
+            p_info = infos.get(item["productId"])
             if p_info:
                 enriched_products.append({
                     "productId": item["productId"],
@@ -270,7 +406,9 @@ def business_strategy():
         strategy = {
             "target_products": enriched_products,
             "revenue_strategy": strategy_from_ai["revenue_strategy"],
-            "market_trend": strategy_from_ai["market_trend"]  # dict chi tiết
+            "market_trend": strategy_from_ai["market_trend"],  # dict chi tiết
+            "market_data_age_seconds": round(market_age),
+            "market_data_last_checked": market_data.get("last_checked")
         }
 
         return jsonify(strategy)
@@ -278,6 +416,21 @@ def business_strategy():
         return jsonify({"error": f"Không tìm thấy chiến lược kinh doanh. Lỗi: {str(e)}"}), 500
 
 
+@app.errorhandler(ComponentNotReady)
+def component_not_ready(e):
+    response = jsonify({"error": str(e), "component": e.name})
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    ready = components.is_ready()
+    return jsonify({"ready": ready, "components": components.status()}), 200 if ready else 503
+
+# "product_catalog" (product_catalog.py) và "chat_index" (chatbot.py) được đăng ký khi import module
+components.start()
+
+
 if __name__ == "__main__":
     app.run(port=5000, debug=True)
     
@@ -288,7 +441,7 @@ if __name__ == "__main__":
 
 # pymongo
 
-# sklearn.linear_model.LinearRegression (dự báo bán chạy)
+# forecast_engine.batch_linear_forecast (hồi quy tuyến tính theo tháng, vector hóa cho mọi sản phẩm)
 
 # tensorflow.keras (load DL model gợi ý)
 
@@ -311,9 +464,11 @@ if __name__ == "__main__":
 
 # /popular: trả về sản phẩm bán chạy hiện tại.
 
-# /recommend/<user_id>: trả về gợi ý sản phẩm dựa trên mô hình DL đã train.
+# /recommend/<user_id>: trả về gợi ý sản phẩm dựa trên mô hình DL đã train (user chưa có trong mô hình → sản phẩm hay mua cùng với các đơn gần đây).
+
+# /similar/<product_id>: sản phẩm hay được mua cùng (index CSR top-k từ item_similarity.py, ?k=).
 
-# /predicted-leads: dự đoán lead tiềm năng dựa trên model lead scoring.
+# /predicted-leads: dự đoán lead tiềm năng dựa trên model lead scoring (sắp theo xác suất; có ?page=&limit= → {items, total, page, limit}, không có → list trần mọi lead như bản cũ).
 
 # /business-strategy: giả lập chiến lược kinh doanh (giả lập AI dựa trên dữ liệu thị trường + dự báo).
 
@@ -370,7 +525,7 @@ if __name__ == "__main__":
 # tensorflow.keras->Xây dựng, huấn luyện, load mô hình DL
 # sklearn.preprocessing->Mã hóa nhãn (LabelEncoder)
 # sklearn.metrics.pairwise->Tính similarity cosine
-# sklearn.linear_model->Linear regression dự báo
+# forecast_engine->Linear regression dự báo (NumPy, nghiệm đóng)
 # joblib->Lưu / load model và encoder
 # pandas, numpy->Xử lý dữ liệu dạng bảng và mảng
 # dotenv->Load biến môi trường (.env)
@@ -0,0 +1,156 @@
+# shopee_client.py
+"""
+Lấy thống kê Shopee theo từ khóa (endpoint search_items không chính thức), chạy song song.
+- 1 requests.Session dùng chung với pool kết nối (keep-alive) thay cho requests.get mỗi lần.
+- Giới hạn theo host: tối đa `max_per_host` request đồng thời + khoảng cách tối thiểu giữa
+  2 lần bắt đầu request (tránh bị Shopee chặn 403/429 khi gọi dồn dập).
+- N từ khóa chạy trên thread pool → thời gian ≈ request chậm nhất, không phải tổng.
+- URL đổi được bằng biến môi trường SHOPEE_SEARCH_URL (trỏ về stub server khi thử nghiệm,
+  xem benchmarks/bench_shopee_fetch.py).
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import mean
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SHOPEE_SEARCH_URL = os.getenv("SHOPEE_SEARCH_URL", "https://shopee.vn/api/v4/search/search_items")
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+    ),
+    "Accept": "application/json, text/plain, */*",
+    # Thay cookie thật từ trình duyệt của bạn nếu bị 403
+    "Cookie": "SPC_ST=FAKE_COOKIE_VALUE"
+}
+
+
+# ---------------------------
+# Giới hạn đồng thời + tốc độ theo host
+# ---------------------------
+class HostLimiter:
+    def __init__(self, max_concurrent: int = 4, min_interval: float = 0.1):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_concurrent)
+            return self._semaphores[host]
+
+    def _wait_turn(self, host: str) -> None:
+        # Đặt chỗ thời điểm bắt đầu kế tiếp rồi ngủ ngoài lock
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def request(self, session: requests.Session, url: str, **kwargs) -> requests.Response:
+        host = urlparse(url).netloc
+        with self._semaphore(host):
+            self._wait_turn(host)
+            return session.get(url, **kwargs)
+
+
+def make_session(pool_size: int = 10) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+_session = make_session()
+_limiter = HostLimiter()
+
+
+# ---------------------------
+# Shopee
+# ---------------------------
+def parse_search_items(keyword: str, data: dict) -> dict:
+    out = {
+        "keyword": keyword,
+        "items_count": 0,
+        "avg_price_vnd": None,
+        "top_products": [],
+        "top_shops": []
+    }
+    items = data.get("items") or []
+    if not items:
+        return out
+
+    prices = []
+    products = []
+    shop_counts = {}
+    for it in items:
+        basic = it.get("item_basic") or {}
+
+        # Shopee thường scale price * 100000
+        price_raw = basic.get("price") or basic.get("price_min") or basic.get("price_max")
+        price_vnd = price_raw / 100000 if price_raw else None
+
+        sold = basic.get("sold", None)
+        if sold is None:
+            sold = basic.get("historical_sold", 0)
+
+        shopid = basic.get("shopid")
+        products.append({
+            "name": basic.get("name"),
+            "price_vnd": price_vnd,
+            "sold": sold,
+            "shopid": shopid,
+            "shop_location": basic.get("shop_location")
+        })
+        if price_vnd:
+            prices.append(price_vnd)
+        if shopid:
+            shop_counts[shopid] = shop_counts.get(shopid, 0) + 1
+
+    out["items_count"] = len(items)
+    out["avg_price_vnd"] = round(mean(prices), 0) if prices else None
+    out["top_products"] = sorted(products, key=lambda x: (x["sold"] or 0), reverse=True)[:10]
+    out["top_shops"] = [{"shopid": sid, "count": cnt}
+                        for sid, cnt in sorted(shop_counts.items(), key=lambda x: x[1], reverse=True)[:10]]
+    return out
+
+
+def fetch_shopee_for_keyword(keyword: str, limit: int = 50, timeout: int = 8,
+                             session: Optional[requests.Session] = None,
+                             limiter: Optional[HostLimiter] = None,
+                             url: Optional[str] = None) -> dict:
+    params = {"by": "pop", "limit": limit, "order": "desc", "keyword": keyword}
+    try:
+        resp = (limiter or _limiter).request(session or _session, url or SHOPEE_SEARCH_URL,
+                                             params=params, timeout=timeout)
+        if resp.status_code == 403:
+            print(f"[fetch_shopee_for_keyword] 403 blocked '{keyword}', trả về rỗng.")
+            return parse_search_items(keyword, {})
+        resp.raise_for_status()
+        return parse_search_items(keyword, resp.json())
+    except Exception as e:
+        print(f"[fetch_shopee_for_keyword] Error '{keyword}': {e}")
+        return parse_search_items(keyword, {})
+
+
+def fetch_shopee_data(keywords: List[str], per_kw_limit: int = 50, max_workers: int = 8, **kwargs) -> dict:
+    """Lấy song song mọi từ khóa; kết quả giữ đúng thứ tự keywords."""
+    if not keywords:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keywords)), thread_name_prefix="shopee") as pool:
+        results = pool.map(lambda kw: fetch_shopee_for_keyword(kw, limit=per_kw_limit, **kwargs), keywords)
+        return dict(zip(keywords, results))
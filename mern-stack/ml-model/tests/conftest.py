@@ -0,0 +1,17 @@
+# conftest.py
+"""
+Cấu hình chung cho test ml-model (chạy trong thư mục ml-model: python -m pytest -q tests).
+- Module ở thư mục ml-model import trực tiếp như server.py.
+- MONGO_URI giả, hết hạn chọn server rất nhanh: các module tạo MongoClient lúc import
+  (product_catalog, server) không chờ MongoDB thật; test dùng mongomock truyền vào trực tiếp.
+"""
+
+import os
+import sys
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ML_DIR not in sys.path:
+    sys.path.insert(0, ML_DIR)
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/?serverSelectionTimeoutMS=100")
+os.environ.setdefault("GEMINI_API_KEY", "test")
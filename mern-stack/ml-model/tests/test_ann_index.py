@@ -0,0 +1,57 @@
+# test_ann_index.py
+import os
+
+import numpy as np
+
+from ann_index import ANN_CENTROIDS_FILE, ANN_OFFSETS_FILE, IVFIndex, _assign, evaluate_recall, kmeans
+from recommender_inference import NumpyRecommender
+
+
+def make_recommender(n_users=50, n_products=2000, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    dense = [(rng.normal(size=(2 * dim, 16)), rng.normal(size=16), "relu"),
+             (rng.normal(size=(16, 1)), rng.normal(size=1), "linear")]
+    return NumpyRecommender(rng.normal(size=(n_users, dim)), rng.normal(size=(n_products, dim)), dense)
+
+
+def test_kmeans_labels_match_final_centroids():
+    x = np.random.default_rng(1).normal(size=(3000, 6)).astype(np.float32)
+    for n_iter in (1, 3, 50):
+        centroids, labels = kmeans(x, 20, n_iter=n_iter)
+        assert np.array_equal(labels, _assign(x, centroids))
+
+
+def test_ann_disabled_until_recall_measured(tmp_path):
+    rec = make_recommender()
+    index = IVFIndex.build(rec, nlist=16)
+    index.save(str(tmp_path), model_path=str(tmp_path / "missing.h5"))
+    loaded = IVFIndex.load(str(tmp_path), model_path=str(tmp_path / "missing.h5"))
+    assert loaded.serving_nprobe(0.9) is None
+
+    report = evaluate_recall(rec, loaded, k=5, n_users=20)
+    assert report[-1]["nprobe"] == 16 and report[-1]["recall@5"] == 1.0   # probe mọi cụm = chính xác
+    loaded.save_evaluation(report, k=5, out_dir=str(tmp_path))
+
+    reloaded = IVFIndex.load(str(tmp_path), model_path=str(tmp_path / "missing.h5"))
+    nprobe = reloaded.serving_nprobe(0.9)
+    assert nprobe is not None
+    assert all(r["recall@5"] < 0.9 for r in report if r["nprobe"] < nprobe)
+    assert reloaded.serving_nprobe(1.01) is None
+
+    # Build lại → kết quả đo cũ không còn giá trị
+    IVFIndex.build(rec, nlist=16).save(str(tmp_path), model_path=str(tmp_path / "missing.h5"))
+    assert IVFIndex.load(str(tmp_path), model_path=str(tmp_path / "missing.h5")).serving_nprobe(0.0) is None
+
+
+def test_save_is_atomic_and_load_rejects_mismatched_arrays(tmp_path):
+    rec = make_recommender()
+    missing_model = str(tmp_path / "missing.h5")
+    IVFIndex.build(rec, nlist=16).save(str(tmp_path), model_path=missing_model)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    assert IVFIndex.load(str(tmp_path), model_path=missing_model).nlist == 16
+
+    # Build mới đã thay mảng nhưng chưa kịp ghi meta → không phục vụ index lẫn lộn
+    other = IVFIndex.build(rec, nlist=8)
+    np.save(tmp_path / ANN_CENTROIDS_FILE, other.centroids)
+    np.save(tmp_path / ANN_OFFSETS_FILE, other.offsets)
+    assert IVFIndex.load(str(tmp_path), model_path=missing_model) is None
@@ -0,0 +1,133 @@
+# test_chatbot_cache.py
+"""
+Cache câu trả lời của /chat với model Gemini giả (không gọi mạng, không cần google-generativeai):
+đếm số lần generate_content để kiểm tra HIT / MISS.
+"""
+
+import sys
+import time
+import types
+
+import pytest
+from flask import Flask
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        return types.SimpleNamespace(text=f"trả lời #{self.calls}")
+
+
+class FakeCatalog:
+    def __init__(self, products):
+        self.products = products
+        self.version = 1
+
+    def list_active(self):
+        return self.products
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def _fake_genai():
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = lambda name: FakeModel()
+    google = sys.modules.get("google") or types.ModuleType("google")
+    google.generativeai = genai
+    return {"google": google, "google.generativeai": genai}
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    for name, module in _fake_genai().items():
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.delitem(sys.modules, "chatbot", raising=False)
+    import chatbot
+    import ttl_cache
+    from components import components
+    from product_retriever import ProductRetriever
+
+    catalog = FakeCatalog([
+        {"nameProduct": "Bó hoa hồng đỏ", "price": 500000, "sale": 0, "desc": "Hoa hồng Đà Lạt"},
+        {"nameProduct": "Giỏ hoa lan trắng", "price": 900000, "sale": 0, "desc": "Lan hồ điệp"}
+    ])
+    clock = FakeClock()
+    model = FakeModel()
+    monkeypatch.setattr(ttl_cache, "time", clock)
+    components.reload("chat_index", lambda: ProductRetriever(catalog, top_k=2))
+    monkeypatch.setattr(chatbot, "response_cache", ttl_cache.LRUCache(maxsize=100, ttl=60))
+    monkeypatch.setattr(chatbot, "model", model)
+
+    app = Flask(__name__)
+    app.register_blueprint(chatbot.chatbot_api)
+    client = app.test_client()
+
+    def ask(prompt):
+        res = client.post("/chat", json={"prompt": prompt})
+        assert res.status_code == 200
+        return res.headers["X-Cache"], res.get_json()["response"]
+
+    return types.SimpleNamespace(ask=ask, model=model, catalog=catalog, clock=clock, client=client)
+
+
+def test_normalised_repeat_question_is_hit_without_model_call(chat):
+    assert chat.ask("Hoa hồng đỏ giá bao nhiêu?") == ("MISS", "trả lời #1")
+    assert chat.ask("  hoa HONG do   gia bao nhieu ") == ("HIT", "trả lời #1")
+    assert chat.model.calls == 1
+
+
+def test_catalog_version_bump_is_miss(chat):
+    chat.ask("Giờ mở cửa?")
+    chat.catalog.version += 1
+    assert chat.ask("Giờ mở cửa?") == ("MISS", "trả lời #2")
+    assert chat.model.calls == 2
+
+
+def test_cached_reply_expires_after_ttl(chat):
+    chat.ask("Có giao hàng toàn quốc không?")
+    chat.clock.now += 59
+    assert chat.ask("Có giao hàng toàn quốc không?")[0] == "HIT"
+    chat.clock.now += 61
+    assert chat.ask("Có giao hàng toàn quốc không?") == ("MISS", "trả lời #2")
+    assert chat.model.calls == 2
+
+
+class SlowStream:
+    def __init__(self, delay, n=20):
+        self.delay, self.n, self.sent, self.closed = delay, n, 0, False
+
+    def __iter__(self):
+        while self.sent < self.n and not self.closed:
+            time.sleep(self.delay)
+            self.sent += 1
+            yield types.SimpleNamespace(text=f"đoạn {self.sent} ")
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_past_deadline_is_closed_and_not_cached(chat, monkeypatch):
+    import chatbot
+    from llm_gateway import LLMGateway
+
+    stream = SlowStream(delay=0.03)
+    gateway = LLMGateway(max_concurrent=1, call_timeout=0.1)
+    monkeypatch.setattr(chatbot, "gateway", gateway)
+    monkeypatch.setattr(chat.model, "generate_content", lambda prompt, **kwargs: stream)
+
+    body = chat.client.post("/chat/stream", json={"prompt": "Hoa cưới"}).get_data(as_text=True)
+    assert "event: error" in body and "event: done" not in body
+    assert stream.closed and stream.sent < stream.n
+    stats = gateway.stats()
+    assert stats["timeouts"] == 1 and stats["active"] == 0
+    assert chatbot.response_cache.get(chatbot.prepare_prompt("Hoa cưới")[0]) is None
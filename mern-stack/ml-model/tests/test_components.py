@@ -0,0 +1,44 @@
+# test_components.py
+import time
+
+import components as components_module
+from components import FAILED, READY, ComponentRegistry
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "hết thời gian chờ"
+        time.sleep(0.01)
+
+
+def test_failed_component_is_retried_with_backoff(monkeypatch):
+    monkeypatch.setattr(components_module, "RETRY_BASE", 0.3)
+    calls = []
+
+    def loader():
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise OSError("mạng lỗi")
+        return "ok"
+
+    registry = ComponentRegistry()
+    registry.register("market", loader)
+    registry.start()
+    assert registry.wait("market", timeout=5) is None
+
+    # Chưa qua thời gian chờ → không load lại
+    assert registry.require("market") is None and len(calls) == 1
+
+    time.sleep(0.35)
+    assert registry.require("market") is None           # lần thử lại chạy ở nền
+    wait_for(lambda: len(calls) == 2 and registry.status()["market"]["failures"] == 2)
+    assert registry.status()["market"]["status"] == FAILED
+
+    time.sleep(0.35)
+    registry.require("market")
+    assert len(calls) == 2                              # lỗi lần 2 → chờ gấp đôi (0.6s)
+    time.sleep(0.35)
+    registry.require("market")
+    wait_for(lambda: registry.status()["market"]["status"] == READY)
+    assert registry.require("market") == "ok" and len(calls) == 3
@@ -0,0 +1,69 @@
+# test_evaluate_recommendation.py
+import types
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from evaluate_recommendation import evaluate, fit_holdout, holdout_interactions, prepare, served_scorer
+from id_encoder import AppendOnlyEncoder
+from recommender_inference import NumpyRecommender
+
+
+def make_snapshot(n_users=40, n_products=30, orders_per_user=5, seed=0):
+    rng = np.random.default_rng(seed)
+    order_user = np.append(np.repeat(np.arange(n_users), orders_per_user), -1)   # + 1 đơn không có user
+    line_order = np.repeat(np.arange(len(order_user)), 3)
+    line_quantity = rng.integers(1, 4, size=len(line_order)).astype(np.float32)
+    line_quantity[::7] = np.nan
+    return types.SimpleNamespace(
+        order_user=order_user,
+        line_order=line_order,
+        line_product=rng.integers(0, n_products, size=len(line_order)),
+        line_quantity=line_quantity,
+        user_ids=np.array([f"u{i}" for i in range(n_users)]),
+        product_ids=np.array([f"p{i}" for i in range(n_products)])
+    )
+
+
+def test_holdout_interactions_never_contain_test_orders():
+    snapshot = make_snapshot()
+    train, test = prepare(snapshot, seed=7)
+    users, products, quantity = holdout_interactions(snapshot, seed=7)
+
+    fitted = sparse.csr_matrix((np.ones(len(users), dtype=np.float32), (users, products)), shape=train.shape)
+    fitted.sum_duplicates()
+    assert (fitted != train).nnz == 0
+    assert test.nnz > 0 and len(users) < len(snapshot.line_order)
+    assert users.min() >= 0 and not np.isnan(quantity).any()
+
+
+def test_holdout_evaluation_uses_model_fitted_on_train_split():
+    pytest.importorskip("tensorflow")
+    snapshot = make_snapshot()
+    train, test = prepare(snapshot)
+    report = evaluate(train, test, k=5, scorer=fit_holdout(snapshot, epochs=1))
+    assert report["model"] == "deep" and report["unscored_users"] == 0
+    assert report["users"] == len(snapshot.user_ids)
+
+
+def test_time_split_scores_served_model_only_on_unseen_orders():
+    snapshot = make_snapshot(n_users=6, orders_per_user=2)
+    created = np.where(np.arange(len(snapshot.order_user)) % 2 == 0,
+                       np.datetime64("2025-01-01T00:00:00"), np.datetime64("2025-03-01T00:00:00"))
+    created[-1] = np.datetime64("NaT")
+    snapshot.order_created = created.astype("datetime64[s]")
+    train, test = prepare(snapshot, cut="2025-02-01T00:00:00")
+    later = np.flatnonzero((created > np.datetime64("2025-02-01")) & (snapshot.order_user >= 0))
+    assert test.sum() == 3 * len(later) and train.sum() == 3 * (len(snapshot.order_user) - 1 - len(later))
+
+    # Encoder đã nối thêm id mới (chưa fine-tune): chỉ id mô hình biết được ánh xạ
+    rng = np.random.default_rng(0)
+    rec = NumpyRecommender(rng.normal(size=(4, 3)), rng.normal(size=(30, 3)),
+                           [(rng.normal(size=(6, 1)), rng.normal(size=1), "linear")])
+    user_encoder = AppendOnlyEncoder().fit(snapshot.user_ids[::-1])
+    product_encoder = AppendOnlyEncoder().fit(snapshot.product_ids)
+    scorer = served_scorer(rec, user_encoder, product_encoder, snapshot)
+    assert (scorer.user_map >= 0).sum() == 4 and scorer.user_map[5] == 0
+    report = evaluate(train, test, k=5, scorer=scorer)
+    assert report["scored_users"] == 4 and report["unscored_users"] == 2
@@ -0,0 +1,46 @@
+# test_incremental_training.py
+from datetime import datetime
+
+import mongomock
+import numpy as np
+
+from incremental_training import select_rows, watermark_order_ids
+from orders_snapshot import build_snapshot
+
+
+def test_orders_in_watermark_second_are_new_unless_already_trained(tmp_path):
+    db = mongomock.MongoClient()["inc"]
+    at = datetime(2025, 3, 1, 10, 0, 0)
+    db["orders"].insert_many([
+        {"_id": "o1", "userId": "u1", "createdAt": datetime(2025, 2, 1), "products": [{"productId": "p1", "quantity": 1}]},
+        {"_id": "o2", "userId": "u1", "createdAt": at, "products": [{"productId": "p2", "quantity": 1}]},
+    ])
+    first = build_snapshot(db, str(tmp_path / "s1")).interactions()
+    watermark = "2025-03-01T10:00:00"
+    seen = watermark_order_ids(first.created, first.order_ids, watermark)
+    assert seen == ["o2"]
+
+    # Đơn cùng giây watermark đến sau lần train trước (o3) + đơn sau watermark (o4)
+    db["orders"].insert_many([
+        {"_id": "o3", "userId": "u1", "createdAt": at.replace(microsecond=500000),
+         "products": [{"productId": "p1", "quantity": 2}]},
+        {"_id": "o4", "userId": "u1", "createdAt": datetime(2025, 3, 2), "products": [{"productId": "p2", "quantity": 1}]},
+    ])
+    data = build_snapshot(db, str(tmp_path / "s2")).interactions()
+    rows, n_new, _ = select_rows(data.users, data.products, data.created, 1, 2, watermark, replay_ratio=0,
+                                 order_ids=data.order_ids, seen_order_ids=seen)
+    assert n_new == 2
+    assert sorted(data.order_ids[rows].tolist()) == [b"o3", b"o4"]
+
+    # Train lại ngay không có đơn mới → không còn dòng mới
+    seen = watermark_order_ids(data.created, data.order_ids, "2025-03-02T00:00:00")
+    _, n_new, _ = select_rows(data.users, data.products, data.created, 1, 2, "2025-03-02T00:00:00",
+                              order_ids=data.order_ids, seen_order_ids=seen)
+    assert n_new == 0
+
+
+def test_select_rows_without_order_ids_keeps_watermark_second():
+    created = np.array(["2025-01-01T00:00:00", "2025-01-02T00:00:00", "2025-01-03T00:00:00"], dtype="datetime64[s]")
+    zeros = np.zeros(3, dtype=np.int32)
+    rows, n_new, n_replay = select_rows(zeros, zeros, created, 1, 1, "2025-01-02T00:00:00", replay_ratio=1)
+    assert n_new == 2 and n_replay == 1 and sorted(rows.tolist()) == [0, 1, 2]
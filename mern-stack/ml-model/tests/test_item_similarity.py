@@ -0,0 +1,32 @@
+# test_item_similarity.py
+import os
+import types
+
+import numpy as np
+
+from item_similarity import SIM_META_FILE, ItemSimilarityIndex, build_item_index
+
+
+def make_snapshot():
+    # 4 đơn: A+B, A+B, A+C, D
+    return types.SimpleNamespace(
+        order_user=np.array(["u1", "u2", "u1", "u3"]),
+        product_ids=np.array(["A", "B", "C", "D"]),
+        line_order=np.array([0, 0, 1, 1, 2, 2, 3], dtype=np.int32),
+        line_product=np.array([0, 1, 0, 1, 0, 2, 3], dtype=np.int32),
+        meta={"built_at": "2026-01-01T00:00:00Z"}
+    )
+
+
+def test_build_writes_meta_atomically_and_loads(tmp_path):
+    out_dir = str(tmp_path)
+    with open(os.path.join(out_dir, SIM_META_FILE), "w", encoding="utf-8") as f:
+        f.write("{}")  # meta cũ: bị thay nguyên file, không ghi đè tại chỗ
+    meta = build_item_index(make_snapshot(), k=2, out_dir=out_dir)
+
+    assert not [name for name in os.listdir(out_dir) if name.endswith(".tmp")]
+    index = ItemSimilarityIndex.load(out_dir)
+    assert index.meta == meta and meta["n_pairs"] == 4
+    assert [pid for pid, _ in index.neighbours("A")] == ["B", "C"]
+    assert index.neighbours("D") == []
+    assert index.recommend(["C"], k=2) == ["A"]
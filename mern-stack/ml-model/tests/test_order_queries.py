@@ -0,0 +1,67 @@
+# test_order_queries.py
+from datetime import datetime
+
+import mongomock
+import pytest
+from bson.objectid import ObjectId
+
+from order_queries import monthly_product_quantities, user_order_stats, user_product_rows
+from orders_snapshot import build_snapshot
+
+U1, U2 = ObjectId(), ObjectId()
+P1, P2 = ObjectId(), ObjectId()
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().shop
+    db.orders.insert_many([
+        {"userId": U1, "total": 100, "createdAt": datetime(2025, 1, 5),
+         "products": [{"productId": P1, "quantity": 2}, {"productId": P2, "quantity": 1}]},
+        {"userId": U1, "total": 50, "createdAt": "2025-03-01T10:00:00Z",          # chuỗi ISO cũ
+         "products": [{"productId": P1, "quantity": 1}]},
+        {"userId": U2, "total": 70, "createdAt": {"$date": "2025-02-10T00:00:00Z"},
+         "products": [{"productId": P2, "quantity": 3}]},
+        {"userId": U2, "total": 30, "createdAt": datetime(2025, 1, 20),
+         "products": [{"productId": P2, "quantity": None}]},
+        {"userId": U2, "total": 10, "products": [{"productId": P1, "quantity": 4}]},  # không có createdAt
+        {"total": 999, "createdAt": datetime(2025, 1, 1), "products": [{"productId": P1, "quantity": 1}]}
+    ])
+    db.users.insert_many([{"_id": U1, "role": "customer", "createdAt": datetime(2024, 12, 1)},
+                          {"_id": U2, "role": "customer", "createdAt": "2024-11-01T00:00:00Z"}])
+    return db
+
+
+def test_user_order_stats_mixes_date_and_legacy_created_at(db):
+    stats = {s["user_id"]: s for s in user_order_stats(db.orders)}
+    assert set(stats) == {str(U1), str(U2)}
+    assert (stats[str(U1)]["total_spent"], stats[str(U1)]["order_count"]) == (150, 2)
+    assert stats[str(U1)]["last_order_date"] == datetime(2025, 3, 1, 10)
+    assert (stats[str(U2)]["total_spent"], stats[str(U2)]["order_count"]) == (110, 3)
+    assert stats[str(U2)]["last_order_date"] == datetime(2025, 2, 10)
+
+
+def test_user_order_stats_matches_snapshot(db, tmp_path):
+    snapshot = build_snapshot(db, str(tmp_path / "snap")).user_order_stats()
+    expected = {r.user_id: (r.total_spent, r.order_count, r.last_order_date) for r in snapshot.itertuples()}
+    got = {s["user_id"]: (s["total_spent"], s["order_count"], s["last_order_date"])
+           for s in user_order_stats(db.orders)}
+    assert got == expected
+
+
+def test_monthly_product_quantities_merges_legacy_dates(db):
+    rows = {(r["productId"], r["year"], r["month"]): r["quantity"] for r in monthly_product_quantities(db.orders)}
+    assert rows == {
+        (str(P1), 2025, 1): 3,   # 2 (user) + 1 (đơn không có userId)
+        (str(P2), 2025, 1): 1,   # dòng quantity None bị bỏ
+        (str(P1), 2025, 3): 1,
+        (str(P2), 2025, 2): 3
+    }
+
+
+def test_user_product_rows_defaults_missing_quantity(db):
+    rows = list(user_product_rows(db.orders))
+    assert len(rows) == 6
+    assert {"user": str(U2), "product": str(P2), "quantity": 1} in [
+        {k: r[k] for k in ("user", "product", "quantity")} for r in rows
+    ]
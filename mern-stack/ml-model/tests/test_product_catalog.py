@@ -0,0 +1,63 @@
+# test_product_catalog.py
+from datetime import datetime, timedelta
+
+import mongomock
+
+from product_catalog import ProductCatalog
+
+
+def make_catalog():
+    collection = mongomock.MongoClient().db.products
+    t0 = datetime(2025, 1, 1)
+    ids = collection.insert_many([
+        {"nameProduct": f"Hoa {i}", "price": 100000, "sale": 0, "desc": "", "is_deleted": False,
+         "updatedAt": t0}
+        for i in range(3)
+    ]).inserted_ids
+    return ProductCatalog(collection, poll_interval=3600), collection, ids, t0
+
+
+def test_get_many_one_query_and_skips_invalid_ids():
+    catalog, _, ids, _ = make_catalog()
+    found = catalog.get_many([str(ids[0]), str(ids[2]), "khong-phai-id", "0" * 24])
+    assert set(found) == {str(ids[0]), str(ids[2])}
+    assert catalog.get("0" * 24) is None
+
+
+def test_edit_seen_by_point_read_still_refreshes_list_active():
+    catalog, collection, ids, t0 = make_catalog()
+    assert len(catalog.list_active()) == 3
+    version = catalog.version
+
+    collection.update_one({"_id": ids[1]}, {"$set": {"nameProduct": "Hoa đã sửa",
+                                                     "updatedAt": t0 + timedelta(minutes=5)}})
+    catalog._cache.pop(ids[1])  # hết TTL → lần đọc lẻ kế tiếp lấy bản mới từ DB
+    assert catalog.get(str(ids[1]))["nameProduct"] == "Hoa đã sửa"
+
+    assert catalog.refresh() == 1
+    assert catalog.version == version + 1
+    names = {p["nameProduct"] for p in catalog.list_active()}
+    assert "Hoa đã sửa" in names
+
+
+def test_refresh_sees_new_product():
+    catalog, collection, _, t0 = make_catalog()
+    catalog.list_active()
+    collection.insert_one({"nameProduct": "Hoa mới", "price": 1, "sale": 0, "desc": "", "is_deleted": False,
+                           "updatedAt": t0 + timedelta(days=1)})
+    assert catalog.refresh() == 1
+    assert len(catalog.list_active()) == 4
+
+
+def test_shared_catalog_is_created_by_component_loader_not_at_import(monkeypatch):
+    import product_catalog
+    from components import components
+
+    assert not hasattr(product_catalog, "catalog") and not hasattr(product_catalog, "client")
+    assert "product_catalog" in components.status()
+
+    monkeypatch.setattr(product_catalog, "MongoClient", mongomock.MongoClient)
+    catalog = product_catalog.load_catalog()
+    assert catalog.collection.name == "products" and catalog._watch_thread is not None
+    catalog._watch_thread.join(timeout=5)  # mongomock không có change stream → quay về polling
+    assert catalog.refresh() == 0
@@ -0,0 +1,34 @@
+# test_product_retriever.py
+from product_retriever import ProductRetriever, product_line
+
+
+class FakeCatalog:
+    def __init__(self, products):
+        self.products = products
+        self.version = 1
+
+    def list_active(self):
+        return self.products
+
+
+def test_product_line_handles_missing_or_null_fields():
+    line = product_line({"nameProduct": "Bó hoa hồng", "price": 300000, "sale": None, "desc": None},
+                        max_desc_chars=50)
+    assert line == "- Bó hoa hồng: Giá: 300000₫. Mô tả: Không có mô tả"
+    assert "Tên không rõ" in product_line({"desc": None})
+
+
+def test_product_line_truncates_long_desc():
+    line = product_line({"nameProduct": "Lan", "price": 1, "sale": 0, "desc": "rất đẹp " * 50}, max_desc_chars=30)
+    assert line.endswith("…") and len(line.split("Mô tả: ")[1]) <= 31
+
+
+def test_context_with_null_desc_product():
+    retriever = ProductRetriever(FakeCatalog([
+        {"nameProduct": "Bó hoa hồng đỏ", "price": 500000, "sale": 50000, "desc": None},
+        {"nameProduct": "Giỏ hoa lan trắng", "price": 900000, "sale": 0, "desc": "Lan hồ điệp trắng"},
+        {"nameProduct": None, "price": 100000, "desc": None}
+    ]), top_k=2)
+    context = retriever.context_for("hoa hồng đỏ giá bao nhiêu")
+    assert context.splitlines()[0] == "- Bó hoa hồng đỏ: Giá gốc 500000₫, giảm 50000₫ → còn 450000₫. Mô tả: Không có mô tả"
+    assert "lan" in retriever.context_for("giỏ lan trắng").lower()
@@ -0,0 +1,64 @@
+# test_prophet_engine.py
+"""ProphetEngine.run với fit_product giả (không cần prophet): thứ tự, cache, warm-start, dọn cache."""
+
+import pandas as pd
+import pytest
+
+import prophet_engine
+from prophet_engine import ProphetEngine
+
+
+@pytest.fixture
+def fits(monkeypatch):
+    calls = []
+
+    def fake_fit(pid, daily, periods, freq, init=None):
+        calls.append((pid, init))
+        if pid == "broken":
+            raise RuntimeError("stan lỗi")
+        total = float(daily["y"].sum())
+        return {**prophet_engine._insufficient(pid), "status": "ok", "last_period_sum": total}, {"k": total}, init is not None
+
+    monkeypatch.setattr(prophet_engine, "fit_product", fake_fit)
+    return calls
+
+
+def sales(products, days=12, extra=0):
+    rows = [{"date": pd.Timestamp("2025-01-01") + pd.Timedelta(days=d), "productId": pid, "qty": 1}
+            for pid in products for d in range(days)]
+    rows += [{"date": pd.Timestamp("2025-01-01"), "productId": products[0], "qty": extra}] if extra else []
+    return pd.DataFrame(rows)
+
+
+def test_results_follow_product_order_and_short_series_are_not_fitted(tmp_path, fits):
+    df = pd.concat([sales(["c", "a"]), sales(["b"], days=3)])
+    results = ProphetEngine(workers=1, cache_path=str(tmp_path / "cache.pkl")).run(df)
+    assert [r["productId"] for r in results] == ["a", "b", "c"]
+    assert [r["status"] for r in results] == ["ok", "insufficient_data", "ok"]
+    assert sorted(pid for pid, _ in fits) == ["a", "c"]
+
+
+def test_unchanged_series_come_from_cache_and_changed_series_refit_warm(tmp_path, fits):
+    path = str(tmp_path / "cache.pkl")
+    first = ProphetEngine(workers=1, cache_path=path).run(sales(["a", "b"]))
+    fits.clear()
+
+    engine = ProphetEngine(workers=1, cache_path=path)          # cache đọc lại từ file
+    assert engine.run(sales(["a", "b"])) == first and fits == []
+    assert engine.stats["cached"] == 2
+
+    changed = engine.run(sales(["a", "b"], extra=5))
+    assert fits == [("a", {"k": 12.0})]                         # warm-start từ tham số cũ
+    assert changed[0]["last_period_sum"] == 17.0 and changed[1] == first[1]
+    assert engine.stats["warm_started"] == 1
+
+
+def test_errors_are_not_cached_and_stale_products_are_pruned(tmp_path, fits):
+    path = str(tmp_path / "cache.pkl")
+    results = ProphetEngine(workers=1, cache_path=path).run(sales(["a", "broken", "old"]))
+    assert results[1]["status"] == "error" and "stan lỗi" in results[1]["error"]
+
+    engine = ProphetEngine(workers=1, cache_path=path)
+    assert set(engine.cache) == {"a", "old"}
+    engine.run(sales(["a"]))
+    assert set(ProphetEngine(workers=1, cache_path=path).cache) == {"a"}
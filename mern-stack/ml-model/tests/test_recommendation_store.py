@@ -0,0 +1,38 @@
+# test_recommendation_store.py
+import numpy as np
+import pytest
+
+from recommendation_store import TopNStore, batch_shape, build_topn_store
+from recommender_inference import NumpyRecommender
+
+
+def make_recommender(n_users=37, n_products=501, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    dense = [(rng.normal(size=(2 * dim, 16)), rng.normal(size=16), "relu"),
+             (rng.normal(size=(16, 8)), rng.normal(size=8), "relu"),
+             (rng.normal(size=(8, 1)), rng.normal(size=1), "linear")]
+    return NumpyRecommender(rng.normal(size=(n_users, dim)), rng.normal(size=(n_products, dim)), dense)
+
+
+def test_batch_shape_stays_within_budget():
+    rec = make_recommender(n_products=100000)
+    users, chunk = batch_shape(rec, max_block_mb=16)
+    assert users * chunk * (rec.hidden_width + 2) * 4 <= 16 * 2 ** 20
+    # Catalog lớn: 1 user mỗi lô, catalog chia đoạn
+    users, chunk = batch_shape(rec, max_block_mb=1)
+    assert users == 1 and chunk < rec.n_products
+
+
+@pytest.mark.parametrize("max_block_mb", [256, 0.05])
+def test_topn_store_matches_full_scoring(tmp_path, max_block_mb):
+    rec = make_recommender()
+    meta = build_topn_store(rec, top_n=10, max_block_mb=max_block_mb, out_dir=str(tmp_path),
+                            model_path=str(tmp_path / "missing.h5"))
+    store = TopNStore.load(str(tmp_path), model_path=str(tmp_path / "missing.h5"))
+    full = rec.score_users(np.arange(rec.n_users))
+    expected = np.argsort(-full, axis=1, kind="stable")[:, :10]
+    assert np.array_equal(np.asarray(store.idx), expected)
+    assert np.allclose(np.asarray(store.scores), np.take_along_axis(full, expected, axis=1), rtol=1e-5, atol=1e-5)
+    if max_block_mb < 1:
+        assert meta["product_chunk"] < rec.n_products
+    assert store.lookup(3, 5) == expected[3, :5].tolist()
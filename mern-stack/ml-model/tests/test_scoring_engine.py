@@ -0,0 +1,103 @@
+# test_scoring_engine.py
+"""ScoringEngine / compute_weighted_scores so với bản vòng lặp cũ (minmax_scale, seasonality_score)."""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from scoring_engine import ScoringEngine, seasonality_for_dates, seasonality_on
+
+
+# ---------------------------
+# Bản cũ (trước scoring_engine), giữ nguyên để đối chiếu
+# ---------------------------
+def legacy_minmax_scale(values):
+    clean = [v for v in values if v is not None]
+    if not clean:
+        return [0.0 for _ in values]
+    vmin, vmax = min(clean), max(clean)
+    if vmin == vmax:
+        return [0.5 if v is not None else 0.0 for v in values]
+    return [0.0 if v is None else (v - vmin) / (vmax - vmin) for v in values]
+
+
+def legacy_seasonality_score(today):
+    yr = today.year
+    may_first = date(yr, 5, 1)
+    mothers_day = may_first + timedelta(days=(6 - may_first.weekday()) % 7 + 7)
+    score = 0.0
+    for peak, window, weight in ((date(yr, 2, 14), 5, 0.2), (date(yr, 3, 8), 5, 0.2),
+                                 (mothers_day, 5, 0.15), (date(yr, 11, 20), 5, 0.2)):
+        if abs((today - peak).days) <= window:
+            score += weight
+    if date(yr, 1, 20) <= today <= date(yr, 2, 15):
+        score += 0.35
+    if today.month in {9, 10, 11, 12, 1, 2, 3}:
+        score += 0.15
+    return float(min(1.0, score))
+
+
+def legacy_scores(product_ids, growth, trend, w, season):
+    g, t = legacy_minmax_scale(growth), legacy_minmax_scale(trend)
+    scores = [(pid, round(float(w[0] * g[i] + w[1] * t[i] + w[2] * season), 4)) for i, pid in enumerate(product_ids)]
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return scores
+
+
+def fixture(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    product_ids = [f"p{i}" for i in range(n)]
+    growth = [None if i % 7 == 0 else float(v) for i, v in enumerate(rng.integers(-20, 20, size=n))]
+    trend = [None if i % 5 == 0 else float(v) for i, v in enumerate(rng.integers(0, 4, size=n))]  # nhiều điểm hòa
+    return product_ids, growth, trend
+
+
+def as_array(values):
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def test_seasonality_calendar_matches_legacy_every_day():
+    days = [date(2024, 1, 1) + timedelta(days=d) for d in range(366 + 365)]
+    legacy = [legacy_seasonality_score(d) for d in days]
+    assert [seasonality_on(d) for d in days] == legacy
+    assert seasonality_for_dates(days).tolist() == legacy
+
+
+def test_sweep_and_top_k_match_legacy_scores():
+    product_ids, growth, trend = fixture()
+    engine = ScoringEngine(product_ids, as_array(growth), as_array(trend))
+    weights = np.array([[0.5, 0.3, 0.2], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.2, 0.2, 0.6]])
+    seasons = np.array([legacy_seasonality_score(date(2025, m, 14)) for m in (2, 6, 11, 3)])
+
+    swept = engine.sweep(weights, seasons)
+    for s, (w, season) in enumerate(zip(weights, seasons)):
+        legacy = legacy_scores(product_ids, growth, trend, w, season)
+        assert np.allclose(np.round(swept[s], 4), [dict(legacy)[pid] for pid in product_ids])
+
+        order, _ = engine.ranked(None, decimals=4, w_forecast=w[0], w_trend=w[1], w_season=w[2], season=season)
+        assert [product_ids[i] for i in order] == [pid for pid, _ in legacy]
+        for k in (1, 5, 12):
+            top = engine.top_k(k, w_forecast=w[0], w_trend=w[1], w_season=w[2], season=season)
+            assert np.allclose([d["score"] for d in top], [x[1] for x in legacy[:k]], atol=1e-4)
+            order, _ = engine.ranked(k, decimals=4, w_forecast=w[0], w_trend=w[1], w_season=w[2], season=season)
+            assert [product_ids[i] for i in order] == [pid for pid, _ in legacy[:k]]
+
+
+def test_compute_weighted_scores_top_k_is_prefix_of_full_legacy_ranking():
+    pytest.importorskip("pytrends")
+    from business_strategy import compute_weighted_scores
+
+    product_ids, growth, _ = fixture()
+    forecast = [{"productId": pid, "forecast_growth_pct": g} for pid, g in zip(product_ids, growth)]
+    kw_map = {pid: ["hoa tươi", "hoa cưới", "hoa lan"][i % 3] for i, pid in enumerate(product_ids) if i % 4}
+    trends = {"avg_interest": {"hoa tươi": 40.0, "hoa cưới": 75, "hoa lan": "n/a"}}
+    today = date(2025, 2, 12)
+    trend = [trends["avg_interest"].get(kw_map.get(pid)) if kw_map.get(pid) != "hoa lan" else None
+             for pid in product_ids]
+    legacy = legacy_scores(product_ids, growth, trend, (0.5, 0.3, 0.2), legacy_seasonality_score(today))
+
+    full = compute_weighted_scores(product_ids, forecast, trends, kw_map, today=today)
+    assert [(d["productId"], d["score"]) for d in full] == legacy
+    assert [d["trend_avg_interest"] for d in full] == [trend[product_ids.index(d["productId"])] for d in full]
+    assert compute_weighted_scores(product_ids, forecast, trends, kw_map, today=today, k=5) == full[:5]
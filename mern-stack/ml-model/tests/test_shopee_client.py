@@ -0,0 +1,92 @@
+# test_shopee_client.py
+"""shopee_client trên stub HTTP server cục bộ trả về search_items giả (không gọi Shopee thật)."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from shopee_client import HostLimiter, fetch_shopee_data, fetch_shopee_for_keyword, make_session
+
+DELAY = 0.2
+
+
+@pytest.fixture
+def stub():
+    state = {"active": 0, "max_active": 0, "starts": [], "lock": threading.Lock()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            keyword = parse_qs(urlparse(self.path).query).get("keyword", [""])[0]
+            with state["lock"]:
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+                state["starts"].append(time.monotonic())
+            time.sleep(DELAY)
+            if keyword == "blocked":
+                status, body = 403, b"{}"
+            elif keyword == "broken":
+                status, body = 500, b"oops"
+            else:
+                items = [{"item_basic": {"name": f"{keyword} #{i}", "price": (100 + 10 * i) * 100000,
+                                         "sold": i, "shopid": 10 + i % 2, "shop_location": "Hà Nội"}}
+                         for i in range(3)]
+                status, body = 200, json.dumps({"items": items}).encode("utf-8")
+            with state["lock"]:
+                state["active"] -= 1
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_address[1]}/api/v4/search/search_items"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def test_parses_canned_search_items(stub):
+    out = fetch_shopee_for_keyword("hoa hồng", url=stub["url"], session=make_session(),
+                                   limiter=HostLimiter(min_interval=0))
+    assert out["items_count"] == 3
+    assert out["avg_price_vnd"] == 110
+    assert [p["sold"] for p in out["top_products"]] == [2, 1, 0]
+    assert out["top_shops"] == [{"shopid": 10, "count": 2}, {"shopid": 11, "count": 1}]
+
+
+def test_concurrent_fetch_respects_per_host_limit(stub):
+    keywords = [f"hoa {i}" for i in range(6)]
+    t0 = time.perf_counter()
+    results = fetch_shopee_data(keywords, url=stub["url"], session=make_session(),
+                                limiter=HostLimiter(max_concurrent=3, min_interval=0))
+    wall = time.perf_counter() - t0
+    assert list(results) == keywords
+    assert all(r["items_count"] == 3 for r in results.values())
+    assert stub["max_active"] <= 3
+    assert wall < len(keywords) * DELAY * 0.75      # ≈ 2 lượt × DELAY, không phải tổng 6 × DELAY
+
+
+def test_rate_limit_spaces_request_starts(stub):
+    fetch_shopee_data([f"k{i}" for i in range(4)], url=stub["url"], session=make_session(),
+                      limiter=HostLimiter(max_concurrent=4, min_interval=0.05))
+    starts = sorted(stub["starts"])
+    assert min(b - a for a, b in zip(starts, starts[1:])) >= 0.04
+
+
+def test_blocked_and_failing_keywords_return_empty_result(stub):
+    results = fetch_shopee_data(["blocked", "broken", "ok"], url=stub["url"], session=make_session(),
+                                limiter=HostLimiter(min_interval=0))
+    assert results["blocked"]["items_count"] == 0 and results["blocked"]["top_products"] == []
+    assert results["broken"]["items_count"] == 0
+    assert results["ok"]["items_count"] == 3
@@ -3,6 +3,7 @@ import os
 import pandas as pd
 from pymongo import MongoClient
 from dotenv import load_dotenv
+from orders_snapshot import OrdersSnapshot
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report
@@ -13,43 +14,15 @@ load_dotenv()
 mongo_uri = os.getenv("MONGO_URI")
 client = MongoClient(mongo_uri)
 db = client["test"]
-orders = db["orders"]
-users = db["users"]
-
-# Load dữ liệu người dùng (chỉ lấy khách hàng)
-user_cursor = users.find({"role": "customer"})
-user_data = []
-for user in user_cursor:
-    user_data.append({
-        "user_id": str(user["_id"]),
-        "email": user.get("email", ""),
-        "address": user.get("address", ""),
-        "phone": user.get("phone", ""),
-        "created_at": user.get("createdAt"),
-        "updated_at": user.get("updatedAt"),
-    })
-user_df = pd.DataFrame(user_data)
-
-# Load đơn hàng và tính số lượng đơn theo từng user
-order_cursor = orders.find()
-order_data = []
-for order in order_cursor:
-    uid = str(order.get("userId"))
-    created_at = order.get("createdAt")
-    total = order.get("total", 0)
-    order_data.append({
-        "user_id": uid,
-        "total": total,
-        "created_at": created_at,
-    })
-order_df = pd.DataFrame(order_data)
-
-# Tính các đặc trưng đơn giản
-agg_orders = order_df.groupby("user_id").agg({
-    "total": ["sum", "count"],
-    "created_at": "max"
-}).reset_index()
-agg_orders.columns = ["user_id", "total_spent", "order_count", "last_order_date"]
+
+# Snapshot cột dùng chung (orders + users, memory-map — xem orders_snapshot.py)
+snapshot = OrdersSnapshot.load_or_build(db)
+
+# Load dữ liệu người dùng (chỉ lấy khách hàng: user_id, created_at)
+user_df = snapshot.customers()
+
+# Tính các đặc trưng đơn giản theo từng user
+agg_orders = snapshot.user_order_stats()
 
 # Merge lại
 df = pd.merge(user_df, agg_orders, how="left", on="user_id").fillna({
@@ -2,16 +2,33 @@
 
 
 # train_recommendation_model.py
-import pandas as pd
-import numpy as np
-from pymongo import MongoClient
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Embedding, Flatten, Dense, Concatenate
-from tensorflow.keras.optimizers import Adam
-from sklearn.preprocessing import LabelEncoder
-import joblib
+# Mặc định train tăng dần nếu đã có recommendation_model.h5 + encoder: nới bảng embedding cho
+# id mới (chỉ số cũ giữ nguyên), fine-tune trên tương tác mới + mẫu replay (xem incremental_training.py).
+# Train lại từ đầu:
+#     python train_recommendation_model.py full
+# Thêm đánh giá kiến trúc bằng 1 mô hình train từ đầu trên phần train của phép chia ngẫu nhiên
+# (tốn thêm 1 lần train đầy đủ, mặc định tắt):
+#     python train_recommendation_model.py holdout
 import os
+import sys
+import time
+
+from pymongo import MongoClient
 from dotenv import load_dotenv
+from orders_snapshot import MAX_AGE, OrdersSnapshot
+from id_encoder import AppendOnlyEncoder
+from incremental_training import (
+    TRAIN_META_FILE, build_model, encode, grow_model, has_previous_model, load_encoders, load_train_meta,
+    max_created, save_encoders, save_train_meta, select_rows, train_meta, watermark_order_ids
+)
+from recommender_inference import NumpyRecommender
+from recommendation_store import MODEL_FILE, TopNStore, build_topn_store
+from ann_index import IVFIndex, evaluate_recall
+from item_similarity import ItemSimilarityIndex, build_item_index
+from evaluate_recommendation import evaluate, fit_holdout, prepare, served_scorer
+
+REPLAY_RATIO = float(os.getenv("REC_REPLAY_RATIO", 2.0))
+FINETUNE_EPOCHS = int(os.getenv("REC_FINETUNE_EPOCHS", 3))
 
 # Load biến môi trường từ .env (chứa MONGO_URI)
 load_dotenv()
@@ -25,75 +42,124 @@ client = MongoClient(mongo_uri)
 db = client["test"]
 orders = db["orders"]
 
-# Trích xuất dữ liệu user-product-quantity từ đơn hàng
-data = []
-for order in orders.find():
-    user_raw = order.get("userId")
-    if not user_raw:
-        continue
+full = "full" in sys.argv[1:] or not has_previous_model(MODEL_FILE)
 
-    user = str(user_raw["$oid"]) if isinstance(user_raw, dict) else str(user_raw)
+# Dữ liệu user-product-quantity từ snapshot cột dùng chung (memory-map, cột int32/float32
+# — xem orders_snapshot.py / interaction_extract.py). Train tăng dần luôn dựng snapshot mới:
+# snapshot cũ (tới ORDERS_SNAPSHOT_MAX_AGE) thiếu các đơn đến sau nó, watermark sẽ vượt qua chúng
+snapshot = OrdersSnapshot.load_or_build(db, max_age=MAX_AGE if full else 0)
+data = snapshot.interactions()
+print(f"📦 Trích xuất {data.report['rows']:,} dòng trong {data.report['seconds']}s "
+      f"({data.report['rows_per_sec']} dòng/s, RSS đỉnh {data.report['peak_rss_mb']} MB)")
 
-    for p in order.get("products", []):
-        product_raw = p.get("productId")
-        if not product_raw:
-            continue
-        product = str(product_raw["$oid"]) if isinstance(product_raw, dict) else str(product_raw)
-        quantity = p.get("quantity", 1)
-        data.append((user, product, quantity))
-
-# Chuyển thành DataFrame
-df = pd.DataFrame(data, columns=["user", "product", "quantity"])
-
-if df.empty:
+if len(data) == 0:
     sample = orders.find_one()
     print("🧪 order sample:", sample)
     raise Exception("❌ Không có dữ liệu đơn hàng để huấn luyện!")
 
-# Encode user & product IDs
-user_encoder = LabelEncoder()
-product_encoder = LabelEncoder()
-
-df["user_id"] = user_encoder.fit_transform(df["user"])
-df["product_id"] = product_encoder.fit_transform(df["product"])
-df["interaction"] = df["quantity"]
-
-# Lưu lại encoder
-joblib.dump(user_encoder, "user_encoder.pkl")
-joblib.dump(product_encoder, "product_encoder.pkl")
-
-# Số lượng unique users và products
-n_users = df["user_id"].nunique()
-n_products = df["product_id"].nunique()
-
-# Xây dựng mô hình Deep Learning đơn giản
-user_input = Input(shape=(1,))
-product_input = Input(shape=(1,))
-user_embedding = Embedding(input_dim=n_users, output_dim=50)(user_input)
-product_embedding = Embedding(input_dim=n_products, output_dim=50)(product_input)
-
-user_vec = Flatten()(user_embedding)
-product_vec = Flatten()(product_embedding)
-concat = Concatenate()([user_vec, product_vec])
-dense1 = Dense(128, activation="relu")(concat)
-dense2 = Dense(64, activation="relu")(dense1)
-output = Dense(1)(dense2)
-
-model = Model(inputs=[user_input, product_input], outputs=output)
-model.compile(optimizer=Adam(0.001), loss="mse")
-
-# Huấn luyện mô hình
-model.fit(
-    [df["user_id"], df["product_id"]],
-    df["interaction"],
-    epochs=10,
-    batch_size=32,
-    validation_split=0.1
-)
-
-# Lưu mô hình
-model.save("recommendation_model.h5")
-print("✅ Đã huấn luyện xong mô hình và lưu vào recommendation_model.h5")
+t0 = time.perf_counter()
+previous = {} if full else load_train_meta()
+served_evaluation = None
+trained = True
+
+# Encode user & product IDs: encoder append-only (id cũ giữ chỉ số, id mới nối vào cuối)
+user_encoder, product_encoder = load_encoders()
+if full:
+    user_encoder, product_encoder = AppendOnlyEncoder(), AppendOnlyEncoder()
+users, products, old_users, old_products = encode(data, user_encoder, product_encoder)
+n_users = len(user_encoder)
+n_products = len(product_encoder)
+quantity = data.quantity
+
+if full:
+    # Train từ đầu trên toàn bộ dữ liệu
+    mode, n_new, n_replay = "full", len(data), 0
+    model = build_model(n_users, n_products)
+    epochs = 10
+else:
+    # Fine-tune: nới embedding cho id mới, chỉ train dòng mới + replay
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.losses import MeanSquaredError
+
+    rows, n_new, n_replay = select_rows(users, products, data.created, old_users, old_products,
+                                        previous.get("watermark"), REPLAY_RATIO, order_ids=data.order_ids,
+                                        seen_order_ids=previous.get("watermark_order_ids", []))
+    mode = "incremental"
+    print(f"🔁 Train tăng dần: +{n_users - old_users} user, +{n_products - old_products} sản phẩm, "
+          f"{n_new:,} dòng mới + {n_replay:,} dòng replay (watermark {previous.get('watermark')})")
+    served = load_model(MODEL_FILE, custom_objects={"mse": MeanSquaredError()})
+
+    # Đo mô hình đang phục vụ trước khi fine-tune: test = đơn sau watermark lần train trước
+    # (mô hình chưa thấy), chấm theo khối bằng NumPy — không train thêm mô hình nào
+    if previous.get("watermark"):
+        train_matrix, test_matrix = prepare(snapshot, cut=previous["watermark"])
+        if test_matrix.nnz:
+            served_evaluation = {
+                **evaluate(train_matrix, test_matrix, k=5, scorer=served_scorer(
+                    NumpyRecommender.from_keras(served), user_encoder, product_encoder, snapshot)),
+                "split": "time",
+                "cut": previous["watermark"],
+                "model_trained_at": previous.get("trained_at")
+            }
+    if n_new == 0:
+        # Không train / không ghi model, nhưng vẫn dựng lại artifact đang thiếu hoặc cũ hơn model bên dưới
+        print("✅ Không có tương tác mới, giữ nguyên mô hình")
+        trained, model, meta = False, served, previous
+    else:
+        model = grow_model(served, n_users, n_products)
+        users, products, quantity = users[rows], products[rows], data.quantity[rows]
+        epochs = FINETUNE_EPOCHS
+
+if trained:
+    # Huấn luyện mô hình
+    model.fit(
+        [users, products],
+        quantity,
+        epochs=epochs,
+        batch_size=32,
+        validation_split=0.1
+    )
+
+    # Lưu mô hình + encoder + watermark (+ _id các đơn đúng giây watermark, xem select_rows)
+    model.save(MODEL_FILE)
+    save_encoders(user_encoder, product_encoder)
+    watermark = max_created(data.created) or previous.get("watermark")
+    meta = train_meta(mode, watermark, len(users), n_new, n_replay, n_users, n_products,
+                      time.perf_counter() - t0, watermark_order_ids(data.created, data.order_ids, watermark))
+    save_train_meta(meta)
+    print(f"✅ Đã huấn luyện xong mô hình ({mode}) và lưu vào {MODEL_FILE} ({TRAIN_META_FILE})")
+
+# Tính sẵn top-N gợi ý cho mọi user để server phục vụ trực tiếp
+# (không train lại → chỉ dựng khi bảng thiếu / cũ hơn model, TopNStore.load trả None)
+numpy_recommender = NumpyRecommender.from_keras(model)
+if trained or TopNStore.load() is None:
+    build_topn_store(numpy_recommender)
+
+# ANN index ứng viên cho catalog lớn (xem ann_index.py): đo recall ngay sau khi build,
+# server chỉ bật ANN nếu có nprobe đạt ANN_MIN_RECALL
+if trained or IVFIndex.load() is None:
+    ann_index = IVFIndex.build(numpy_recommender)
+    ann_index.save()
+    ann_index.save_evaluation(evaluate_recall(numpy_recommender, ann_index, k=5), k=5)
+    print(f"🔎 ANN index: nprobe phục vụ = {ann_index.serving_nprobe()} (None → chấm toàn catalog)")
+
+# Đánh giá offline lưu kèm rec_train_meta.json để so sánh giữa các lần train:
+# - evaluation: mô hình phục vụ trước lần train này, trên đơn đến sau watermark của nó (đo ở trên);
+#   mô hình vừa lưu đã thấy mọi đơn → được đo ở lần train kế tiếp (hoặc evaluate_recommendation.py --model deep)
+# - holdout_evaluation (chỉ khi chạy với "holdout"): mô hình train từ đầu trên phần train của prepare()
+evaluations = {"evaluation": served_evaluation}
+if "holdout" in sys.argv[1:]:
+    train_matrix, test_matrix = prepare(snapshot)
+    evaluations["holdout_evaluation"] = evaluate(train_matrix, test_matrix, k=5, scorer=fit_holdout(snapshot))
+save_train_meta({**meta, **{name: report for name, report in evaluations.items() if report}})
+for name, report in evaluations.items():
+    if report:
+        print(f"🎯 {name}: Precision@5: {report['precision@5']:.4f} | NDCG@5: {report['ndcg@5']:.4f} | "
+              f"Coverage: {report['coverage']:.4f} | {report['users_per_sec']} user/s")
+
+# Index sản phẩm hay được mua cùng (/similar, xem item_similarity.py) dựng lại từ cùng snapshot
+if trained or ItemSimilarityIndex.load() is None:
+    build_item_index(snapshot)
 
 # train_recommendation_model.py
 # Công nghệ, thư viện sử dụng
@@ -103,7 +169,7 @@ print("✅ Đã huấn luyện xong mô hình và lưu vào recommendation_model
 
 # tensorflow.keras: xây dựng mô hình deep learning (embedding + fully connected layers).
 
-# sklearn.preprocessing.LabelEncoder: mã hóa user và product thành số nguyên.
+# id_encoder.AppendOnlyEncoder (API giống sklearn LabelEncoder): mã hóa user và product thành số nguyên, id cũ giữ chỉ số khi train tăng dần.
 
 # joblib: lưu bộ encoder vào file.
 
@@ -0,0 +1,80 @@
+# ttl_cache.py
+"""
+LRU cache có TTL, an toàn đa luồng, dùng chung cho các service trong ml-model
+(catalog sản phẩm, ...).
+- Giới hạn số phần tử (maxsize), loại phần tử ít dùng nhất khi đầy.
+- Mỗi phần tử hết hạn sau `ttl` giây (ttl=None → không hết hạn).
+- Đếm hit/miss để theo dõi hiệu quả cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        if maxsize <= 0:
+            raise ValueError("maxsize phải > 0")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or self._expired(entry[1], now):
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Trả về dict key → value cho các key còn trong cache (bỏ qua key miss)."""
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }